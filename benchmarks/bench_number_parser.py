@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Микро-бенчмарк парсера чисел: общий модуль ai_agent.analysis.numbers
+против прежней реализации parse_number из анализаторов
+
+Запуск:
+    python benchmarks/bench_number_parser.py
+"""
+
+import random
+import re
+import sys
+import timeit
+from pathlib import Path
+
+# Добавляем папку src в путь
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+from ai_agent.analysis.numbers import parse_number, parse_numbers
+
+def legacy_parse_number(value):
+    """Прежняя реализация (копия из анализаторов до выноса в общий модуль)"""
+    if not value or value == '' or str(value).strip() == '':
+        return None
+    
+    clean_value = str(value).replace(' ', '').replace('\xa0', '').replace(',', '.')
+    clean_value = clean_value.replace('%', '')
+    
+    match = re.search(r'-?\d+\.?\d*', clean_value)
+    if match:
+        try:
+            return float(match.group())
+        except ValueError:
+            return None
+    return None
+
+def make_cells(count: int, seed: int = 42) -> list:
+    """Генерирует ячейки, похожие на значения листа месяца"""
+    rnd = random.Random(seed)
+    cells = []
+    for _ in range(count):
+        kind = rnd.random()
+        if kind < 0.25:
+            cells.append(rnd.choice(['0', '0%', '']))
+        elif kind < 0.5:
+            cells.append(str(rnd.randint(0, 500)))
+        elif kind < 0.7:
+            cells.append(f"{rnd.randint(0, 99)},{rnd.randint(0, 9)}%")
+        elif kind < 0.9:
+            cells.append(f"{rnd.randint(1, 99)}\xa0{rnd.randint(100, 999)},{rnd.randint(0, 9)}")
+        else:
+            cells.append(f"-{rnd.randint(1, 50)}")
+    return cells
+
+def main():
+    cells = make_cells(200 * 93)
+    
+    # Проверяем, что результаты совпадают
+    assert [legacy_parse_number(c) for c in cells] == parse_numbers(cells)
+    
+    repeat = 5
+    legacy = min(timeit.repeat(lambda: [legacy_parse_number(c) for c in cells], number=1, repeat=repeat))
+    single = min(timeit.repeat(lambda: [parse_number(c) for c in cells], number=1, repeat=repeat))
+    bulk = min(timeit.repeat(lambda: parse_numbers(cells), number=1, repeat=repeat))
+    
+    print(f"Ячеек: {len(cells)}")
+    print(f"legacy parse_number: {legacy * 1000:8.2f} ms")
+    print(f"parse_number:        {single * 1000:8.2f} ms  (x{legacy / single:.1f})")
+    print(f"parse_numbers:       {bulk * 1000:8.2f} ms  (x{legacy / bulk:.1f})")
+
+if __name__ == "__main__":
+    main()
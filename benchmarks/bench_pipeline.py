@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк конвейера ежедневного анализа на синтетических листах
+
+Каждый этап запускается против локального эмулятора Google Sheets
+(ai_agent.google.emulator), без сети и учетных данных. Для каждого
+размера (строки × даты × правила) измеряются:
+- время этапа;
+- количество вызовов API по методам;
+- пиковая память (tracemalloc, отдельным прогоном - чтобы не искажать время).
+
+Этапы:
+    august.analyze_daily_changes, august.highlight_cells,
+    august.generate_markdown_report,
+    algorithm.load_rules, algorithm.analyze_sheet
+
+Правила передаются в load_rules напрямую: диапазон листа Algorithm
+ограничен 100 строками, а бенчмарк проверяет до 5000 правил.
+
+Запуск:
+    python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py --sizes 50x3x10 50000x93x5000 --output bench.json
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+# Добавляем папку src в путь
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+from synthetic import make_month_sheet, make_rules, metric_names
+
+from ai_agent.config import config
+from ai_agent.google.emulator import SheetsEmulator
+from ai_agent.google.executor import RequestExecutor
+from ai_agent.google.sheets import sheets
+from ai_agent.jobs.august_daily_analyzer import AugustDailyAnalyzer
+from ai_agent.jobs.daily_analyzer_with_algorithm import DailyAnalyzerWithAlgorithm
+from ai_agent.log import setup_logging
+from ai_agent.storage.watermarks import watermark_store
+
+SHEET_NAME = "Август 2025"
+
+# Размеры по умолчанию: строки × даты × правила (от реалистичных до предельных)
+DEFAULT_SIZES = ["50x3x10", "1000x31x100", "10000x62x1000", "50000x93x5000"]
+
+def parse_size(text: str) -> Tuple[int, int, int]:
+    """'1000x31x100' → (1000, 31, 100)"""
+    try:
+        rows, days, rules = (int(part) for part in text.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Размер должен быть в формате СТРОКИxДАТЫxПРАВИЛА: {text}")
+    return rows, days, rules
+
+def git_revision() -> str:
+    """Текущий коммит (для сравнения результатов между версиями)"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=project_root, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+class Pipeline:
+    """Один прогон всех этапов на свежем эмуляторе"""
+    
+    def __init__(self, grid: List[List[str]], rules: List[List[str]], latency: float):
+        self.emulator = SheetsEmulator({
+            SHEET_NAME: grid,
+            'Signals': [['Timestamp']],
+            'Decisions': [['SignalId']]
+        }, latency=latency)
+        sheets.use_backend(self.emulator, spreadsheet_id='benchmark')
+        self.rules = rules
+        self.august = AugustDailyAnalyzer()
+        self.algorithm = DailyAnalyzerWithAlgorithm(
+            sheet_name=SHEET_NAME,
+            recent_days=config.rollingWindowDays + 1
+        )
+    
+    def stages(self) -> List[Tuple[str, Callable]]:
+        august = self.august
+        return [
+            ('august.analyze_daily_changes', august.analyze_daily_changes),
+            ('august.highlight_cells', august.highlight_cells),
+            ('august.generate_markdown_report', lambda: august.generate_markdown_report(
+                today_date=august.today_date_str, yesterday_date=august.yesterday_date_str
+            )),
+            ('algorithm.load_rules', lambda: self.algorithm.load_rules(self.rules)),
+            ('algorithm.analyze_sheet', lambda: self.algorithm.analyze_sheet(SHEET_NAME)),
+        ]
+
+def run_scenario(rows: int, days: int, rule_count: int, seed: int,
+                 latency: float, measure_memory: bool) -> Dict:
+    """Прогоняет этапы для одного размера"""
+    metrics = metric_names(max(12, rule_count // 20))
+    
+    started = time.perf_counter()
+    grid = make_month_sheet(rows, days, metrics, seed=seed)
+    rules = make_rules(rule_count, metrics, seed=seed)
+    generate_seconds = time.perf_counter() - started
+    
+    stages: Dict[str, Dict] = {}
+    devnull = open(os.devnull, 'w', encoding='utf-8')
+    
+    # Прогон 1: время и вызовы API
+    pipeline = Pipeline(grid, rules, latency)
+    for name, stage in pipeline.stages():
+        calls_before = Counter(pipeline.emulator.calls)
+        with contextlib.redirect_stdout(devnull):
+            started = time.perf_counter()
+            stage()
+            seconds = time.perf_counter() - started
+        calls = pipeline.emulator.calls - calls_before
+        stages[name] = {
+            'seconds': round(seconds, 6),
+            'api_calls': dict(sorted(calls.items())),
+            'api_calls_total': sum(calls.values())
+        }
+    anomalies = {
+        'august': len(pipeline.august.anomalies),
+        'algorithm': len(pipeline.algorithm.anomalies)
+    }
+    
+    # Прогон 2: пиковая память (tracemalloc замедляет код, поэтому отдельно)
+    if measure_memory:
+        pipeline = Pipeline(grid, rules, 0.0)
+        for name, stage in pipeline.stages():
+            with contextlib.redirect_stdout(devnull):
+                tracemalloc.start()
+                stage()
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+            stages[name]['peak_memory_mb'] = round(peak / 1024 / 1024, 3)
+    
+    devnull.close()
+    return {
+        'rows': rows,
+        'days': days,
+        'rules': rule_count,
+        'generate_seconds': round(generate_seconds, 3),
+        'anomalies': anomalies,
+        'stages': stages,
+        'total_seconds': round(sum(stage['seconds'] for stage in stages.values()), 6)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк конвейера ежедневного анализа")
+    parser.add_argument('--sizes', nargs='+', type=parse_size,
+                        default=[parse_size(size) for size in DEFAULT_SIZES],
+                        help="Размеры СТРОКИxДАТЫxПРАВИЛА (по умолчанию: %(default)s)")
+    parser.add_argument('--seed', type=int, default=42, help="Зерно генератора данных")
+    parser.add_argument('--latency', type=float, default=0.0, help="Задержка ответа эмулятора (сек)")
+    parser.add_argument('--rate', type=float, default=1e9,
+                        help="Квота планировщика запросов в минуту (по умолчанию без ограничения)")
+    parser.add_argument('--no-memory', action='store_true', help="Не измерять пиковую память")
+    parser.add_argument('--output', help="Файл для результатов в JSON")
+    args = parser.parse_args()
+    
+    # Журнал этапов не нужен - только предупреждения и ошибки
+    setup_logging(level='WARNING', force=True)
+    
+    # Локальное состояние бенчмарка - во временной папке, кэш снимков не нужен
+    state_dir = tempfile.mkdtemp(prefix="bench-state-")
+    watermark_store.path = Path(state_dir) / "state.sqlite3"
+    sheets.cache = None
+    sheets.executor = RequestExecutor(requests_per_minute=args.rate)
+    
+    results = {
+        'benchmark': 'pipeline',
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'latency': args.latency,
+        'rate_per_minute': args.rate,
+        'scenarios': []
+    }
+    
+    for rows, days, rule_count in args.sizes:
+        print(f"INFO: {rows} строк × {days} дат × {rule_count} правил...", file=sys.stderr)
+        scenario = run_scenario(rows, days, rule_count, args.seed, args.latency, not args.no_memory)
+        results['scenarios'].append(scenario)
+        for name, stage in scenario['stages'].items():
+            memory = f"  {stage['peak_memory_mb']:9.2f} MB" if 'peak_memory_mb' in stage else ''
+            print(f"  {name:34s} {stage['seconds'] * 1000:10.1f} ms  "
+                  f"API: {stage['api_calls_total']:3d}{memory}", file=sys.stderr)
+    
+    output = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n", encoding='utf-8')
+        print(f"SUCCESS: Результаты сохранены: {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Генераторы синтетических данных для бенчмарков: лист месяца и правила Algorithm
+
+Значения похожи на реальные: проценты с запятой ("12,5%"), суммы с
+неразрывным пробелом ("1 234"), пропуски и нули.
+"""
+
+import json
+from datetime import date, timedelta
+from typing import List
+
+import numpy as np
+
+# Метрики из реальной таблицы - покрывают все категории порогов анализатора
+BASE_METRICS = [
+    'CR в заказ', 'Конверсия в корзину', 'Заказы', 'Выручка', 'Прибыль', 'M3',
+    'CTR', 'Клики', 'Добавления в корзину', 'Переходы', 'Показы', 'Остатки'
+]
+
+PERCENT_METRICS = {'CR в заказ', 'Конверсия в корзину', 'CTR'}
+MONEY_METRICS = {'Выручка', 'Прибыль'}
+
+CONDITION_TYPES = ['ratio', 'rise', 'absolute', 'zscore']
+
+def metric_names(count: int) -> List[str]:
+    """Набор из count названий метрик: сначала реальные, затем "Метрика N" """
+    names = list(BASE_METRICS[:count])
+    names.extend(f"Метрика {index}" for index in range(len(names), count))
+    return names
+
+def _format_column(values: np.ndarray, kind: str) -> List[str]:
+    """Форматирует колонку значений так, как их отдает Google Sheets"""
+    if kind == 'percent':
+        return [f"{value / 100:.1f}%".replace('.', ',') for value in values]
+    if kind == 'money':
+        return [f"{int(value):,}".replace(',', '\xa0') for value in values]
+    return [str(int(value)) for value in values]
+
+def make_month_sheet(rows: int, days: int, metrics: List[str] = None, seed: int = 42,
+                     start: date = date(2025, 8, 1)) -> List[List[str]]:
+    """Лист месяца: 2 строки заголовков, затем строки (метрика, товар, значения по датам)
+    
+    Args:
+        rows: Количество строк метрик
+        days: Количество колонок с датами
+        metrics: Названия метрик (по умолчанию - реальные)
+        seed: Зерно генератора
+        start: Первая дата
+    """
+    rng = np.random.default_rng(seed)
+    metrics = metrics or BASE_METRICS
+    
+    headers = ['Метрика', 'Товар'] + [
+        (start + timedelta(days=offset)).strftime('%d.%m.%Y') for offset in range(days)
+    ]
+    subheaders = [''] * len(headers)
+    
+    row_metrics = rng.choice(len(metrics), size=rows)
+    base = rng.integers(10, 5000, size=rows).astype(np.float64)
+    # Дневные колебания ±12%, у части строк - резкие скачки
+    values = np.round(base[:, None] * rng.normal(1.0, 0.12, size=(rows, days)).clip(0.05))
+    jumps = rng.random(size=(rows, days)) < 0.03
+    values[jumps] = np.round(values[jumps] * rng.choice([0.3, 2.5], size=int(jumps.sum())))
+    gaps = rng.random(size=(rows, days))
+    
+    kinds = np.array([
+        'percent' if metric in PERCENT_METRICS else 'money' if metric in MONEY_METRICS else 'int'
+        for metric in metrics
+    ])[row_metrics]
+    
+    grid = [headers, subheaders]
+    cells_by_kind = {
+        kind: [_format_column(values[:, day], kind) for day in range(days)]
+        for kind in set(kinds)
+    }
+    for row in range(rows):
+        cells = cells_by_kind[kinds[row]]
+        line = [metrics[row_metrics[row]], f"Товар {row % 97}"]
+        for day in range(days):
+            gap = gaps[row, day]
+            if gap < 0.04:
+                line.append('')
+            elif gap < 0.07:
+                line.append('0')
+            else:
+                line.append(cells[day][row])
+        grid.append(line)
+    return grid
+
+def make_rules(count: int, metrics: List[str], seed: int = 42) -> List[List[str]]:
+    """Строки листа Algorithm: заголовок и count активных правил по метрикам metrics"""
+    rng = np.random.default_rng(seed)
+    rules = [['RuleId', 'Block', 'Metric', 'ConditionType', 'ConditionParams', 'ActionType',
+              'ActionParams', 'Severity', 'Comment', 'Active']]
+    for index in range(count):
+        condition_type = CONDITION_TYPES[int(rng.integers(len(CONDITION_TYPES)))]
+        if condition_type == 'absolute':
+            params = {'min': int(rng.integers(1, 50))}
+        elif condition_type == 'zscore':
+            params = {'z': round(float(rng.uniform(2, 4)), 1), 'min_samples': int(rng.integers(3, 10))}
+        else:
+            params = {
+                'drop_pct': round(float(rng.uniform(0.1, 0.5)), 2),
+                'rise_pct': round(float(rng.uniform(0.1, 0.5)), 2),
+                'min_samples': int(rng.integers(3, 10))
+            }
+        rules.append([
+            f"R{index + 1:05d}",
+            f"Блок {index % 5}",
+            metrics[index % len(metrics)],
+            condition_type,
+            json.dumps(params),
+            'notify',
+            '',
+            ['low', 'medium', 'high'][index % 3],
+            '',
+            'Y'
+        ])
+    return rules
@@ -11,6 +11,7 @@ project_root = Path(__file__).parent
 sys.path.insert(0, str(project_root))
 
 from src.ai_agent.google.sheets import sheets
+from src.ai_agent.analysis.numbers import parse_numbers
 
 def main():
     print("Проверка данных в листе Август 2025...")
@@ -43,7 +44,10 @@ def main():
             if metrics_found:
                 print(f"\nНайдены метрики ({len(metrics_found)}):")
                 for line_num, row in metrics_found[:10]:  # Показываем первые 10
+                    numbers = [n for n in parse_numbers(row[2:]) if n is not None]
                     print(f"  Строка {line_num}: {row}")
+                    print(f"    Числовых значений: {len(numbers)}" +
+                          (f", последнее: {numbers[-1]}" if numbers else ""))
             else:
                 print("\nМетрики не найдены в стандартном формате")
                 
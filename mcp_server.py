@@ -4,11 +4,13 @@ MCP сервер для Google сервисов
 """
 
 import asyncio
+import functools
 import json
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, List, Optional
 
 # Устанавливаем правильный путь к JSON файлу
 os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = 'google-service-account.json'
@@ -20,11 +22,20 @@ sys.path.insert(0, str(project_root))
 from src.ai_agent.google.sheets import sheets
 from src.ai_agent.google.drive import drive
 from src.ai_agent.config import config
+from src.ai_agent.log import get_logger
+
+logger = get_logger('mcp_server')
 
 class GoogleMCPServer:
     """MCP сервер для Google сервисов"""
     
-    def __init__(self):
+    def __init__(self, max_workers: int = None):
+        # Вызовы Google API блокирующие - выполняем их в ограниченном пуле потоков,
+        # чтобы долгий инструмент не задерживал остальные запросы
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or config.MCP_MAX_WORKERS,
+            thread_name_prefix="mcp-tool"
+        )
         self.tools = {
             "google_sheets_read": self.read_sheets,
             "google_sheets_write": self.write_sheets,
@@ -34,10 +45,15 @@ class GoogleMCPServer:
             "google_sheets_analyze_daily": self.analyze_daily_changes,
         }
     
-    async def read_sheets(self, sheet_name: str, range_name: str) -> Dict[str, Any]:
-        """Читает данные из Google Sheets"""
+    async def run_blocking(self, func: Callable, *args, **kwargs) -> Any:
+        """Выполняет блокирующую функцию в пуле потоков сервера"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+    
+    async def read_sheets(self, sheet_name: str, range_name: str, use_cache: bool = True) -> Dict[str, Any]:
+        """Читает данные из Google Sheets (use_cache=False - в обход локального кэша)"""
         try:
-            data = sheets.read_range(sheet_name, range_name)
+            data = await self.run_blocking(sheets.read_range, sheet_name, range_name, use_cache=use_cache)
             return {
                 "success": True,
                 "data": data,
@@ -55,7 +71,7 @@ class GoogleMCPServer:
     async def write_sheets(self, sheet_name: str, range_name: str, values: List[List[Any]]) -> Dict[str, Any]:
         """Записывает данные в Google Sheets"""
         try:
-            success = sheets.write_range(sheet_name, range_name, values)
+            success = await self.run_blocking(sheets.write_range, sheet_name, range_name, values)
             return {
                 "success": success,
                 "sheet": sheet_name,
@@ -74,9 +90,9 @@ class GoogleMCPServer:
         """Список файлов в Google Drive"""
         try:
             if folder_id:
-                files = drive.list_files(folder_id)
+                files = await self.run_blocking(drive.list_files, folder_id)
             else:
-                files = drive.list_files()
+                files = await self.run_blocking(drive.list_files)
             return {
                 "success": True,
                 "files": files,
@@ -92,7 +108,7 @@ class GoogleMCPServer:
     async def get_sheets_info(self) -> Dict[str, Any]:
         """Информация о Google Таблице"""
         try:
-            info = sheets.get_spreadsheet_info()
+            info = await self.run_blocking(sheets.get_spreadsheet_info)
             return {
                 "success": True,
                 "info": info
@@ -106,55 +122,44 @@ class GoogleMCPServer:
     async def scan_signals(self) -> Dict[str, Any]:
         """Сканирует сигналы в Google Таблице"""
         try:
-            # Импортируем сканер сигналов
-            from src.ai_agent.jobs.scan_data_funnel import DataFunnelScanner
-            
-            scanner = DataFunnelScanner()
-            result = scanner.scan_signals()
-            
-            if result:
-                scanner.save_signals()
-                return {
-                    "success": True,
-                    "signals_found": len(scanner.signals),
-                    "signals": scanner.signals
-                }
-            else:
-                return {
-                    "success": True,
-                    "signals_found": 0,
-                    "message": "Сигналы не найдены"
-                }
+            return await self.run_blocking(self._scan_signals)
         except Exception as e:
             return {
                 "success": False,
                 "error": str(e)
             }
     
-    async def analyze_daily_changes(self) -> Dict[str, Any]:
-        """Анализирует ежедневные изменения (сегодня vs вчера)"""
-        try:
-            # Импортируем анализатор
-            from src.ai_agent.jobs.august_daily_analyzer import AugustDailyAnalyzer
-            
-            analyzer = AugustDailyAnalyzer()
-            result = analyzer.analyze_daily_changes()
-            
-            if not result['success']:
-                return result
-            
-            # Генерируем отчет
-            report = analyzer.generate_markdown_report()
-            report_path = analyzer.save_report(report)
-            
+    def _scan_signals(self) -> Dict[str, Any]:
+        """Сканирование сигналов (выполняется в пуле потоков)"""
+        # Импортируем сканер сигналов
+        from src.ai_agent.jobs.scan_data_funnel import DataFunnelScanner
+        
+        scanner = DataFunnelScanner()
+        result = scanner.scan_signals()
+        
+        if result:
+            scanner.save_signals()
             return {
                 "success": True,
-                "anomalies_found": len(analyzer.anomalies),
-                "anomalies": analyzer.anomalies,
-                "report": report,
-                "report_path": report_path,
-                "message": f"Найдено отклонений: {len(analyzer.anomalies)}"
+                "signals_found": len(scanner.signals),
+                "signals": scanner.signals
             }
+        else:
+            return {
+                "success": True,
+                "signals_found": 0,
+                "message": "Сигналы не найдены"
+            }
+    
+    async def analyze_daily_changes(self, limit: int = 50, offset: int = 0,
+                                    category: str = None, product: str = None) -> Dict[str, Any]:
+        """Анализирует ежедневные изменения (сегодня vs вчера)
+        
+        В ответе - только худшие отклонения по |change_pct|: страница limit
+        с offset, при необходимости только категории category или товара product.
+        """
+        try:
+            return await self.run_blocking(self._analyze_daily_changes, limit, offset, category, product)
         except Exception as e:
             import traceback
             return {
@@ -163,6 +168,35 @@ class GoogleMCPServer:
                 "traceback": traceback.format_exc()
             }
     
+    def _analyze_daily_changes(self, limit: int, offset: int,
+                               category: Optional[str], product: Optional[str]) -> Dict[str, Any]:
+        """Анализ и отчет (выполняется в пуле потоков)"""
+        # Импортируем анализатор
+        from src.ai_agent.jobs.august_daily_analyzer import AugustDailyAnalyzer
+        
+        analyzer = AugustDailyAnalyzer()
+        result = analyzer.analyze_daily_changes()
+        
+        if not result['success']:
+            return result
+        
+        # Файл - полный отчет (один проход), в ответ - отчет по той же странице, что и anomalies
+        report_path = analyzer.write_reports(formats=['md'])['md']
+        page = analyzer.anomalies.page(offset, limit, category, product)
+        report = analyzer.generate_markdown_report(anomalies=page)
+        
+        return {
+            "success": True,
+            "anomalies_found": len(analyzer.anomalies),
+            "anomalies_by_category": analyzer.anomalies.counts(),
+            "anomalies": [anomaly.to_dict() for anomaly in page],
+            "offset": offset,
+            "limit": limit,
+            "report": report,
+            "report_path": report_path,
+            "message": f"Найдено отклонений: {len(analyzer.anomalies)}"
+        }
+    
     async def handle_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
         """Обрабатывает MCP запросы"""
         method = request.get("method")
@@ -185,33 +219,87 @@ class GoogleMCPServer:
                 }
             }
 
+def _error_response(request_id: Any, code: int, message: str) -> Dict[str, Any]:
+    """Ответ JSON-RPC с ошибкой"""
+    return {
+        "jsonrpc": "2.0",
+        "id": request_id,
+        "error": {
+            "code": code,
+            "message": message
+        }
+    }
+
+async def _stdin_lines():
+    """Асинхронно читает строки из stdin
+    
+    На POSIX stdin подключается к asyncio.StreamReader. Если событийный цикл
+    не умеет работать с каналом stdin (Windows, консоль), строки читаются
+    в отдельном потоке.
+    """
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader(limit=2 ** 24)  # Запросы с values могут быть крупными
+    
+    try:
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+    except (NotImplementedError, OSError, ValueError):
+        while True:
+            line = await loop.run_in_executor(None, sys.stdin.buffer.readline)
+            if not line:
+                return
+            yield line
+    else:
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            yield line
+
 async def main():
-    """Запуск MCP сервера"""
+    """Запуск MCP сервера
+    
+    Запросы обрабатываются конкурентно: каждый - в отдельной задаче, ответы
+    пишутся по мере готовности (порядок определяется полем id).
+    """
+    # stdout принадлежит протоколу: случайный print из библиотек уходит в stderr
+    protocol_out = sys.stdout.buffer
+    sys.stdout = sys.stderr
+    
     server = GoogleMCPServer()
+    write_lock = asyncio.Lock()
+    pending = set()
     
-    # Читаем запросы из stdin
-    while True:
+    async def respond(response: Dict[str, Any]):
+        data = (json.dumps(response) + "\n").encode('utf-8')
+        async with write_lock:
+            protocol_out.write(data)
+            protocol_out.flush()
+    
+    async def process(line: bytes):
+        request_id: Optional[Any] = None
         try:
-            line = input()
-            if not line:
-                continue
-                
             request = json.loads(line)
+            request_id = request.get("id")
             response = await server.handle_request(request)
-            print(json.dumps(response))
-            
-        except EOFError:
-            break
         except Exception as e:
-            error_response = {
-                "jsonrpc": "2.0",
-                "id": None,
-                "error": {
-                    "code": -32603,
-                    "message": f"Internal error: {str(e)}"
-                }
-            }
-            print(json.dumps(error_response))
+            logger.exception("Ошибка обработки запроса %s", request_id)
+            response = _error_response(request_id, -32603, f"Internal error: {str(e)}")
+        await respond(response)
+    
+    # Читаем запросы из stdin
+    try:
+        async for line in _stdin_lines():
+            if not line.strip():
+                continue
+            task = asyncio.create_task(process(line))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        
+        # stdin закрыт - дожидаемся запросов, которые еще выполняются
+        if pending:
+            await asyncio.gather(*pending)
+    finally:
+        server.executor.shutdown(wait=False)
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1 @@
+"""Модули для анализа данных листов"""
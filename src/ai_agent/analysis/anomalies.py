@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Хранилище найденных отклонений с быстрыми выборками "худших N"
+
+Отклонение - компактная запись со __slots__ (вместо словаря на каждую
+строку). Записи лежат в кучах по категориям и по товарам, упорядоченных по
+|change_pct|: top(k) обходит кучу от корня и трогает O(k log k) элементов,
+не сортируя все отклонения. При равном |change_pct| порядок - порядок
+добавления (как у устойчивой сортировки).
+"""
+
+import heapq
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Порядок категорий в отчете (от критичных к остальным)
+CATEGORY_ORDER = ('critical', 'important', 'normal')
+
+class Anomaly:
+    """Отклонение метрики в строке листа
+    
+    Поддерживает доступ как к словарю (anomaly['row']) - для кода,
+    который работал со словарями отклонений.
+    """
+    
+    __slots__ = ('row', 'col_today', 'col_yesterday', 'metric', 'product', 'yesterday_value',
+                 'today_value', 'change_pct', 'category', 'threshold')
+    
+    def __init__(self, row: int, col_today: int, col_yesterday: int, metric: str, product: str,
+                 yesterday_value: float, today_value: float, change_pct: float,
+                 category: str, threshold: float):
+        """
+        Args:
+            metric: Название для отчета (метрика и товар: "CR в заказ (Товар 1)")
+            product: Товар из колонки B (для выборок по товару)
+            change_pct: Изменение в процентах (округленное)
+        """
+        self.row = row
+        self.col_today = col_today
+        self.col_yesterday = col_yesterday
+        self.metric = metric
+        self.product = product
+        self.yesterday_value = yesterday_value
+        self.today_value = today_value
+        self.change_pct = change_pct
+        self.category = category
+        self.threshold = threshold
+    
+    @property
+    def direction(self) -> str:
+        return '⬆️' if self.change_pct > 0 else '⬇️'
+    
+    def __getitem__(self, key: str):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+    
+    def get(self, key: str, default=None):
+        return getattr(self, key, default)
+    
+    def to_dict(self) -> Dict:
+        """Словарь в прежнем формате (для JSON-ответов)"""
+        return {
+            'row': self.row,
+            'col_today': self.col_today,
+            'col_yesterday': self.col_yesterday,
+            'metric': self.metric,
+            'product': self.product,
+            'yesterday_value': self.yesterday_value,
+            'today_value': self.today_value,
+            'change_pct': self.change_pct,
+            'category': self.category,
+            'threshold': self.threshold,
+            'direction': self.direction
+        }
+    
+    def __repr__(self) -> str:
+        return f"Anomaly(row={self.row}, metric={self.metric!r}, change_pct={self.change_pct}, category={self.category!r})"
+
+# Элемент кучи: (-|change_pct|, порядковый номер, запись) - наверху самое сильное изменение
+HeapEntry = Tuple[float, int, Anomaly]
+
+def _heap_top(heaps: Iterable[List[HeapEntry]], k: Optional[int],
+              accept: Optional[Callable[[Anomaly], bool]] = None) -> Iterator[Anomaly]:
+    """Первые k записей объединения куч по убыванию |change_pct|
+    
+    Обход идет от корней: в кандидатах только дети уже выданных элементов,
+    поэтому куча целиком не сортируется.
+    """
+    frontier = []
+    for heap_id, heap in enumerate(heaps):
+        if heap:
+            frontier.append((heap[0][0], heap[0][1], heap_id, 0, heap))
+    heapq.heapify(frontier)
+    
+    produced = 0
+    while frontier and (k is None or produced < k):
+        _, _, heap_id, index, heap = heapq.heappop(frontier)
+        for child in (2 * index + 1, 2 * index + 2):
+            if child < len(heap):
+                key, seq, _ = heap[child]
+                heapq.heappush(frontier, (key, seq, heap_id, child, heap))
+        record = heap[index][2]
+        if accept is None or accept(record):
+            produced += 1
+            yield record
+
+class AnomalyStore:
+    """Отклонения одного прогона: кучи по категориям и по товарам"""
+    
+    def __init__(self, anomalies: Iterable[Anomaly] = ()):
+        self._by_category: Dict[str, List[HeapEntry]] = {}
+        self._by_product: Dict[str, List[HeapEntry]] = {}
+        self._count = 0
+        self.extend(anomalies)
+    
+    def add(self, anomaly: Anomaly):
+        entry = (-abs(anomaly.change_pct), self._count, anomaly)
+        heapq.heappush(self._by_category.setdefault(anomaly.category, []), entry)
+        heapq.heappush(self._by_product.setdefault(anomaly.product, []), entry)
+        self._count += 1
+    
+    def extend(self, anomalies: Iterable[Anomaly]):
+        for anomaly in anomalies:
+            self.add(anomaly)
+    
+    def __len__(self) -> int:
+        return self._count
+    
+    def __bool__(self) -> bool:
+        return self._count > 0
+    
+    def __iter__(self) -> Iterator[Anomaly]:
+        """Все отклонения в порядке добавления (порядок строк листа)"""
+        entries = [entry for heap in self._by_category.values() for entry in heap]
+        entries.sort(key=lambda entry: entry[1])
+        return (entry[2] for entry in entries)
+    
+    def categories(self) -> List[str]:
+        """Категории в порядке отчета (известные - первыми)"""
+        known = [category for category in CATEGORY_ORDER if category in self._by_category]
+        return known + sorted(set(self._by_category) - set(known))
+    
+    def counts(self) -> Dict[str, int]:
+        """Количество отклонений по категориям"""
+        counts = {category: 0 for category in CATEGORY_ORDER}
+        counts.update((category, len(heap)) for category, heap in self._by_category.items())
+        return counts
+    
+    def top(self, k: Optional[int] = None, category: Optional[str] = None,
+            product: Optional[str] = None) -> List[Anomaly]:
+        """Худшие k отклонений по |change_pct| (None - все)
+        
+        Args:
+            category: Только эта категория
+            product: Только этот товар
+        """
+        if product is not None:
+            heaps = [self._by_product.get(product, [])]
+            accept = (lambda anomaly: anomaly.category == category) if category is not None else None
+        elif category is not None:
+            heaps = [self._by_category.get(category, [])]
+            accept = None
+        else:
+            heaps = list(self._by_category.values())
+            accept = None
+        return list(_heap_top(heaps, k, accept))
+    
+    def page(self, offset: int = 0, limit: int = 50, category: Optional[str] = None,
+             product: Optional[str] = None) -> List[Anomaly]:
+        """Страница выборки top(): отклонения с offset по offset + limit"""
+        offset = max(0, offset)
+        return self.top(offset + max(0, limit), category, product)[offset:]
+    
+    def ordered(self, limit_per_category: Optional[int] = None) -> Iterator[Anomaly]:
+        """Порядок отчета: категории по важности, внутри - по убыванию |change_pct|"""
+        for category in self.categories():
+            yield from _heap_top([self._by_category[category]], limit_per_category)
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Базовые линии метрик по скользящему окну дат
+
+За один векторный проход по матрице (строки × последние N дат) считаются
+среднее, медиана, стандартное отклонение и число значений для каждой строки.
+rolling_baselines считает то же самое сразу для каждого дня месяца (backfill).
+"""
+
+import warnings
+from typing import List
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from ai_agent.analysis.frame import SheetFrame
+
+class Baselines:
+    """Базовые линии по строкам листа"""
+    
+    __slots__ = ('columns', 'mean', 'median', 'std', 'count')
+    
+    def __init__(self, columns: List[int], mean: np.ndarray, median: np.ndarray,
+                 std: np.ndarray, count: np.ndarray):
+        self.columns = columns
+        self.mean = mean
+        self.median = median
+        self.std = std
+        self.count = count
+    
+    def relative_change(self, values: np.ndarray) -> np.ndarray:
+        """Относительное отклонение значений от среднего (0.15 = +15%)"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return (values - self.mean) / np.abs(self.mean)
+    
+    def delta(self, values: np.ndarray) -> np.ndarray:
+        """Отклонение для правил: при нулевом среднем рост с нуля - 1.0, иначе 0"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(
+                self.mean == 0,
+                np.where(values > 0, 1.0, 0.0),
+                self.relative_change(values)
+            )
+
+def compute_baselines(matrix: np.ndarray, columns: List[int], axis: int = 1) -> Baselines:
+    """Считает базовые линии по матрице (строки × даты), NaN - пропуски
+    
+    Args:
+        axis: Ось дат (2 - для окон rolling_baselines)
+    """
+    count = np.count_nonzero(~np.isnan(matrix), axis=axis)
+    
+    # Строки без значений дают NaN - это ожидаемо, предупреждения не нужны
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        mean = np.nanmean(matrix, axis=axis)
+        median = np.nanmedian(matrix, axis=axis)
+        std = np.nanstd(matrix, axis=axis, ddof=1)
+    
+    return Baselines(columns, mean, median, std, count)
+
+def rolling_baselines(matrix: np.ndarray, columns: List[int], window: int) -> Baselines:
+    """Базовые линии для каждого дня: окно из window дат строго до него
+    
+    Матрица дополняется слева window колонками NaN, окна - представления
+    без копирования (sliding_window_view). Результат - массивы строки × дни:
+    колонка j совпадает с frame_baselines(frame, columns[:j], window).
+    
+    Args:
+        matrix: Значения (строки × даты) в хронологическом порядке
+        columns: Колонки листа для дат матрицы
+        window: Размер окна (количество дат)
+    """
+    rows, days = matrix.shape
+    padded = np.concatenate([np.full((rows, window), np.nan), matrix], axis=1)
+    windows = sliding_window_view(padded, window, axis=1)[:, :days]
+    return compute_baselines(windows, list(columns), axis=2)
+
+def frame_baselines(frame: SheetFrame, history_columns: List[int], window: int) -> Baselines:
+    """Базовые линии по последним window колонкам истории листа
+    
+    Args:
+        frame: Колоночная модель листа
+        history_columns: Колонки дат до текущей, в хронологическом порядке
+        window: Размер окна (количество дат)
+    """
+    columns = list(history_columns[-window:])
+    return compute_baselines(frame.matrix(columns), columns)
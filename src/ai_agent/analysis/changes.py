@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Изменения "сегодня против вчера" по строкам листа
+
+Функции работают и с векторами (одна пара дат), и с матрицами
+(строки × дни): при backfill изменения всех соседних дней месяца
+считаются одним векторным выражением.
+"""
+
+from typing import Optional
+
+import numpy as np
+
+def comparable(has_metric: np.ndarray, today: np.ndarray, yesterday: np.ndarray) -> np.ndarray:
+    """Маска сравнимых значений: есть метрика, оба значения заполнены и не оба нулевые
+    
+    Args:
+        has_metric: Маска строк с метрикой (по строкам)
+        today: Значения текущего дня (вектор или матрица строки × дни)
+        yesterday: Значения предыдущего дня той же формы
+    """
+    if today.ndim == 2:
+        has_metric = has_metric[:, None]
+    return (has_metric
+            & ~np.isnan(today) & ~np.isnan(yesterday)
+            & ~((today == 0) & (yesterday == 0)))
+
+def change_percent(today: np.ndarray, yesterday: np.ndarray,
+                   from_zero: Optional[np.ndarray] = None) -> np.ndarray:
+    """Изменение в процентах относительно вчера
+    
+    Args:
+        from_zero: Изменение при нулевом вчера (по умолчанию рост с нуля - 100%)
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(
+            yesterday == 0,
+            100.0 if from_zero is None else from_zero,
+            (today - yesterday) / np.abs(yesterday) * 100
+        )
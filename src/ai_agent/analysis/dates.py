@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Ось дат листа: колонки с датами из строки заголовков
+
+Строка заголовков разбирается один раз: даты ищутся в ячейках
+("01.08.2025", "1.8.25", "2025-08-01", "Пн 01.08.2025") и складываются в
+отсортированные массивы (дата, колонка). Запросы "последние N дат",
+"колонка даты D" и "диапазон дат" - бинарный поиск, O(log n).
+
+Оси кэшируются по содержимому строки заголовков: пока в листе не появилась
+новая колонка, повторные вызовы (анализ, backfill, несколько листов)
+получают готовую ось без регулярных выражений и разбора дат.
+"""
+
+import re
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from datetime import date
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple, Union
+
+# Дата в ячейке заголовка: DD.MM.YYYY, DD.MM.YY или YYYY-MM-DD
+DATE_PATTERN = re.compile(r'\d{1,2}\.\d{1,2}\.\d{2,4}|\d{4}-\d{1,2}-\d{1,2}')
+
+# Сколько осей (разных строк заголовков) держать в памяти
+AXIS_CACHE_SIZE = 64
+
+@lru_cache(maxsize=4096)
+def parse_date(text: str) -> Optional[date]:
+    """Дата из строки 'DD.MM.YYYY', 'DD.MM.YY' или 'YYYY-MM-DD' (None, если не дата)
+    
+    Двузначный год трактуется как в strptime('%y'): 69-99 → 19xx, 00-68 → 20xx.
+    """
+    try:
+        if '-' in text:
+            year, month, day = text.split('-')
+        else:
+            day, month, year = text.split('.')
+            if len(year) == 2:
+                year = int(year)
+                year += 1900 if year >= 69 else 2000
+            elif len(year) != 4:
+                return None
+        return date(int(year), int(month), int(day))
+    except ValueError:
+        return None
+
+DateLike = Union[date, str]
+
+def to_date(value: DateLike) -> date:
+    """Дата из date или строки (ValueError, если строка - не дата)"""
+    if isinstance(value, date):
+        return value
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValueError(f"Не удалось разобрать дату: {value}")
+    return parsed
+
+class DateAxis:
+    """Колонки с датами листа, отсортированные по дате
+    
+    При одинаковых датах сохраняется порядок колонок в листе.
+    """
+    
+    __slots__ = ('dates', 'columns', 'labels', '_ordinals')
+    
+    def __init__(self, headers: Sequence):
+        found = []
+        for col, header in enumerate(headers):
+            if not header:
+                continue
+            match = DATE_PATTERN.search(str(header))
+            if match is None:
+                continue
+            label = match.group()
+            parsed = parse_date(label)
+            if parsed is not None:
+                found.append((parsed, col, label))
+        # Сортировка устойчивая: при равных датах - порядок колонок
+        found.sort(key=lambda item: item[0])
+        
+        self.dates: List[date] = [item[0] for item in found]
+        self.columns: List[int] = [item[1] for item in found]
+        self.labels: List[str] = [item[2] for item in found]
+        self._ordinals: List[int] = [day.toordinal() for day in self.dates]
+    
+    def __len__(self) -> int:
+        return len(self.columns)
+    
+    def items(self) -> List[Tuple[int, str]]:
+        """Все (колонка, дата_строка) по возрастанию даты"""
+        return list(zip(self.columns, self.labels))
+    
+    def last(self, n: int) -> List[Tuple[int, str]]:
+        """Последние n дат: [(колонка, дата_строка)], самая свежая - в конце"""
+        if n <= 0:
+            return []
+        return list(zip(self.columns[-n:], self.labels[-n:]))
+    
+    def last_columns(self, n: int) -> List[int]:
+        """Колонки последних n дат"""
+        return self.columns[-n:] if n > 0 else []
+    
+    def column(self, day: DateLike) -> Optional[int]:
+        """Колонка даты day (если дата повторяется - самая правая по порядку)"""
+        ordinal = to_date(day).toordinal()
+        index = bisect_right(self._ordinals, ordinal) - 1
+        if index >= 0 and self._ordinals[index] == ordinal:
+            return self.columns[index]
+        return None
+    
+    def index_range(self, start: Optional[DateLike] = None,
+                    end: Optional[DateLike] = None) -> range:
+        """Позиции дат оси в диапазоне [start, end] (границы включительно, None - без границы)"""
+        lo = 0 if start is None else bisect_left(self._ordinals, to_date(start).toordinal())
+        hi = len(self._ordinals) if end is None else bisect_right(self._ordinals, to_date(end).toordinal())
+        return range(lo, max(lo, hi))
+    
+    def between(self, start: Optional[DateLike] = None,
+                end: Optional[DateLike] = None) -> List[Tuple[int, str]]:
+        """Даты в диапазоне [start, end] (границы включительно, None - без границы)"""
+        indices = self.index_range(start, end)
+        return list(zip(self.columns[indices.start:indices.stop], self.labels[indices.start:indices.stop]))
+    
+    @property
+    def first_date(self) -> Optional[date]:
+        return self.dates[0] if self.dates else None
+    
+    @property
+    def last_date(self) -> Optional[date]:
+        return self.dates[-1] if self.dates else None
+    
+    @classmethod
+    def for_headers(cls, headers: Sequence) -> 'DateAxis':
+        """Ось для строки заголовков (из кэша, если такая строка уже встречалась)"""
+        key = tuple('' if header is None else str(header) for header in headers)
+        with _cache_lock:
+            axis = _axis_cache.get(key)
+            if axis is not None:
+                _axis_cache.move_to_end(key)
+                return axis
+        axis = cls(headers)
+        with _cache_lock:
+            _axis_cache[key] = axis
+            while len(_axis_cache) > AXIS_CACHE_SIZE:
+                _axis_cache.popitem(last=False)
+        return axis
+
+_axis_cache: 'OrderedDict[Tuple[str, ...], DateAxis]' = OrderedDict()
+_cache_lock = threading.Lock()
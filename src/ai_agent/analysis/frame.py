@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Колоночная модель листа месяца на базе NumPy
+
+Структура листа:
+- Строки 1-2: Заголовки (даты и описание)
+- Строки 3+: Метрики по товарам (колонка A - метрика, колонка B - товар)
+- Колонки с датами справа от колонок метрики/товара
+"""
+
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ai_agent.analysis.numbers import parse_array
+from ai_agent.analysis.rows import RowIndex
+from ai_agent.telemetry import telemetry
+
+# Колонки с названием метрики и товара
+METRIC_COL = 0
+PRODUCT_COL = 1
+
+class SheetFrame:
+    """Лист, разобранный в float64-колонки с индексом метрик и товаров
+    
+    Значения колонки парсятся один раз при первом обращении и кэшируются.
+    Пустые и нечисловые ячейки хранятся как NaN.
+    """
+    
+    def __init__(self, headers: List, metrics: List[str], products: List[str],
+                 cells: Callable[[int], Iterable], header_rows: int = 2):
+        """
+        Args:
+            headers: Первая строка листа (заголовки с датами)
+            metrics: Названия метрик по строкам данных
+            products: Названия товаров по строкам данных
+            cells: Функция, возвращающая сырые значения колонки по строкам данных
+            header_rows: Количество строк заголовка перед данными
+        """
+        self.headers = headers
+        self.header_rows = header_rows
+        self.metrics = metrics
+        self.products = products
+        self._cells = cells
+        self._columns: Dict[int, np.ndarray] = {}
+        
+        # Номера строк в листе (с 1, как в Google Sheets)
+        self.row_numbers = np.arange(header_rows + 1, header_rows + 1 + len(metrics))
+        self.has_metric = np.array([bool(name) for name in self.metrics], dtype=bool)
+        
+        # Индексы: (метрика, товар) → позиции строк (один проход), метрика → позиции строк
+        self.row_index = RowIndex(list(zip(self.metrics, self.products)), header_rows + 1)
+        self.key_index: Dict[Tuple[str, str], np.ndarray] = {}
+        metric_positions: Dict[str, List[int]] = {}
+        for key, positions in self.row_index.items():
+            self.key_index[key] = np.array(positions, dtype=np.intp)
+            metric_positions.setdefault(key[0], []).extend(positions)
+        self.metric_index: Dict[str, np.ndarray] = {
+            metric: np.sort(np.array(positions, dtype=np.intp))
+            for metric, positions in metric_positions.items()
+        }
+    
+    @classmethod
+    def from_values(cls, data: List[List], header_rows: int = 2) -> 'SheetFrame':
+        """Создает модель из ответа read_range (список строк)"""
+        headers = data[0] if data else []
+        rows = data[header_rows:]
+        
+        metrics = [str(row[METRIC_COL]).strip() if len(row) > METRIC_COL else "" for row in rows]
+        products = [str(row[PRODUCT_COL]).strip() if len(row) > PRODUCT_COL else "" for row in rows]
+        
+        def cells(col: int) -> Iterable:
+            return (row[col] if col < len(row) else None for row in rows)
+        
+        return cls(headers, metrics, products, cells, header_rows)
+    
+    @classmethod
+    def from_columns(cls, headers: List, columns: Dict[int, List],
+                     header_rows: int = 2) -> 'SheetFrame':
+        """Создает модель из колонок (ответ read_columns, с первой строки листа)
+        
+        Колонки, которых нет в columns, считаются пустыми.
+        """
+        n_rows = max((len(values) for values in columns.values()), default=header_rows) - header_rows
+        n_rows = max(n_rows, 0)
+        
+        def cells(col: int) -> List:
+            values = columns.get(col, [])[header_rows:]
+            return values + [None] * (n_rows - len(values))
+        
+        metrics = [str(value).strip() if value else "" for value in cells(METRIC_COL)]
+        products = [str(value).strip() if value else "" for value in cells(PRODUCT_COL)]
+        
+        return cls(headers, metrics, products, cells, header_rows)
+    
+    @classmethod
+    def from_arrays(cls, headers: List, metrics: List[str], products: List[str],
+                    columns: Dict[int, np.ndarray], header_rows: int = 2) -> 'SheetFrame':
+        """Создает модель из уже разобранных float64-колонок (локальная история)
+        
+        Колонки, которых нет в columns, считаются пустыми.
+        """
+        n_rows = len(metrics)
+        frame = cls(headers, metrics, products, lambda col: [None] * n_rows, header_rows)
+        frame._columns.update(columns)
+        return frame
+    
+    def extend(self, headers: List, columns: Dict[int, np.ndarray]) -> 'SheetFrame':
+        """Копия модели с новыми заголовками и дополнительными готовыми колонками
+        
+        Остальные колонки берутся из исходной модели (уже разобранные - без
+        повторного разбора).
+        """
+        frame = SheetFrame(headers, self.metrics, self.products, self._cells, self.header_rows)
+        frame._columns.update(self._columns)
+        frame._columns.update(columns)
+        return frame
+    
+    def __len__(self) -> int:
+        return len(self.metrics)
+    
+    def column(self, col: int) -> np.ndarray:
+        """Возвращает колонку как float64-массив (NaN для пустых значений)"""
+        values = self._columns.get(col)
+        if values is None:
+            with telemetry.span('parse_column'):
+                values = parse_array(self._cells(col))
+            telemetry.increment('cells_parsed', len(values))
+            self._columns[col] = values
+        return values
+    
+    def mask(self, col: int) -> np.ndarray:
+        """Маска заполненных (числовых) значений колонки"""
+        return ~np.isnan(self.column(col))
+    
+    def matrix(self, cols: Sequence[int]) -> np.ndarray:
+        """Матрица (строки × колонки) для набора колонок"""
+        if not cols:
+            return np.empty((len(self), 0), dtype=np.float64)
+        return np.column_stack([self.column(col) for col in cols])
+    
+    def map_metrics(self, func: Callable[[str], float], default: float = np.nan) -> np.ndarray:
+        """Вычисляет func один раз на уникальную метрику и раскладывает по строкам"""
+        result = np.full(len(self), default, dtype=np.float64)
+        for metric, positions in self.metric_index.items():
+            result[positions] = func(metric)
+        return result
+    
+    def rows_for(self, metric: str, product: Optional[str] = None) -> np.ndarray:
+        """Позиции строк метрики (и товара, если указан)"""
+        empty = np.empty(0, dtype=np.intp)
+        if product is None:
+            return self.metric_index.get(metric, empty)
+        return self.key_index.get((metric, product), empty)
+    
+    def row(self, metric: str, product: str = '', occurrence: int = 0) -> Optional[int]:
+        """Номер строки листа (с 1) для ключа (метрика, товар) или None"""
+        return self.row_index.row(metric, product, occurrence)
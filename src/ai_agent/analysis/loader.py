@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Чтение листа месяца из Google Sheets в колоночную модель
+
+Общий загрузчик анализаторов: весь заполненный прямоугольник листа или
+только колонки метрики/товара и последних N дат. Если дат листа не хватает
+анализу (начало месяца), к нему приклеиваются последние даты листа
+предыдущего месяца (ai_agent.analysis.stitch).
+"""
+
+from typing import List, Optional
+
+from ai_agent.analysis.dates import DateAxis
+from ai_agent.analysis.frame import METRIC_COL, PRODUCT_COL, SheetFrame
+from ai_agent.analysis.stitch import previous_month_sheet, stitch_frames
+from ai_agent.google.sheets import sheets
+from ai_agent.log import get_logger
+
+logger = get_logger(__name__)
+
+def read_frame(sheet_name: str, recent_days: Optional[int] = None,
+               min_dates: int = 0) -> Optional[SheetFrame]:
+    """Читает лист в колоночную модель
+    
+    Без recent_days читается весь заполненный прямоугольник листа.
+    С recent_days - только колонки метрики/товара и последних N дат.
+    
+    Args:
+        min_dates: Сколько дат нужно анализу; недостающие берутся с конца
+            листа предыдущего месяца (0 - без склейки)
+    
+    Returns:
+        Optional[SheetFrame]: Лист или None, если в нем нет строк данных
+    """
+    if not recent_days:
+        data = sheets.read_used_range(sheet_name)
+        if not data or len(data) < 3:
+            return None
+        return stitch_previous(SheetFrame.from_values(data), sheet_name, min_dates)
+    
+    headers = sheets.read_header(sheet_name)
+    recent_columns = DateAxis.for_headers(headers).last_columns(recent_days)
+    
+    # Высота открыта: rowCount из кэша метаданных устаревает при дописывании листа
+    columns = sheets.read_columns(sheet_name, [METRIC_COL, PRODUCT_COL] + recent_columns)
+    frame = SheetFrame.from_columns(headers, columns)
+    if not len(frame):
+        return None
+    return stitch_previous(frame, sheet_name, min_dates, recent_days)
+
+def read_previous_tail(sheet_name: str, days: int,
+                       titles: Optional[List[str]] = None) -> Optional[SheetFrame]:
+    """Ключевые колонки и последние days дат листа предыдущего месяца
+    
+    Args:
+        titles: Названия листов таблицы (None - из кэша метаданных)
+    
+    Returns:
+        Optional[SheetFrame]: None, если листа предыдущего месяца нет
+    """
+    previous = previous_month_sheet(sheet_name, sheets.get_sheet_titles() if titles is None else titles)
+    if previous is None:
+        return None
+    logger.info("Склейка с листом '%s' (дат: %s)", previous, days)
+    headers = sheets.read_header(previous)
+    tail = DateAxis.for_headers(headers).last_columns(days)
+    columns = sheets.read_columns(previous, [METRIC_COL, PRODUCT_COL] + tail)
+    return SheetFrame.from_columns(headers, columns) if columns else None
+
+def stitch_previous(frame: Optional[SheetFrame], sheet_name: str, min_dates: int,
+                    recent_days: Optional[int] = None) -> Optional[SheetFrame]:
+    """Дополняет лист датами предыдущего месяца до min_dates дат
+    
+    Args:
+        recent_days: Сколько последних дат листа прочитано (None - все)
+    """
+    if frame is None or min_dates <= 0:
+        return frame
+    available = len(DateAxis.for_headers(frame.headers))
+    if recent_days:
+        available = min(available, recent_days)
+    days = min_dates - available
+    if days <= 0:
+        return frame
+    previous = read_previous_tail(sheet_name, days)
+    return stitch_frames(frame, [previous], days) if previous is not None else frame
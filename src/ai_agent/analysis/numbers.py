@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Парсинг чисел из отформатированных значений ячеек Google Sheets
+
+Поддерживаемые форматы: "1234", "1 234,5", "12,5%", "-3.7", значения
+с неразрывными пробелами. Из строки извлекается первое найденное число.
+"""
+
+import re
+from functools import lru_cache
+from typing import Iterable, List, Optional
+
+import numpy as np
+
+# Размер памяти для повторяющихся строк ("0", "0%", "1 234,5" и т.п.)
+NUMBER_CACHE_SIZE = 8192
+
+_NUMBER_RE = re.compile(r'-?\d+\.?\d*')
+
+# Убираем все виды пробелов и %, заменяем запятые на точки — одним проходом
+_CLEAN_TABLE = str.maketrans({' ': None, '\xa0': None, '%': None, ',': '.'})
+
+@lru_cache(maxsize=NUMBER_CACHE_SIZE)
+def _parse_text(text: str) -> Optional[float]:
+    """Парсит непустую строку (результат кэшируется)"""
+    # Быстрый путь: целое число без форматирования
+    if text.isdigit() and text.isascii():
+        return float(text)
+    
+    match = _NUMBER_RE.search(text.translate(_CLEAN_TABLE))
+    if match:
+        try:
+            return float(match.group())
+        except ValueError:
+            return None
+    return None
+
+def parse_number(value) -> Optional[float]:
+    """Парсит число из строки с учетом форматирования"""
+    if not value:
+        return None
+    # Строки из одних пробелов тоже дают None (и попадают в кэш)
+    return _parse_text(value if isinstance(value, str) else str(value))
+
+def parse_numbers(values: Iterable) -> List[Optional[float]]:
+    """Парсит строку или колонку значений за один вызов"""
+    parse = _parse_text
+    return [
+        (parse(value) if value.__class__ is str else parse_number(value)) if value else None
+        for value in values
+    ]
+
+def parse_array(values: Iterable) -> np.ndarray:
+    """Парсит значения в float64-массив (NaN для пустых и нечисловых)"""
+    # NumPy приводит None к NaN при dtype=float64
+    return np.array(parse_numbers(values), dtype=np.float64)
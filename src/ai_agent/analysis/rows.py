@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Индекс строк листа по ключу (метрика, товар)
+
+Строка метрики определяется ключом (колонки A и B), а не позицией: если
+менеджер вставил или переставил товары, кэшированные колонки, история и
+номера строк для подсветки переносятся по ключу. Индекс строится за один
+проход по ключевым колонкам, поиск строки - O(1) по хешу ключа.
+
+update() переводит индекс на новый порядок строк: общие начало и конец
+листа сравниваются напрямую, по хешу сопоставляется только измененная
+середина (вставленные, удаленные и переставленные строки).
+"""
+
+import json
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+RowKey = Tuple[str, str]
+
+# Ключ пустой строки (без метрики) - в индекс не попадает
+EMPTY_KEY: RowKey = ('', '')
+
+def row_keys(metrics: Iterable, products: Iterable) -> List[RowKey]:
+    """Ключи строк из колонок метрики и товара (значения как в SheetFrame)"""
+    return [
+        (str(metric).strip() if metric else '', str(product).strip() if product else '')
+        for metric, product in zip(metrics, products)
+    ]
+
+class RowIndex:
+    """(метрика, товар) → позиции строк данных (повторы ключа - по порядку)"""
+    
+    __slots__ = ('keys', 'first_row', '_positions')
+    
+    def __init__(self, keys: Sequence[RowKey], first_row: int = 3):
+        """
+        Args:
+            keys: Ключ каждой строки данных по порядку (EMPTY_KEY - пустая строка)
+            first_row: Номер первой строки данных в листе (с 1)
+        """
+        self.keys: List[RowKey] = [tuple(key) for key in keys]
+        self.first_row = first_row
+        self._positions: Dict[RowKey, List[int]] = {}
+        self._add(0)
+    
+    def _add(self, start: int):
+        """Индексирует строки начиная с позиции start"""
+        positions = self._positions
+        for pos in range(start, len(self.keys)):
+            key = self.keys[pos]
+            if key[0]:
+                positions.setdefault(key, []).append(pos)
+    
+    @classmethod
+    def from_frame(cls, frame) -> 'RowIndex':
+        """Индекс строк SheetFrame"""
+        return cls(list(zip(frame.metrics, frame.products)), frame.header_rows + 1)
+    
+    @classmethod
+    def from_columns(cls, metrics: List, products: List, header_rows: int = 2) -> 'RowIndex':
+        """Индекс по колонкам метрики и товара (ответ read_columns, с первой строки листа)"""
+        metrics, products = list(metrics[header_rows:]), list(products[header_rows:])
+        size = max(len(metrics), len(products))
+        metrics += [None] * (size - len(metrics))
+        products += [None] * (size - len(products))
+        return cls(row_keys(metrics, products), header_rows + 1)
+    
+    def __len__(self) -> int:
+        return len(self.keys)
+    
+    def __contains__(self, key: RowKey) -> bool:
+        return tuple(key) in self._positions
+    
+    def items(self):
+        """Пары (ключ, позиции строк) - позиции по возрастанию"""
+        return self._positions.items()
+    
+    def position(self, metric: str, product: str = '', occurrence: int = 0) -> Optional[int]:
+        """Позиция строки данных с ключом (occurrence - номер повтора ключа)"""
+        positions = self._positions.get((metric, product))
+        if positions is None or occurrence >= len(positions):
+            return None
+        return positions[occurrence]
+    
+    def row(self, metric: str, product: str = '', occurrence: int = 0) -> Optional[int]:
+        """Номер строки листа (с 1) для ключа или None"""
+        pos = self.position(metric, product, occurrence)
+        return None if pos is None else pos + self.first_row
+    
+    def update(self, keys: Sequence[RowKey]) -> np.ndarray:
+        """Переводит индекс на новый порядок строк
+        
+        Returns:
+            np.ndarray: Новая позиция каждой прежней строки (-1 - строка удалена
+                или пустая)
+        """
+        old, new = self.keys, [tuple(key) for key in keys]
+        limit = min(len(old), len(new))
+        prefix = 0
+        while prefix < limit and old[prefix] == new[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < limit - prefix and old[-1 - suffix] == new[-1 - suffix]:
+            suffix += 1
+        
+        remap = np.full(len(old), -1, dtype=np.intp)
+        remap[:prefix] = np.arange(prefix)
+        if suffix:
+            remap[len(old) - suffix:] = np.arange(len(new) - suffix, len(new))
+        
+        # Середина: строки сопоставляются по хешу ключа, повторы - по порядку
+        moved: Dict[RowKey, List[int]] = {}
+        for pos in range(prefix, len(new) - suffix):
+            moved.setdefault(new[pos], []).append(pos)
+        for pos in range(prefix, len(old) - suffix):
+            candidates = moved.get(old[pos])
+            if candidates and old[pos][0]:
+                remap[pos] = candidates.pop(0)
+        
+        # Индекс пересобирается только для строк после общего начала
+        for key in set(old[prefix:]):
+            positions = self._positions.get(key)
+            if positions is None:
+                continue
+            kept = [pos for pos in positions if pos < prefix]
+            if kept:
+                self._positions[key] = kept
+            else:
+                del self._positions[key]
+        self.keys = new
+        self._add(prefix)
+        
+        remap[[pos for pos in range(len(old)) if not old[pos][0]]] = -1
+        return remap
+    
+    def added(self, remap: np.ndarray) -> List[int]:
+        """Позиции строк с ключом, которых не было до update (вставленные строки)"""
+        targets = set(remap[remap >= 0].tolist())
+        return [pos for pos, key in enumerate(self.keys) if key[0] and pos not in targets]
+    
+    def to_json(self) -> str:
+        return json.dumps({'first_row': self.first_row, 'keys': self.keys}, ensure_ascii=False)
+    
+    @classmethod
+    def from_json(cls, text: str) -> 'RowIndex':
+        data = json.loads(text)
+        return cls([tuple(key) for key in data['keys']], data['first_row'])
+
+def realign(values: List, remap: np.ndarray, size: int, header_rows: int = 2) -> List:
+    """Переставляет значения колонки (с первой строки листа) по remap из RowIndex.update
+    
+    Args:
+        values: Колонка в прежнем порядке строк
+        remap: Новая позиция каждой прежней строки данных
+        size: Количество строк данных в новом порядке
+    """
+    result = list(values[:header_rows]) + [None] * (header_rows - len(values[:header_rows])) + [None] * size
+    for pos, value in enumerate(values[header_rows:]):
+        target = remap[pos] if pos < len(remap) else -1
+        if target >= 0:
+            result[header_rows + target] = value
+    # Хвостовые пустые ячейки API не возвращает - не храним их и в кэше
+    while len(result) > header_rows and result[-1] is None:
+        result.pop()
+    return result
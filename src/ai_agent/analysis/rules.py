@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Индексированный движок правил листа Algorithm
+
+Правила компилируются в индекс по метрике (и по паре блок/метрика),
+а каждый condition_type - в векторный предикат, который проверяет сразу
+все строки метрики. Новые типы условий подключаются через
+@register_condition без изменения индекса.
+"""
+
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+class RuleContext:
+    """Векторы значений по строкам, против которых проверяются правила"""
+    
+    __slots__ = ('delta', 'samples', 'value', 'mean', 'std')
+    
+    def __init__(self, delta: np.ndarray, samples: np.ndarray, value: np.ndarray,
+                 mean: np.ndarray = None, std: np.ndarray = None):
+        """
+        Args:
+            delta: Относительное изменение (0.15 = +15%)
+            samples: Количество значений в базовой линии
+            value: Текущее значение метрики
+            mean: Среднее базовой линии (если посчитано)
+            std: Стандартное отклонение базовой линии (если посчитано)
+        """
+        self.delta = delta
+        self.samples = samples
+        self.value = value
+        self.mean = mean
+        self.std = std
+    
+    def take(self, positions: np.ndarray) -> 'RuleContext':
+        """Подвыборка векторов по позициям строк"""
+        return RuleContext(
+            self.delta[positions],
+            self.samples[positions],
+            self.value[positions],
+            None if self.mean is None else self.mean[positions],
+            None if self.std is None else self.std[positions]
+        )
+
+# Предикат: (правило, контекст) → булева маска сработавших строк
+ConditionPredicate = Callable[[Dict, RuleContext], np.ndarray]
+
+CONDITIONS: Dict[str, ConditionPredicate] = {}
+
+def register_condition(condition_type: str):
+    """Регистрирует векторный предикат для condition_type"""
+    def decorator(predicate: ConditionPredicate) -> ConditionPredicate:
+        CONDITIONS[condition_type] = predicate
+        return predicate
+    return decorator
+
+@register_condition('ratio')
+def _ratio_condition(rule: Dict, context: RuleContext) -> np.ndarray:
+    """Падение не меньше drop_pct (delta отрицательно при падении)"""
+    return (context.samples >= rule['min_samples']) & (context.delta <= -rule['drop_pct'])
+
+@register_condition('rise')
+def _rise_condition(rule: Dict, context: RuleContext) -> np.ndarray:
+    """Рост не меньше rise_pct"""
+    rise_pct = rule['condition_params'].get('rise_pct', rule['drop_pct'])
+    return (context.samples >= rule['min_samples']) & (context.delta >= rise_pct)
+
+@register_condition('absolute')
+def _absolute_condition(rule: Dict, context: RuleContext) -> np.ndarray:
+    """Значение вышло за границы min/max"""
+    params = rule['condition_params']
+    mask = np.zeros(len(context.value), dtype=bool)
+    if 'min' in params:
+        mask |= context.value < float(params['min'])
+    if 'max' in params:
+        mask |= context.value > float(params['max'])
+    return mask
+
+@register_condition('zscore')
+def _zscore_condition(rule: Dict, context: RuleContext) -> np.ndarray:
+    """Отклонение от среднего базовой линии больше z стандартных отклонений"""
+    if context.mean is None or context.std is None:
+        return np.zeros(len(context.value), dtype=bool)
+    
+    z = float(rule['condition_params'].get('z', 3))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scores = np.abs(context.value - context.mean) / context.std
+    return (context.samples >= rule['min_samples']) & (context.std > 0) & (scores >= z)
+
+class RuleIndex:
+    """Правила, сгруппированные по метрике (и блоку) с готовыми предикатами"""
+    
+    def __init__(self, rules: List[Dict]):
+        self.source = rules
+        self._by_metric: Dict[str, List[Tuple[Dict, ConditionPredicate]]] = {}
+        self._by_block: Dict[Tuple[str, str], List[Tuple[Dict, ConditionPredicate]]] = {}
+        self.unknown_conditions = set()
+        
+        # Порядок правил внутри метрики сохраняется: срабатывает первое подходящее
+        for rule in rules:
+            predicate = CONDITIONS.get(rule['condition_type'])
+            if predicate is None:
+                self.unknown_conditions.add(rule['condition_type'])
+                continue
+            compiled = (rule, predicate)
+            self._by_metric.setdefault(rule['metric'], []).append(compiled)
+            self._by_block.setdefault((rule.get('block', ''), rule['metric']), []).append(compiled)
+    
+    def __contains__(self, metric: str) -> bool:
+        return metric in self._by_metric
+    
+    def candidates(self, metric: str, block: Optional[str] = None) -> List[Tuple[Dict, ConditionPredicate]]:
+        """Правила метрики (только блока block, если он указан)"""
+        if block is None:
+            return self._by_metric.get(metric, [])
+        return self._by_block.get((block, metric), [])
+    
+    def match_positions(self, metric: str, positions: np.ndarray, context: RuleContext,
+                        block: Optional[str] = None) -> List[Tuple[int, Dict]]:
+        """Проверяет строки одной метрики против всех ее правил разом
+        
+        Args:
+            metric: Название метрики
+            positions: Позиции строк метрики
+            context: Полные векторы (по всем строкам листа)
+            block: Блок правил (None - любой)
+        
+        Returns:
+            List[Tuple[int, Dict]]: (позиция_строки, первое сработавшее правило)
+        """
+        candidates = self.candidates(metric, block)
+        if not candidates or not len(positions):
+            return []
+        
+        local = context.take(positions)
+        unmatched = np.ones(len(positions), dtype=bool)
+        matches = []
+        for rule, predicate in candidates:
+            hits = unmatched & predicate(rule, local)
+            if hits.any():
+                matches.extend((int(positions[i]), rule) for i in np.flatnonzero(hits))
+                unmatched &= ~hits
+                if not unmatched.any():
+                    break
+        return matches
+    
+    def match_index(self, metric_index: Dict[str, np.ndarray], valid: np.ndarray,
+                    context: RuleContext, block: Optional[str] = None) -> List[Tuple[int, Dict]]:
+        """Проверяет все строки листа (metric_index из SheetFrame)
+        
+        Returns:
+            List[Tuple[int, Dict]]: (позиция_строки, правило), отсортировано по позиции
+        """
+        matches = []
+        for metric, positions in metric_index.items():
+            if metric not in self._by_metric:
+                continue
+            matches.extend(self.match_positions(metric, positions[valid[positions]], context, block))
+        matches.sort(key=lambda match: match[0])
+        return matches
+    
+    def match_one(self, metric: str, delta: float, samples: int, value: float = np.nan,
+                  block: Optional[str] = None) -> Optional[Dict]:
+        """Проверяет одно значение (совместимость с построчным match_rule)"""
+        context = RuleContext(
+            np.array([delta], dtype=np.float64),
+            np.array([samples], dtype=np.float64),
+            np.array([value], dtype=np.float64)
+        )
+        matches = self.match_positions(metric, np.array([0], dtype=np.intp), context, block)
+        return matches[0][1] if matches else None
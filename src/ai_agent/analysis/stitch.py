@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Сквозные ряды через границу листов месяцев
+
+Каждый месяц живет в своем листе ("Август 2025", "Сентябрь 2025", ...),
+поэтому у первой даты месяца нет "вчера", а окно базовой линии обрывается
+на границе листа. stitch_frames дописывает к листу последние даты
+предыдущих листов: строки сопоставляются по ключу (метрика, товар) через
+хеш-индекс SheetFrame.key_index, а не по номеру строки. Результат - обычный
+SheetFrame текущего листа, у которого frame.matrix(axis.columns) - одна
+непрерывная матрица через границу месяцев.
+
+Даты предыдущих листов получают виртуальные номера колонок за правым краем
+заголовков текущего листа: номера строк и реальные колонки текущего листа
+(подсветка, ссылки в Signals) не меняются.
+"""
+
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ai_agent.analysis.dates import DateAxis
+from ai_agent.analysis.frame import SheetFrame
+
+# Месяцы в названиях листов ("Август 2025")
+MONTHS = ('январь', 'февраль', 'март', 'апрель', 'май', 'июнь',
+          'июль', 'август', 'сентябрь', 'октябрь', 'ноябрь', 'декабрь')
+
+MONTH_SHEET_PATTERN = re.compile(r'^(' + '|'.join(MONTHS) + r')\s+(\d{4})$', re.IGNORECASE)
+
+def sheet_month(title: str) -> Optional[Tuple[int, int]]:
+    """(год, месяц) листа месяца или None, если название - не 'Месяц Год'"""
+    match = MONTH_SHEET_PATTERN.match(title.strip())
+    if match is None:
+        return None
+    return int(match.group(2)), MONTHS.index(match.group(1).lower()) + 1
+
+def previous_month_sheet(title: str, titles: Sequence[str]) -> Optional[str]:
+    """Лист предыдущего месяца среди titles (None, если его нет)"""
+    month = sheet_month(title)
+    if month is None:
+        return None
+    year, number = month
+    previous = (year, number - 1) if number > 1 else (year - 1, 12)
+    for candidate in titles:
+        if sheet_month(candidate) == previous:
+            return candidate
+    return None
+
+def align_rows(target: SheetFrame, source: SheetFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """Позиции строк source и target с одинаковым ключом (метрика, товар)
+    
+    Повторяющиеся ключи сопоставляются по порядку вхождения. Строки без пары
+    (новый или удаленный товар) пропускаются.
+    
+    Returns:
+        Tuple: (позиции в source, позиции в target)
+    """
+    source_positions: List[np.ndarray] = []
+    target_positions: List[np.ndarray] = []
+    for key, positions in source.key_index.items():
+        matched = target.key_index.get(key)
+        if matched is None:
+            continue
+        count = min(len(positions), len(matched))
+        source_positions.append(positions[:count])
+        target_positions.append(matched[:count])
+    if not source_positions:
+        empty = np.empty(0, dtype=np.intp)
+        return empty, empty
+    return np.concatenate(source_positions), np.concatenate(target_positions)
+
+def stitch_frames(frame: SheetFrame, previous: Sequence[SheetFrame], days: int) -> SheetFrame:
+    """Лист frame, дополненный последними days датами предыдущих листов
+    
+    Args:
+        frame: Текущий лист
+        previous: Предыдущие листы (прочитаны хотя бы ключевые колонки и хвост дат)
+        days: Сколько дат до начала текущего листа добавить
+    
+    Returns:
+        SheetFrame: Тот же лист (строки и колонки), даты предыдущих листов -
+            в виртуальных колонках; без предыдущих дат - сам frame
+    """
+    axis = DateAxis.for_headers(frame.headers)
+    
+    # Даты предыдущих листов строго до первой даты текущего
+    candidates = []
+    for source in previous:
+        source_axis = DateAxis.for_headers(source.headers)
+        for day, col, label in zip(source_axis.dates, source_axis.columns, source_axis.labels):
+            if axis.first_date is None or day < axis.first_date:
+                candidates.append((day, source, col, label))
+    candidates.sort(key=lambda item: item[0])
+    tail = candidates[-days:] if days > 0 else []
+    if not tail:
+        return frame
+    
+    alignment: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+    headers = list(frame.headers)
+    columns = {}
+    for _, source, col, label in tail:
+        if id(source) not in alignment:
+            alignment[id(source)] = align_rows(frame, source)
+        source_positions, target_positions = alignment[id(source)]
+        
+        values = np.full(len(frame), np.nan)
+        values[target_positions] = source.column(col)[source_positions]
+        columns[len(headers)] = values
+        headers.append(label)
+    
+    return frame.extend(headers, columns)
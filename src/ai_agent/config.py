@@ -19,9 +19,15 @@ class Config:
         self.GOOGLE_PROJECT_ID = os.getenv('GOOGLE_PROJECT_ID', 'your-project-id')
         self.GOOGLE_CLIENT_EMAIL = os.getenv('GOOGLE_CLIENT_EMAIL', 'your-service-account@your-project-id.iam.gserviceaccount.com')
         self.GOOGLE_PRIVATE_KEY = os.getenv('GOOGLE_PRIVATE_KEY', '')
+        self.GOOGLE_HTTP_TIMEOUT = float(os.getenv('GOOGLE_HTTP_TIMEOUT', '60'))
+        self.GOOGLE_HTTP_POOL_SIZE = int(os.getenv('GOOGLE_HTTP_POOL_SIZE', '8'))
+        self.DISCOVERY_CACHE_DIR = os.getenv('DISCOVERY_CACHE_DIR', 'reports/.state/discovery')
         
         # Google Sheets
         self.SPREADSHEET_ID = os.getenv('SPREADSHEET_ID', '')
+        # Бэкенд: google - настоящий API, emulator - локальный эмулятор (ai_agent.google.emulator)
+        self.SHEETS_BACKEND = os.getenv('SHEETS_BACKEND', 'google')
+        self.SHEETS_EMULATOR_PATH = os.getenv('SHEETS_EMULATOR_PATH', 'reports/.state/emulator.json')
         
         # Google Drive
         self.DRIVE_FOLDER_ID = os.getenv('DRIVE_FOLDER_ID', '')
@@ -32,6 +38,44 @@ class Config:
         
         # Настройки анализа
         self.minSamplesDefault = int(os.getenv('MIN_SAMPLES_DEFAULT', '7'))
+        self.rollingWindowDays = int(os.getenv('ROLLING_WINDOW_DAYS', '14'))
+        
+        # Склейка начала месяца с последними датами листа предыдущего месяца
+        self.STITCH_MONTHS = os.getenv('STITCH_MONTHS', '1') == '1'
+        
+        # Локальное состояние (watermark'и и кэш колонок)
+        self.STATE_DB_PATH = os.getenv('STATE_DB_PATH', 'reports/.state/agent-state.sqlite3')
+        
+        # Локальная история листов месяцев (Feather, нужен pyarrow)
+        self.HISTORY_DIR = os.getenv('HISTORY_DIR', 'reports/.state/history')
+        
+        # Локальный кэш значений листов
+        self.SHEETS_CACHE_ENABLED = os.getenv('SHEETS_CACHE_ENABLED', '1') == '1'
+        self.SHEETS_CACHE_DIR = os.getenv('SHEETS_CACHE_DIR', 'reports/.state/sheets-cache')
+        self.SHEETS_CACHE_TTL = float(os.getenv('SHEETS_CACHE_TTL', '43200'))  # 12 часов
+        self.SHEETS_CACHE_REVALIDATE = float(os.getenv('SHEETS_CACHE_REVALIDATE', '60'))
+        self.SHEETS_CACHE_MAX_BYTES = int(os.getenv('SHEETS_CACHE_MAX_MB', '50')) * 1024 * 1024
+        
+        # Планировщик запросов к Google API
+        self.SHEETS_QUOTA_PER_MINUTE = float(os.getenv('SHEETS_QUOTA_PER_MINUTE', '60'))
+        self.SHEETS_MAX_RETRIES = int(os.getenv('SHEETS_MAX_RETRIES', '5'))
+        self.SHEETS_BACKOFF_BASE = float(os.getenv('SHEETS_BACKOFF_BASE', '1'))
+        self.SHEETS_BACKOFF_MAX = float(os.getenv('SHEETS_BACKOFF_MAX', '32'))
+        
+        # MCP сервер: сколько инструментов выполняется одновременно
+        self.MCP_MAX_WORKERS = int(os.getenv('MCP_MAX_WORKERS', '4'))
+        
+        # Форматы ежедневного отчета (ai_agent.report): md, csv, json
+        self.REPORT_FORMATS = [name.strip() for name in os.getenv('REPORT_FORMATS', 'md,csv,json').split(',') if name.strip()]
+        
+        # Логирование (ai_agent.log): общий уровень, уровни модулей, формат json или text
+        self.LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+        self.LOG_LEVELS = os.getenv('LOG_LEVELS', '')
+        self.LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')
+        
+        # Телеметрия прогона (сводка метрик в локальном состоянии - не попадает в коммит отчетов)
+        self.TELEMETRY_ENABLED = os.getenv('TELEMETRY_ENABLED', '1') == '1'
+        self.METRICS_DIR = os.getenv('METRICS_DIR', 'reports/.state/metrics')
         
     def validate(self):
         """Проверяет наличие обязательных переменных"""
@@ -47,8 +91,10 @@ class Config:
             missing.append('SPREADSHEET_ID')
         
         if missing:
-            print(f"ERROR: Отсутствуют обязательные переменные: {missing}")
-            print("ERROR: Неверная конфигурация. Проверьте .env файл")
+            from ai_agent.log import get_logger
+            logger = get_logger(__name__)
+            logger.error("Отсутствуют обязательные переменные: %s", missing)
+            logger.error("Неверная конфигурация. Проверьте .env файл")
             return False
         
         return True
@@ -1,13 +1,104 @@
 #!/usr/bin/env python3
 """
 Аутентификация для Google API
+
+Учетные данные сервисного аккаунта загружаются без обращения к сети:
+токен запрашивается лениво при первом запросе и обновляется по истечении.
+httplib2 не потокобезопасен, поэтому каждый запрос на время выполнения
+берет keep-alive соединение из ограниченного пула - один объект сервиса
+можно использовать из нескольких потоков. Сервисы строятся из локального
+discovery-документа.
 """
 
-import json
+import queue
+import threading
+from contextlib import contextmanager
 from pathlib import Path
-from oauth2client.service_account import ServiceAccountCredentials
+from typing import Callable
+
+import google_auth_httplib2
+import httplib2
+from google.oauth2 import service_account
+from googleapiclient.discovery import build_from_document
+from googleapiclient.http import HttpRequest
 
 from ai_agent.config import config
+from ai_agent.google.discovery import discovery_documents
+from ai_agent.log import get_logger
+from ai_agent.telemetry import telemetry
+
+logger = get_logger(__name__)
+
+SCOPES = [
+    'https://www.googleapis.com/auth/spreadsheets',
+    'https://www.googleapis.com/auth/drive.readonly'
+]
+
+TOKEN_URI = 'https://oauth2.googleapis.com/token'
+
+class HttpPool:
+    """Ограниченный пул авторизованных keep-alive соединений
+    
+    Соединения создаются по мере надобности, но не больше size. Когда все
+    заняты, запрос ждет освобождения. Последним отдается самое "теплое"
+    соединение (LIFO) - у него скорее всего жив TCP/TLS-сеанс.
+    """
+    
+    def __init__(self, factory: Callable[[], google_auth_httplib2.AuthorizedHttp], size: int):
+        self.factory = factory
+        self.size = max(1, size)
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+    
+    @contextmanager
+    def lease(self):
+        """Выдает соединение на время блока with"""
+        http = self._acquire()
+        try:
+            yield http
+        finally:
+            self._idle.put(http)
+    
+    def _acquire(self) -> google_auth_httplib2.AuthorizedHttp:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        
+        with self._lock:
+            create = self._created < self.size
+            if create:
+                self._created += 1
+        
+        if not create:
+            return self._idle.get()
+        try:
+            return self.factory()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+
+class PooledHttpRequest(HttpRequest):
+    """Запрос googleapiclient, который берет соединение из пула на время выполнения"""
+    
+    pool: HttpPool = None
+    
+    def execute(self, http=None, num_retries=0):
+        if http is not None or self.pool is None:
+            return super().execute(http=http, num_retries=num_retries)
+        with self.pool.lease() as pooled_http:
+            return super().execute(http=pooled_http, num_retries=num_retries)
+    
+    def count_response(self, postproc: Callable) -> Callable:
+        """Оборачивает разбор ответа: размер тела попадает в телеметрию"""
+        method = (self.methodId or 'unknown').split('.', 1)[-1]
+        
+        def counted(resp, content):
+            telemetry.increment('sheets_response_bytes', len(content or b''), method=method)
+            return postproc(resp, content)
+        return counted
 
 class GoogleAuth:
     """Класс для аутентификации в Google API"""
@@ -16,52 +107,83 @@ class GoogleAuth:
         self.credentials = None
         self.sheets_service = None
         self.drive_service = None
+        self.http_pool = HttpPool(self._create_http, config.GOOGLE_HTTP_POOL_SIZE)
     
     def authenticate(self):
-        """Аутентифицируется в Google API"""
+        """Аутентифицируется в Google API (загружает ключ, токен будет получен при первом запросе)"""
+        with telemetry.span('auth'):
+            return self._authenticate()
+    
+    def _authenticate(self) -> bool:
         try:
-            scopes = [
-                'https://www.googleapis.com/auth/spreadsheets',
-                'https://www.googleapis.com/auth/drive.readonly'
-            ]
-            
             # Приоритет: JSON файл
             json_path = Path(config.GOOGLE_APPLICATION_CREDENTIALS)
             if json_path.exists():
-                print(f"INFO: Используем JSON файл: {json_path}")
-                self.credentials = ServiceAccountCredentials.from_json_keyfile_name(
+                logger.info("Используем JSON файл: %s", json_path)
+                credentials = service_account.Credentials.from_service_account_file(
                     str(json_path),
-                    scopes
+                    scopes=SCOPES
                 )
             else:
                 # Альтернатива: переменные окружения
-                print("INFO: Используем переменные окружения для аутентификации")
+                logger.info("Используем переменные окружения для аутентификации")
                 keyfile_dict = {
                     'type': 'service_account',
                     'project_id': config.GOOGLE_PROJECT_ID,
                     'client_email': config.GOOGLE_CLIENT_EMAIL,
                     'private_key': config.GOOGLE_PRIVATE_KEY.replace('\\n', '\n'),
+                    'token_uri': TOKEN_URI,
                 }
-                self.credentials = ServiceAccountCredentials.from_json_keyfile_dict(
+                credentials = service_account.Credentials.from_service_account_info(
                     keyfile_dict,
-                    scopes
+                    scopes=SCOPES
                 )
             
-            print("SUCCESS: Аутентификация успешна")
-            return True
+            self.credentials = credentials
+            # Соединения пула привязаны к прежним учетным данным
+            self.http_pool = HttpPool(self._create_http, config.GOOGLE_HTTP_POOL_SIZE)
             
+            logger.info("Аутентификация успешна")
+            return True
+        
         except Exception as e:
-            print(f"ERROR: Ошибка аутентификации: {e}")
+            logger.error("Ошибка аутентификации: %s", e)
             return False
     
+    def _create_http(self) -> google_auth_httplib2.AuthorizedHttp:
+        """Создает новое авторизованное keep-alive соединение"""
+        if not self.credentials:
+            self.authenticate()
+        return google_auth_httplib2.AuthorizedHttp(
+            self.credentials,
+            http=httplib2.Http(timeout=config.GOOGLE_HTTP_TIMEOUT)
+        )
+    
+    def _build_request(self, http, *args, **kwargs) -> PooledHttpRequest:
+        """Создает запрос, выполняемый на соединении из пула"""
+        request = PooledHttpRequest(http, *args, **kwargs)
+        request.pool = self.http_pool
+        if telemetry.enabled:
+            request.postproc = request.count_response(request.postproc)
+        return request
+    
+    def _build_service(self, api: str, version: str):
+        """Строит сервис из локального discovery-документа"""
+        with telemetry.span('build_service', api=api):
+            return build_from_document(
+                discovery_documents.get(api, version),
+                # Соединение по умолчанию не используется - запросы берут его из пула
+                http=httplib2.Http(timeout=config.GOOGLE_HTTP_TIMEOUT),
+                requestBuilder=self._build_request
+            )
+    
     def get_sheets_service(self):
         """Возвращает сервис для работы с Google Sheets"""
         if not self.credentials:
             self.authenticate()
         
         if not self.sheets_service:
-            from googleapiclient.discovery import build
-            self.sheets_service = build('sheets', 'v4', credentials=self.credentials)
+            self.sheets_service = self._build_service('sheets', 'v4')
         
         return self.sheets_service
     
@@ -71,11 +193,9 @@ class GoogleAuth:
             self.authenticate()
         
         if not self.drive_service:
-            from googleapiclient.discovery import build
-            self.drive_service = build('drive', 'v3', credentials=self.credentials)
+            self.drive_service = self._build_service('drive', 'v3')
         
         return self.drive_service
 
 # Глобальный экземпляр
 google_auth = GoogleAuth()
-
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Локальный кэш снимков значений Google Sheets
+
+Значения диапазонов хранятся на диске (JSON-файл на диапазон) вместе с
+modifiedTime таблицы из Drive на момент чтения. Свежие записи отдаются
+без обращения к API, более старые - после дешевой проверки modifiedTime.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from ai_agent.config import config
+
+def _digest(text: str) -> str:
+    """Короткий стабильный хэш для имени файла"""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+class SnapshotCache:
+    """Дисковый кэш значений диапазонов с TTL и ограничением по размеру"""
+    
+    def __init__(self, directory: str = None, ttl: float = None,
+                 revalidate_after: float = None, max_bytes: int = None):
+        """
+        Args:
+            directory: Папка для файлов кэша
+            ttl: Максимальный возраст записи (сек), после него - обязательное перечитывание
+            revalidate_after: Возраст (сек), до которого запись отдается без проверки modifiedTime
+            max_bytes: Предельный размер кэша, при превышении удаляются давно не читанные записи
+        """
+        self.directory = Path(directory or config.SHEETS_CACHE_DIR)
+        self.ttl = config.SHEETS_CACHE_TTL if ttl is None else ttl
+        self.revalidate_after = config.SHEETS_CACHE_REVALIDATE if revalidate_after is None else revalidate_after
+        self.max_bytes = config.SHEETS_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    
+    def _path(self, spreadsheet_id: str, sheet_name: str, range_name: str) -> Path:
+        # Префикс по листу позволяет инвалидировать все диапазоны листа разом
+        sheet_key = _digest(f"{spreadsheet_id}|{sheet_name}")
+        return self.directory / f"{sheet_key}-{_digest(range_name)}.json"
+    
+    def get(self, spreadsheet_id: str, sheet_name: str, range_name: str) -> Optional[Dict]:
+        """Возвращает запись кэша (values, modified_time, fetched_at, validated_at) или None"""
+        path = self._path(spreadsheet_id, sheet_name, range_name)
+        try:
+            entry = json.loads(path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+        
+        if time.time() - entry['fetched_at'] > self.ttl:
+            path.unlink(missing_ok=True)
+            return None
+        
+        # Обновляем mtime файла - по нему работает вытеснение давно не читанных записей.
+        # Файл могли удалить после чтения (инвалидация, вытеснение) - считаем промахом
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+        return entry
+    
+    def is_fresh(self, entry: Dict) -> bool:
+        """Можно ли отдать запись без проверки modifiedTime"""
+        return time.time() - entry['validated_at'] <= self.revalidate_after
+    
+    def put(self, spreadsheet_id: str, sheet_name: str, range_name: str,
+            values: List[List], modified_time: Optional[str]):
+        """Сохраняет значения диапазона"""
+        now = time.time()
+        self._write(self._path(spreadsheet_id, sheet_name, range_name), {
+            'values': values,
+            'modified_time': modified_time,
+            'fetched_at': now,
+            'validated_at': now
+        })
+        self._evict()
+    
+    def mark_validated(self, spreadsheet_id: str, sheet_name: str, range_name: str, entry: Dict):
+        """Отмечает запись как проверенную (modifiedTime не изменился)"""
+        entry['validated_at'] = time.time()
+        self._write(self._path(spreadsheet_id, sheet_name, range_name), entry)
+    
+    def invalidate(self, spreadsheet_id: str, sheet_name: str):
+        """Удаляет все закэшированные диапазоны листа"""
+        prefix = _digest(f"{spreadsheet_id}|{sheet_name}")
+        for path in self.directory.glob(f"{prefix}-*.json"):
+            path.unlink(missing_ok=True)
+    
+    def clear(self):
+        """Полностью очищает кэш"""
+        for path in self.directory.glob("*.json"):
+            path.unlink(missing_ok=True)
+    
+    def _write(self, path: Path, entry: Dict):
+        """Атомарно записывает файл записи"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}-{threading.get_ident()}.tmp")
+        tmp_path.write_text(json.dumps(entry, ensure_ascii=False), encoding='utf-8')
+        os.replace(tmp_path, path)
+    
+    def _evict(self):
+        """Удаляет давно не читанные записи, пока кэш не уложится в max_bytes"""
+        files = []
+        total = 0
+        for path in self.directory.glob("*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        
+        if total <= self.max_bytes:
+            return
+        
+        for _, size, path in sorted(files):
+            path.unlink(missing_ok=True)
+            total -= size
+            if total <= self.max_bytes:
+                break
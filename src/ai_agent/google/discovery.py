@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Локальный кэш discovery-документов Google API
+
+googleapiclient строит docstring'и методов по схемам из discovery-документа.
+Для Sheets v4 (≈300 КБ схем) это занимает сотни миллисекунд при первом
+обращении к ресурсу. Клиенту нужны только пути и параметры методов, поэтому
+документ один раз сжимается (схемы заменяются заглушками, описания удаляются)
+и сохраняется на диск - следующие запуски строят сервис за миллисекунды.
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict
+
+from googleapiclient import version as googleapiclient_version
+from googleapiclient import discovery_cache
+
+from ai_agent.config import config
+from ai_agent.log import get_logger
+
+logger = get_logger(__name__)
+
+def compact_document(document: Dict) -> Dict:
+    """Убирает из discovery-документа все, что не нужно для вызова методов"""
+    def strip(node):
+        if isinstance(node, dict):
+            return {key: strip(value) for key, value in node.items() if key != 'description'}
+        if isinstance(node, list):
+            return [strip(value) for value in node]
+        return node
+    
+    compact = strip({key: value for key, value in document.items() if key != 'schemas'})
+    # Ссылки $ref в методах должны разрешаться - оставляем пустые схемы объектов
+    compact['schemas'] = {
+        name: {'id': name, 'type': 'object'}
+        for name in document.get('schemas', {})
+    }
+    return compact
+
+class DiscoveryCache:
+    """Сжатые discovery-документы в папке состояния (по версии googleapiclient)"""
+    
+    def __init__(self, directory: str = None):
+        self.directory = Path(directory or config.DISCOVERY_CACHE_DIR)
+        self._documents: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+    
+    def _path(self, api: str, version: str) -> Path:
+        # Версия библиотеки в имени: после обновления документ пересобирается
+        return self.directory / f"{api}.{version}-{googleapiclient_version.__version__}.json"
+    
+    def get(self, api: str, version: str) -> Dict:
+        """Возвращает сжатый discovery-документ API"""
+        key = f"{api}.{version}"
+        with self._lock:
+            document = self._documents.get(key)
+            if document is None:
+                document = self._load(api, version)
+                self._documents[key] = document
+            return document
+    
+    def _load(self, api: str, version: str) -> Dict:
+        path = self._path(api, version)
+        try:
+            return json.loads(path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            pass
+        
+        # Статический документ поставляется вместе с googleapiclient - сеть не нужна
+        content = discovery_cache.get_static_doc(api, version)
+        if content is None:
+            raise ValueError(f"Discovery-документ {api} {version} не найден в googleapiclient")
+        document = compact_document(json.loads(content))
+        
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            tmp_path.write_text(json.dumps(document, ensure_ascii=False), encoding='utf-8')
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("Не удалось сохранить discovery-документ %s %s: %s", api, version, e)
+        return document
+
+# Глобальный экземпляр
+discovery_documents = DiscoveryCache()
@@ -0,0 +1,484 @@
+#!/usr/bin/env python3
+"""
+Локальный эмулятор Google Sheets API
+
+Повторяет интерфейс объекта сервиса googleapiclient
+(service.spreadsheets().values().get(...).execute()), поэтому подключается
+к GoogleSheets вместо настоящего API: sheets.use_backend(SheetsEmulator(...)).
+
+Поддерживается то, чем пользуется агент:
+- values: get, batchGet, update, append, clear, batchUpdate;
+- spreadsheets: get (свойства листов), batchUpdate с запросами
+  repeatCell, updateCells, appendCells;
+- files().get(fields='modifiedTime') - как у Drive API.
+
+Таблица хранится в памяти или в JSON-файле. Задержка ответа и квота
+запросов в минуту настраиваются; при превышении квоты запрос завершается
+HttpError 429, как у настоящего API.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+# Размер сетки нового листа (как у листа, созданного в интерфейсе Google Sheets)
+DEFAULT_ROW_COUNT = 1000
+DEFAULT_COLUMN_COUNT = 26
+
+_A1_RE = re.compile(r'^([A-Za-z]*)(\d*)$')
+
+def _column_index(letters: str) -> int:
+    """Буквы колонки → индекс с 0"""
+    index = 0
+    for letter in letters.upper():
+        index = index * 26 + ord(letter) - ord('A') + 1
+    return index - 1
+
+def _http_error(status: int, message: str) -> HttpError:
+    """Ошибка в формате googleapiclient"""
+    content = json.dumps({'error': {'code': status, 'message': message}}).encode('utf-8')
+    return HttpError(httplib2.Response({'status': status}), content)
+
+def format_value(value) -> str:
+    """Значение ячейки так, как его возвращает API (FORMATTED_VALUE)"""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+def parse_user_entered(value):
+    """Разбор значения при valueInputOption=USER_ENTERED (числа остаются числами)"""
+    if not isinstance(value, str):
+        return value
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+def _cell_value(cell: Dict):
+    """Значение из CellData (updateCells / appendCells)"""
+    entered = cell.get('userEnteredValue') or {}
+    for key in ('numberValue', 'stringValue', 'boolValue', 'formulaValue'):
+        if key in entered:
+            return entered[key]
+    return ''
+
+class EmulatorRequest:
+    """Отложенный вызов эмулятора (аналог HttpRequest)"""
+    
+    def __init__(self, emulator: 'SheetsEmulator', method: str, handler: Callable[[], Any]):
+        self.emulator = emulator
+        self.method = method
+        self.handler = handler
+    
+    @property
+    def methodId(self) -> str:
+        """Идентификатор метода как у HttpRequest ('sheets.spreadsheets.values.get')"""
+        if self.method.startswith('files.'):
+            return f"drive.{self.method}"
+        if self.method.startswith('values.'):
+            return f"sheets.spreadsheets.{self.method}"
+        return f"sheets.{self.method}"
+    
+    def execute(self, http=None, num_retries=0):
+        return self.emulator._call(self.method, self.handler)
+
+class _Sheet:
+    """Лист эмулятора: сетка значений, заметки и форматы"""
+    
+    def __init__(self, sheet_id: int, title: str, rows: List[List] = None,
+                 row_count: int = None, column_count: int = None):
+        self.sheet_id = sheet_id
+        self.title = title
+        self.rows: List[List] = [list(row) for row in rows or []]
+        self.notes: Dict[Tuple[int, int], str] = {}
+        self.formats: Dict[Tuple[int, int], Dict] = {}
+        width = max((len(row) for row in self.rows), default=0)
+        self.row_count = max(row_count or DEFAULT_ROW_COUNT, len(self.rows))
+        self.column_count = max(column_count or DEFAULT_COLUMN_COUNT, width)
+    
+    def last_row(self) -> int:
+        """Количество строк до последней непустой включительно"""
+        for index in range(len(self.rows) - 1, -1, -1):
+            if any(value not in ('', None) for value in self.rows[index]):
+                return index + 1
+        return 0
+    
+    def set(self, row: int, col: int, value):
+        while len(self.rows) <= row:
+            self.rows.append([])
+        cells = self.rows[row]
+        if len(cells) <= col:
+            cells.extend([''] * (col + 1 - len(cells)))
+        cells[col] = value
+        self.row_count = max(self.row_count, row + 1)
+        self.column_count = max(self.column_count, col + 1)
+    
+    def to_dict(self) -> Dict:
+        return {
+            'sheetId': self.sheet_id,
+            'title': self.title,
+            'rowCount': self.row_count,
+            'columnCount': self.column_count,
+            'rows': self.rows,
+            'notes': [[row, col, note] for (row, col), note in self.notes.items()],
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> '_Sheet':
+        sheet = cls(data['sheetId'], data['title'], data.get('rows'),
+                    data.get('rowCount'), data.get('columnCount'))
+        sheet.notes = {(row, col): note for row, col, note in data.get('notes', [])}
+        return sheet
+
+class SheetsEmulator:
+    """Эмулятор Google Sheets API в памяти процесса"""
+    
+    def __init__(self, grids: Dict[str, List[List]] = None, path: str = None,
+                 latency: float = 0.0, quota_per_minute: Optional[float] = None):
+        """
+        Args:
+            grids: Начальные листы: название → строки значений
+            path: JSON-файл для хранения таблицы (None - только в памяти)
+            latency: Задержка каждого ответа (сек)
+            quota_per_minute: Лимит запросов за скользящую минуту (None - без лимита)
+        """
+        self.path = Path(path) if path else None
+        self.latency = latency
+        self.quota_per_minute = quota_per_minute
+        self.calls: Counter = Counter()
+        self.throttled = 0
+        self.sheets: Dict[str, _Sheet] = {}
+        self.modified_at = time.time()
+        self._recent_calls = deque()
+        self._lock = threading.RLock()
+        
+        if self.path and self.path.exists():
+            self._load()
+        for title, rows in (grids or {}).items():
+            self.add_sheet(title, rows)
+    
+    # --- Управление таблицей ---
+    
+    def add_sheet(self, title: str, rows: List[List] = None,
+                  row_count: int = None, column_count: int = None) -> int:
+        """Добавляет (или заменяет) лист, возвращает sheetId"""
+        with self._lock:
+            existing = self.sheets.get(title)
+            sheet_id = existing.sheet_id if existing else len(self.sheets)
+            self.sheets[title] = _Sheet(sheet_id, title, rows, row_count, column_count)
+            self._touch()
+            return sheet_id
+    
+    def grid(self, title: str) -> List[List]:
+        """Сырые значения листа (для проверок)"""
+        return self.sheets[title].rows
+    
+    def notes(self, title: str) -> Dict[Tuple[int, int], str]:
+        """Заметки листа: (строка, колонка) с 0 → текст"""
+        return self.sheets[title].notes
+    
+    def formats(self, title: str) -> Dict[Tuple[int, int], Dict]:
+        """Форматы ячеек листа: (строка, колонка) с 0 → userEnteredFormat"""
+        return self.sheets[title].formats
+    
+    def save(self):
+        """Сохраняет таблицу в JSON-файл (если задан path)"""
+        if not self.path:
+            return
+        with self._lock:
+            data = {
+                'modifiedAt': self.modified_at,
+                'sheets': [sheet.to_dict() for sheet in self.sheets.values()]
+            }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(data, ensure_ascii=False), encoding='utf-8')
+        os.replace(tmp_path, self.path)
+    
+    def _load(self):
+        data = json.loads(self.path.read_text(encoding='utf-8'))
+        self.modified_at = data.get('modifiedAt', self.modified_at)
+        for item in data.get('sheets', []):
+            sheet = _Sheet.from_dict(item)
+            self.sheets[sheet.title] = sheet
+    
+    def _touch(self):
+        self.modified_at = time.time()
+    
+    # --- Интерфейс объекта сервиса googleapiclient ---
+    
+    def spreadsheets(self) -> 'SheetsEmulator':
+        return self
+    
+    def values(self) -> '_ValuesResource':
+        return _ValuesResource(self)
+    
+    def files(self) -> '_FilesResource':
+        return _FilesResource(self)
+    
+    def get(self, spreadsheetId: str = None, fields: str = None, **kwargs) -> EmulatorRequest:
+        """spreadsheets.get: свойства листов (fields не учитывается)"""
+        def handler():
+            return {'sheets': [
+                {'properties': {
+                    'sheetId': sheet.sheet_id,
+                    'title': sheet.title,
+                    'gridProperties': {'rowCount': sheet.row_count, 'columnCount': sheet.column_count}
+                }}
+                for sheet in self.sheets.values()
+            ]}
+        return EmulatorRequest(self, 'spreadsheets.get', handler)
+    
+    def batchUpdate(self, spreadsheetId: str = None, body: Dict = None, **kwargs) -> EmulatorRequest:
+        """spreadsheets.batchUpdate: repeatCell, updateCells, appendCells (атомарно)"""
+        requests = (body or {}).get('requests', [])
+        
+        def handler():
+            by_id = {sheet.sheet_id: sheet for sheet in self.sheets.values()}
+            # Проверяем все запросы до применения - как API, пакет либо применяется целиком, либо нет
+            for request in requests:
+                kind = next(iter(request), None)
+                if kind not in ('repeatCell', 'updateCells', 'appendCells'):
+                    raise _http_error(400, f"Unsupported request: {kind}")
+                params = request[kind]
+                sheet_id = (params.get('range') or params.get('start') or params).get('sheetId')
+                if sheet_id not in by_id:
+                    raise _http_error(400, f"No grid with id: {sheet_id}")
+            
+            for request in requests:
+                kind, params = next(iter(request.items()))
+                getattr(self, f"_apply_{kind}")(by_id, params)
+            self._touch()
+            self._autosave()
+            return {'spreadsheetId': spreadsheetId, 'replies': [{} for _ in requests]}
+        return EmulatorRequest(self, 'spreadsheets.batchUpdate', handler)
+    
+    # --- Выполнение вызовов ---
+    
+    def _call(self, method: str, handler: Callable[[], Any]) -> Any:
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.calls[method] += 1
+            if self.quota_per_minute:
+                now = time.monotonic()
+                while self._recent_calls and now - self._recent_calls[0] >= 60:
+                    self._recent_calls.popleft()
+                if len(self._recent_calls) >= self.quota_per_minute:
+                    self.throttled += 1
+                    raise _http_error(429, "Quota exceeded for quota metric 'Read requests'")
+                self._recent_calls.append(now)
+            return handler()
+    
+    def _autosave(self):
+        if self.path:
+            self.save()
+    
+    def _sheet(self, title: str) -> _Sheet:
+        sheet = self.sheets.get(title)
+        if sheet is None:
+            raise _http_error(400, f"Unable to parse range: {title}")
+        return sheet
+    
+    def parse_range(self, range_name: str) -> Tuple[_Sheet, int, int, Optional[int], Optional[int]]:
+        """'Лист!B2:D' → (лист, первая_строка, первая_колонка, конец_строк, конец_колонок)
+        
+        Индексы с 0, концы не включаются; None - до конца листа.
+        """
+        title, _, a1 = range_name.rpartition('!')
+        if not title:
+            title, a1 = a1, ''
+        title = title.strip("'").replace("''", "'")
+        sheet = self._sheet(title)
+        if not a1:
+            return sheet, 0, 0, None, None
+        
+        start, _, end = a1.partition(':')
+        start_match = _A1_RE.match(start)
+        end_match = _A1_RE.match(end) if end else start_match
+        if not start_match or not end_match:
+            raise _http_error(400, f"Unable to parse range: {range_name}")
+        
+        start_col, start_row = start_match.groups()
+        end_col, end_row = end_match.groups()
+        return (
+            sheet,
+            int(start_row) - 1 if start_row else 0,
+            _column_index(start_col) if start_col else 0,
+            int(end_row) if end_row else None,
+            _column_index(end_col) + 1 if end_col else None,
+        )
+    
+    def read(self, range_name: str, major_dimension: str = 'ROWS') -> Dict:
+        """Значения диапазона в формате ValueRange"""
+        sheet, row0, col0, row1, col1 = self.parse_range(range_name)
+        rows = []
+        for cells in sheet.rows[row0:row1]:
+            values = [format_value(value) for value in cells[col0:col1]]
+            while values and values[-1] == '':
+                values.pop()
+            rows.append(values)
+        while rows and not rows[-1]:
+            rows.pop()
+        
+        if major_dimension == 'COLUMNS':
+            width = max((len(values) for values in rows), default=0)
+            columns = []
+            for index in range(width):
+                column = [values[index] if index < len(values) else '' for values in rows]
+                while column and column[-1] == '':
+                    column.pop()
+                columns.append(column)
+            rows = columns
+        
+        result = {'range': range_name, 'majorDimension': major_dimension}
+        if rows:
+            result['values'] = rows
+        return result
+    
+    def write(self, range_name: str, values: List[List], value_input_option: str = 'RAW'):
+        """Записывает значения начиная с левой верхней ячейки диапазона"""
+        sheet, row0, col0, _, _ = self.parse_range(range_name)
+        for row_offset, row in enumerate(values):
+            for col_offset, value in enumerate(row):
+                if value_input_option == 'USER_ENTERED':
+                    value = parse_user_entered(value)
+                sheet.set(row0 + row_offset, col0 + col_offset, value)
+    
+    def _apply_repeatCell(self, by_id: Dict[int, _Sheet], params: Dict):
+        cell_range = params['range']
+        sheet = by_id[cell_range['sheetId']]
+        cell = params.get('cell', {})
+        for row in range(cell_range.get('startRowIndex', 0), cell_range.get('endRowIndex', sheet.row_count)):
+            for col in range(cell_range.get('startColumnIndex', 0),
+                             cell_range.get('endColumnIndex', sheet.column_count)):
+                if 'userEnteredFormat' in cell:
+                    sheet.formats.setdefault((row, col), {}).update(cell['userEnteredFormat'])
+                if 'userEnteredValue' in cell:
+                    sheet.set(row, col, _cell_value(cell))
+    
+    def _apply_updateCells(self, by_id: Dict[int, _Sheet], params: Dict):
+        start = params.get('start') or params['range']
+        sheet = by_id[start['sheetId']]
+        row0 = start.get('rowIndex', start.get('startRowIndex', 0))
+        col0 = start.get('columnIndex', start.get('startColumnIndex', 0))
+        self._write_cells(sheet, row0, col0, params.get('rows', []), params.get('fields', '*'))
+    
+    def _apply_appendCells(self, by_id: Dict[int, _Sheet], params: Dict):
+        sheet = by_id[params['sheetId']]
+        self._write_cells(sheet, sheet.last_row(), 0, params.get('rows', []), params.get('fields', '*'))
+    
+    def _write_cells(self, sheet: _Sheet, row0: int, col0: int, rows: List[Dict], fields: str):
+        fields = {field.strip() for field in fields.split(',')}
+        write_all = '*' in fields
+        for row_offset, row in enumerate(rows):
+            for col_offset, cell in enumerate(row.get('values', [])):
+                position = (row0 + row_offset, col0 + col_offset)
+                if write_all or 'userEnteredValue' in fields:
+                    sheet.set(*position, _cell_value(cell))
+                if (write_all or 'note' in fields) and 'note' in cell:
+                    sheet.notes[position] = cell['note']
+                if (write_all or 'userEnteredFormat' in fields) and 'userEnteredFormat' in cell:
+                    sheet.formats.setdefault(position, {}).update(cell['userEnteredFormat'])
+
+class _ValuesResource:
+    """spreadsheets().values() эмулятора"""
+    
+    def __init__(self, emulator: SheetsEmulator):
+        self.emulator = emulator
+    
+    def get(self, spreadsheetId: str = None, range: str = None,
+            majorDimension: str = 'ROWS', **kwargs) -> EmulatorRequest:
+        return EmulatorRequest(self.emulator, 'values.get',
+                               lambda: self.emulator.read(range, majorDimension))
+    
+    def batchGet(self, spreadsheetId: str = None, ranges: List[str] = None,
+                 majorDimension: str = 'ROWS', **kwargs) -> EmulatorRequest:
+        def handler():
+            return {
+                'spreadsheetId': spreadsheetId,
+                'valueRanges': [self.emulator.read(range_name, majorDimension) for range_name in ranges or []]
+            }
+        return EmulatorRequest(self.emulator, 'values.batchGet', handler)
+    
+    def update(self, spreadsheetId: str = None, range: str = None,
+               valueInputOption: str = 'RAW', body: Dict = None, **kwargs) -> EmulatorRequest:
+        def handler():
+            values = (body or {}).get('values', [])
+            self.emulator.write(range, values, valueInputOption)
+            self._changed()
+            return {'updatedRange': range, 'updatedRows': len(values)}
+        return EmulatorRequest(self.emulator, 'values.update', handler)
+    
+    def append(self, spreadsheetId: str = None, range: str = None,
+               valueInputOption: str = 'RAW', body: Dict = None, **kwargs) -> EmulatorRequest:
+        def handler():
+            sheet, _, col0, _, _ = self.emulator.parse_range(range)
+            values = (body or {}).get('values', [])
+            start = sheet.last_row()
+            for row_offset, row in enumerate(values):
+                for col_offset, value in enumerate(row):
+                    if valueInputOption == 'USER_ENTERED':
+                        value = parse_user_entered(value)
+                    sheet.set(start + row_offset, col0 + col_offset, value)
+            self._changed()
+            return {'updates': {'updatedRows': len(values)}}
+        return EmulatorRequest(self.emulator, 'values.append', handler)
+    
+    def clear(self, spreadsheetId: str = None, range: str = None, **kwargs) -> EmulatorRequest:
+        def handler():
+            sheet, row0, col0, row1, col1 = self.emulator.parse_range(range)
+            for cells in sheet.rows[row0:row1]:
+                end = len(cells) if col1 is None else min(col1, len(cells))
+                if end > col0:
+                    cells[col0:end] = [''] * (end - col0)
+            self._changed()
+            return {'clearedRange': range}
+        return EmulatorRequest(self.emulator, 'values.clear', handler)
+    
+    def batchUpdate(self, spreadsheetId: str = None, body: Dict = None, **kwargs) -> EmulatorRequest:
+        def handler():
+            body_ = body or {}
+            option = body_.get('valueInputOption', 'RAW')
+            data = body_.get('data', [])
+            # Сначала проверяем все диапазоны - запись атомарна
+            for value_range in data:
+                self.emulator.parse_range(value_range['range'])
+            for value_range in data:
+                self.emulator.write(value_range['range'], value_range.get('values', []), option)
+            self._changed()
+            return {'totalUpdatedRanges': len(data)}
+        return EmulatorRequest(self.emulator, 'values.batchUpdate', handler)
+    
+    def _changed(self):
+        self.emulator._touch()
+        self.emulator._autosave()
+
+class _FilesResource:
+    """files() эмулятора - только modifiedTime таблицы, как у Drive API"""
+    
+    def __init__(self, emulator: SheetsEmulator):
+        self.emulator = emulator
+    
+    def get(self, fileId: str = None, fields: str = None, **kwargs) -> EmulatorRequest:
+        def handler():
+            modified = datetime.fromtimestamp(self.emulator.modified_at, tz=timezone.utc)
+            return {'id': fileId, 'modifiedTime': modified.isoformat(timespec='milliseconds').replace('+00:00', 'Z')}
+        return EmulatorRequest(self.emulator, 'files.get', handler)
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Планировщик запросов к Google API
+
+Все вызовы клиента Sheets проходят через общий исполнитель:
+- token bucket ограничивает темп запросов квотой API (запросов в минуту);
+- временные ошибки (429, 5xx, обрывы соединения) повторяются с
+  экспоненциальной задержкой и случайным разбросом (jitter); неидемпотентные
+  запросы (добавление строк, spreadsheets.batchUpdate) повторяются только
+  после 429 - при 5xx и обрыве сервер мог уже применить запрос, и повтор
+  задвоил бы строки;
+- одинаковые чтения, запущенные параллельно, выполняются один раз -
+  остальные вызывающие получают тот же результат.
+"""
+
+import random
+import socket
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from googleapiclient.errors import HttpError
+
+from ai_agent.config import config
+from ai_agent.log import get_logger
+from ai_agent.telemetry import telemetry
+
+logger = get_logger(__name__)
+
+# HTTP-статусы, при которых запрос имеет смысл повторить
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+# Статусы, при которых запрос точно не выполнен - повторяются и неидемпотентные запросы
+REJECTED_STATUSES = {429}
+
+# Ошибки транспорта, при которых запрос тоже повторяется
+RETRYABLE_ERRORS = (ConnectionError, TimeoutError, socket.timeout)
+
+class TokenBucket:
+    """Потокобезопасный token bucket: rate токенов в минуту, не больше capacity в запасе"""
+    
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0  # Токенов в секунду
+        self.capacity = capacity if capacity is not None else max(1.0, rate_per_minute / 6)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+    
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Забирает токены, при необходимости ожидая их появления
+        
+        Returns:
+            float: Сколько секунд пришлось ждать
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return waited
+                delay = (tokens - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+    
+    def drain(self):
+        """Обнуляет запас (после ответа 429 сервер явно просит притормозить)"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, 0.0)
+
+def _status(error: HttpError) -> Optional[int]:
+    """HTTP-статус ошибки googleapiclient"""
+    status = getattr(error, 'status_code', None)
+    if status is None and getattr(error, 'resp', None) is not None:
+        status = getattr(error.resp, 'status', None)
+    try:
+        return int(status) if status is not None else None
+    except (TypeError, ValueError):
+        return None
+
+def _retry_after(error: HttpError) -> Optional[float]:
+    """Значение заголовка Retry-After (сек), если сервер его прислал"""
+    resp = getattr(error, 'resp', None)
+    value = resp.get('retry-after') if hasattr(resp, 'get') else None
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+class RequestExecutor:
+    """Исполнитель запросов с ограничением темпа, повторами и объединением чтений"""
+    
+    def __init__(self, requests_per_minute: float = None, max_retries: int = None,
+                 backoff_base: float = None, backoff_max: float = None):
+        """
+        Args:
+            requests_per_minute: Квота запросов в минуту
+            max_retries: Сколько раз повторять запрос после временной ошибки
+            backoff_base: Базовая задержка первого повтора (сек)
+            backoff_max: Предельная задержка повтора (сек)
+        """
+        self.bucket = TokenBucket(requests_per_minute or config.SHEETS_QUOTA_PER_MINUTE)
+        self.max_retries = config.SHEETS_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_base = config.SHEETS_BACKOFF_BASE if backoff_base is None else backoff_base
+        self.backoff_max = config.SHEETS_BACKOFF_MAX if backoff_max is None else backoff_max
+        self._in_flight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self.stats = {'calls': 0, 'retries': 0, 'coalesced': 0, 'throttled_seconds': 0.0}
+    
+    def backoff(self, attempt: int) -> float:
+        """Задержка перед повтором номер attempt (с 0): full jitter"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+    
+    def execute(self, request, key: Hashable = None, idempotent: bool = True) -> Any:
+        """Выполняет запрос googleapiclient (объект с методом execute)
+        
+        Args:
+            request: Подготовленный запрос (например, service.spreadsheets().values().get(...))
+            key: Ключ объединения: параллельные вызовы с одинаковым ключом
+                выполняют запрос один раз. Только для чтений; None - без объединения
+            idempotent: Повтор запроса безопасен. False - повтор только после 429,
+                5xx и ошибки транспорта пробрасываются сразу
+        
+        Raises:
+            HttpError: Постоянная ошибка или исчерпаны повторы
+        """
+        return self.call(request.execute, key, idempotent)
+    
+    def call(self, func: Callable[[], Any], key: Hashable = None, idempotent: bool = True) -> Any:
+        """Выполняет произвольный вызов API с ограничением темпа и повторами"""
+        if key is None:
+            return self._call_with_retries(func, idempotent)
+        
+        with self._lock:
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._in_flight[key] = future
+            else:
+                self.stats['coalesced'] += 1
+                telemetry.increment('sheets_coalesced')
+        
+        if not owner:
+            return future.result()
+        
+        try:
+            result = self._call_with_retries(func, idempotent)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+    
+    def _call_with_retries(self, func: Callable[[], Any], idempotent: bool = True) -> Any:
+        attempt = 0
+        while True:
+            waited = self.bucket.acquire()
+            with self._lock:
+                self.stats['throttled_seconds'] += waited
+                self.stats['calls'] += 1
+            if waited:
+                telemetry.increment('sheets_throttled_seconds', waited)
+            try:
+                return func()
+            except HttpError as e:
+                status = _status(e)
+                retryable = RETRYABLE_STATUSES if idempotent else REJECTED_STATUSES
+                if status not in retryable or attempt >= self.max_retries:
+                    raise
+                if status == 429:
+                    self.bucket.drain()
+                delay = max(self.backoff(attempt), _retry_after(e) or 0.0)
+                reason = f"HTTP {status}"
+            except RETRYABLE_ERRORS as e:
+                if not idempotent or attempt >= self.max_retries:
+                    raise
+                delay = self.backoff(attempt)
+                reason = type(e).__name__
+            
+            with self._lock:
+                self.stats['retries'] += 1
+            telemetry.increment('sheets_retries', reason=reason)
+            logger.warning("%s, повтор %s/%s через %.1f с", reason, attempt + 1, self.max_retries, delay)
+            time.sleep(delay)
+            attempt += 1
+
+# Глобальный экземпляр
+request_executor = RequestExecutor()
@@ -3,51 +3,195 @@
 Работа с Google Sheets API
 """
 
-from typing import List, Optional
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
 from ai_agent.config import config
 from ai_agent.google.auth import google_auth
+from ai_agent.google.cache import SnapshotCache
+from ai_agent.google.executor import request_executor
+from ai_agent.log import get_logger
+from ai_agent.telemetry import telemetry
+
+logger = get_logger(__name__)
+
+# Лимит запросов в одном spreadsheets.batchUpdate (API принимает больше,
+# но крупные пакеты чаще упираются в таймауты)
+BATCH_UPDATE_CHUNK_SIZE = 500
+
+# Диапазон на случай, если размеры листа определить не удалось
+FALLBACK_RANGE = "A1:ZZ200"
+
+# Как долго (сек) доверять полученному modifiedTime таблицы без повторной проверки
+MODIFIED_TIME_PROBE_INTERVAL = 5
+
+def column_letter(col: int) -> str:
+    """Переводит номер колонки (с 1) в буквенное обозначение: 1 → A, 27 → AA"""
+    letters = ''
+    while col > 0:
+        col, remainder = divmod(col - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+def request_method(request) -> str:
+    """Короткое имя метода запроса для телеметрии: 'spreadsheets.values.get'"""
+    method_id = getattr(request, 'methodId', None) or ''
+    return method_id.split('.', 1)[1] if '.' in method_id else (method_id or 'unknown')
 
 class GoogleSheets:
     """Класс для работы с Google Sheets"""
     
     def __init__(self):
         self.service = None
+        self.drive_service = None  # Для проверки modifiedTime; None - Drive API из google_auth
         self.spreadsheet_id = config.SPREADSHEET_ID
+        self._sheet_props: Dict[str, Dict] = {}  # Кэш title → sheetId и размеры сетки
+        self._sheet_props_source = None  # spreadsheet_id, для которого собран кэш
+        self.cache = SnapshotCache() if config.SHEETS_CACHE_ENABLED else None
+        self._modified_time = None  # (spreadsheet_id, modifiedTime, время проверки)
+        self.executor = request_executor  # Квота, повторы и объединение одинаковых чтений
+        self._service_lock = threading.Lock()
     
     def _get_service(self):
-        """Получает сервис Google Sheets"""
+        """Получает сервис Google Sheets
+        
+        Объект сервиса общий для всех потоков: каждый запрос на время
+        выполнения берет отдельное соединение из пула google_auth
+        (размер - GOOGLE_HTTP_POOL_SIZE).
+        """
         if not self.service:
-            google_auth.authenticate()
-            self.service = google_auth.get_sheets_service()
+            with self._service_lock:
+                if not self.service and config.SHEETS_BACKEND == 'emulator':
+                    from ai_agent.google.emulator import SheetsEmulator
+                    self.use_backend(SheetsEmulator(path=config.SHEETS_EMULATOR_PATH))
+                elif not self.service:
+                    google_auth.authenticate()
+                    self.service = google_auth.get_sheets_service()
         return self.service
     
-    def read_range(self, sheet_name: str, range_name: str) -> List[List]:
-        """Читает данные из диапазона"""
+    def _get_drive_service(self):
+        """Получает сервис для проверки modifiedTime таблицы"""
+        if self.drive_service is not None:
+            return self.drive_service
+        return google_auth.get_drive_service()
+    
+    def use_backend(self, service, drive_service=None, spreadsheet_id: str = None):
+        """Подключает другой бэкенд вместо Google API (например, SheetsEmulator)
+        
+        Args:
+            service: Объект с интерфейсом сервиса Sheets из googleapiclient
+            drive_service: Объект с files().get(...) для modifiedTime; по умолчанию
+                берется service, если он его поддерживает
+            spreadsheet_id: ID таблицы в бэкенде (None - оставить текущий)
+        """
+        self.service = service
+        if drive_service is None and hasattr(service, 'files'):
+            drive_service = service
+        self.drive_service = drive_service
+        if spreadsheet_id:
+            self.spreadsheet_id = spreadsheet_id
+        
+        # Метаданные и modifiedTime относились к прежнему бэкенду
+        self._sheet_props = {}
+        self._sheet_props_source = None
+        self._modified_time = None
+    
+    def _execute(self, request, key=None, idempotent: bool = True):
+        """Выполняет запрос через общий планировщик (квота, повторы при 429/5xx)
+        
+        Args:
+            request: Подготовленный запрос googleapiclient
+            key: Ключ объединения одинаковых параллельных чтений (None - без объединения)
+            idempotent: False для добавления строк и spreadsheets.batchUpdate -
+                они повторяются только после 429
+        """
+        method = request_method(request)
+        body = getattr(request, 'body', None)
+        if body:
+            telemetry.increment('sheets_request_bytes', len(body), method=method)
+        telemetry.increment('sheets_requests', method=method)
+        with telemetry.span('sheets_request', method=method):
+            return self.executor.execute(request, key, idempotent)
+    
+    def get_modified_time(self) -> Optional[str]:
+        """Возвращает modifiedTime таблицы из Drive (дешевая проверка изменений)"""
+        now = time.time()
+        if self._modified_time:
+            spreadsheet_id, modified_time, checked_at = self._modified_time
+            if spreadsheet_id == self.spreadsheet_id and now - checked_at < MODIFIED_TIME_PROBE_INTERVAL:
+                return modified_time
+        
+        try:
+            drive = self._get_drive_service()
+            result = self._execute(drive.files().get(
+                fileId=self.spreadsheet_id,
+                fields='modifiedTime',
+                supportsAllDrives=True
+            ), key=('modifiedTime', self.spreadsheet_id))
+            modified_time = result.get('modifiedTime')
+        except Exception as e:
+            logger.warning("Не удалось получить modifiedTime таблицы: %s", e)
+            modified_time = None
+        
+        self._modified_time = (self.spreadsheet_id, modified_time, now)
+        return modified_time
+    
+    def read_range(self, sheet_name: str, range_name: str, use_cache: bool = True) -> List[List]:
+        """Читает данные из диапазона
+        
+        Args:
+            sheet_name: Название листа
+            range_name: Диапазон в нотации A1
+            use_cache: Использовать локальный кэш снимков (False - всегда читать из API)
+        """
+        cache = self.cache if use_cache else None
+        modified_time = None
+        
+        if cache:
+            entry = cache.get(self.spreadsheet_id, sheet_name, range_name)
+            if entry and cache.is_fresh(entry):
+                return entry['values']
+            
+            modified_time = self.get_modified_time()
+            if entry and modified_time and modified_time == entry['modified_time']:
+                cache.mark_validated(self.spreadsheet_id, sheet_name, range_name, entry)
+                return entry['values']
+        
         try:
             service = self._get_service()
-            result = service.spreadsheets().values().get(
+            result = self._execute(service.spreadsheets().values().get(
                 spreadsheetId=self.spreadsheet_id,
                 range=f"{sheet_name}!{range_name}"
-            ).execute()
-            return result.get('values', [])
+            ), key=('values.get', self.spreadsheet_id, sheet_name, range_name))
         except Exception as e:
-            print(f"ERROR: Ошибка чтения из {sheet_name}!{range_name}: {e}")
+            logger.error("Ошибка чтения из %s!%s: %s", sheet_name, range_name, e)
             return []
+        
+        values = result.get('values', [])
+        if cache and modified_time:
+            cache.put(self.spreadsheet_id, sheet_name, range_name, values, modified_time)
+        return values
+    
+    def invalidate_cache(self, sheet_name: str):
+        """Сбрасывает закэшированные значения листа (после записи в него)"""
+        if self.cache:
+            self.cache.invalidate(self.spreadsheet_id, sheet_name)
     
     def write_range(self, sheet_name: str, range_name: str, values: List[List]) -> bool:
         """Записывает данные в диапазон"""
         try:
             service = self._get_service()
             body = {'values': values}
-            service.spreadsheets().values().update(
+            self._execute(service.spreadsheets().values().update(
                 spreadsheetId=self.spreadsheet_id,
                 range=f"{sheet_name}!{range_name}",
                 valueInputOption='USER_ENTERED',
                 body=body
-            ).execute()
+            ))
+            self.invalidate_cache(sheet_name)
             return True
         except Exception as e:
-            print(f"ERROR: Ошибка записи в {sheet_name}!{range_name}: {e}")
+            logger.error("Ошибка записи в %s!%s: %s", sheet_name, range_name, e)
             return False
     
     def append_rows(self, sheet_name: str, rows: List[List]) -> bool:
@@ -55,102 +199,448 @@ class GoogleSheets:
         try:
             service = self._get_service()
             body = {'values': rows}
-            service.spreadsheets().values().append(
+            self._execute(service.spreadsheets().values().append(
                 spreadsheetId=self.spreadsheet_id,
                 range=f"{sheet_name}!A1",
                 valueInputOption='USER_ENTERED',
                 body=body
-            ).execute()
+            ), idempotent=False)
+            self.invalidate_cache(sheet_name)
             return True
         except Exception as e:
-            print(f"ERROR: Ошибка добавления строк в {sheet_name}: {e}")
+            logger.error("Ошибка добавления строк в %s: %s", sheet_name, e)
             return False
     
+    def write_ranges(self, updates: List[Tuple[str, str, List[List]]]) -> bool:
+        """Записывает несколько диапазонов (в том числе на разных листах) одним вызовом values.batchUpdate
+        
+        Args:
+            updates: Тройки (название_листа, диапазон, значения)
+        
+        Returns:
+            bool: True если запись успешна
+        """
+        if not updates:
+            return True
+        
+        try:
+            service = self._get_service()
+            self._execute(service.spreadsheets().values().batchUpdate(
+                spreadsheetId=self.spreadsheet_id,
+                body={
+                    'valueInputOption': 'USER_ENTERED',
+                    'data': [
+                        {'range': f"{sheet_name}!{range_name}", 'values': values}
+                        for sheet_name, range_name, values in updates
+                    ]
+                }
+            ))
+        except Exception as e:
+            logger.error("Ошибка пакетной записи %s диапазонов: %s", len(updates), e)
+            return False
+        
+        for sheet_name in {sheet_name for sheet_name, _, _ in updates}:
+            self.invalidate_cache(sheet_name)
+        return True
+    
+    def batch(self) -> 'SheetsBatch':
+        """Пакет изменений: записи копятся и отправляются одним вызовом
+        
+        Пример:
+            with sheets.batch() as batch:
+                batch.append_rows("Signals", signal_rows)
+                batch.append_rows("Decisions", decision_rows)
+        """
+        return SheetsBatch(self)
+    
     def clear_range(self, sheet_name: str, range_name: str) -> bool:
         """Очищает диапазон"""
         try:
             service = self._get_service()
-            service.spreadsheets().values().clear(
+            self._execute(service.spreadsheets().values().clear(
                 spreadsheetId=self.spreadsheet_id,
                 range=f"{sheet_name}!{range_name}"
-            ).execute()
+            ))
+            self.invalidate_cache(sheet_name)
             return True
         except Exception as e:
-            print(f"ERROR: Ошибка очистки {sheet_name}!{range_name}: {e}")
+            logger.error("Ошибка очистки %s!%s: %s", sheet_name, range_name, e)
             return False
     
-    def update_cell_format(self, sheet_name: str, row: int, col: int, 
-                          background_color: dict, note: str = None) -> bool:
-        """Обновляет форматирование ячейки"""
+    def _load_sheet_properties(self) -> bool:
+        """Загружает свойства всех листов одним запросом метаданных"""
         try:
             service = self._get_service()
-            
-            # Получаем sheet_id
-            spreadsheet = service.spreadsheets().get(
-                spreadsheetId=self.spreadsheet_id
-            ).execute()
-            
-            sheet_id = None
-            for sheet in spreadsheet['sheets']:
-                if sheet['properties']['title'] == sheet_name:
-                    sheet_id = sheet['properties']['sheetId']
-                    break
-            
-            if sheet_id is None:
-                print(f"ERROR: Лист {sheet_name} не найден")
-                return False
-            
-            requests = []
-            
-            # Форматирование фона
+            spreadsheet = self._execute(service.spreadsheets().get(
+                spreadsheetId=self.spreadsheet_id,
+                fields='sheets.properties(sheetId,title,gridProperties(rowCount,columnCount))'
+            ), key=('properties', self.spreadsheet_id))
+        except Exception as e:
+            logger.error("Ошибка получения метаданных таблицы: %s", e)
+            return False
+        
+        self._sheet_props = {}
+        for sheet in spreadsheet.get('sheets', []):
+            properties = sheet['properties']
+            grid = properties.get('gridProperties', {})
+            self._sheet_props[properties['title']] = {
+                'sheetId': properties['sheetId'],
+                'rowCount': grid.get('rowCount', 0),
+                'columnCount': grid.get('columnCount', 0)
+            }
+        self._sheet_props_source = self.spreadsheet_id
+        return True
+    
+    def get_sheet_properties(self, sheet_name: str, refresh: bool = False) -> Optional[Dict]:
+        """Возвращает sheetId и размеры сетки листа из кэша метаданных
+        
+        Метаданные таблицы запрашиваются один раз, повторно — только если
+        лист не найден в кэше или передан refresh=True.
+        """
+        if (refresh or sheet_name not in self._sheet_props
+                or self._sheet_props_source != self.spreadsheet_id):
+            if not self._load_sheet_properties():
+                return None
+        
+        return self._sheet_props.get(sheet_name)
+    
+    def get_sheet_titles(self, refresh: bool = False) -> List[str]:
+        """Возвращает названия всех листов в порядке следования"""
+        if refresh or not self._sheet_props or self._sheet_props_source != self.spreadsheet_id:
+            if not self._load_sheet_properties():
+                return []
+        return list(self._sheet_props)
+    
+    def get_sheet_id(self, sheet_name: str, refresh: bool = False) -> Optional[int]:
+        """Возвращает sheetId листа из кэша title→sheetId"""
+        properties = self.get_sheet_properties(sheet_name, refresh)
+        return properties['sheetId'] if properties else None
+    
+    def read_header(self, sheet_name: str, row: int = 1) -> List:
+        """Читает одну строку заголовков (до последней заполненной ячейки)"""
+        data = self.read_range(sheet_name, f"{row}:{row}")
+        return data[0] if data else []
+    
+    def resolve_used_range(self, sheet_name: str) -> str:
+        """Определяет заполненный прямоугольник листа в нотации A1
+        
+        Ширина — по последней заполненной ячейке строки заголовков, высота
+        открыта ("A1:K"): API не возвращает хвостовые пустые строки, а
+        rowCount из кэша метаданных устаревает, когда лист дописывают.
+        """
+        headers = self.read_header(sheet_name)
+        if not headers:
+            return FALLBACK_RANGE
+        
+        return f"A1:{column_letter(len(headers))}"
+    
+    def read_used_range(self, sheet_name: str) -> List[List]:
+        """Читает ровно заполненный прямоугольник листа"""
+        return self.read_range(sheet_name, self.resolve_used_range(sheet_name))
+    
+    def read_ranges(self, ranges: List[Tuple[str, str]], major_dimension: str = 'ROWS') -> List[List[List]]:
+        """Читает несколько диапазонов (в том числе с разных листов) одним вызовом values.batchGet
+        
+        Args:
+            ranges: Пары (название_листа, диапазон)
+            major_dimension: 'ROWS' или 'COLUMNS'
+        
+        Returns:
+            List[List[List]]: Значения диапазонов в порядке ranges; пустой список при ошибке
+        """
+        if not ranges:
+            return []
+        
+        try:
+            service = self._get_service()
+            result = self._execute(service.spreadsheets().values().batchGet(
+                spreadsheetId=self.spreadsheet_id,
+                ranges=[f"{sheet_name}!{range_name}" for sheet_name, range_name in ranges],
+                majorDimension=major_dimension
+            ), key=('values.batchGet', self.spreadsheet_id, tuple(ranges), major_dimension))
+        except Exception as e:
+            logger.error("Ошибка пакетного чтения %s диапазонов: %s", len(ranges), e)
+            return []
+        
+        value_ranges = result.get('valueRanges', [])
+        values = [value_range.get('values', []) for value_range in value_ranges]
+        return values + [[] for _ in range(len(ranges) - len(values))]
+    
+    def read_headers(self, sheet_names: List[str], row: int = 1) -> Dict[str, List]:
+        """Читает строку заголовков нескольких листов одним вызовом"""
+        values = self.read_ranges([(sheet_name, f"{row}:{row}") for sheet_name in sheet_names])
+        return {
+            sheet_name: data[0] if data else []
+            for sheet_name, data in zip(sheet_names, values)
+        }
+    
+    def read_sheet_columns(self, columns_by_sheet: Dict[str, List[int]], first_row: int = 1,
+                           last_row: Optional[int] = None) -> Dict[str, Dict[int, List]]:
+        """Читает выбранные колонки нескольких листов одним вызовом values.batchGet
+        
+        Args:
+            columns_by_sheet: название_листа → индексы колонок (с 0, как в строках read_range)
+            first_row: Первая строка (с 1)
+            last_row: Последняя строка; None - до конца листа
+        
+        Returns:
+            Dict[str, Dict[int, List]]: лист → (индекс_колонки → значения сверху вниз);
+                пустой словарь при ошибке (хвостовые пустые ячейки API не возвращает)
+        """
+        row_suffix = str(last_row) if last_row else ''
+        requests = []  # (лист, первая_колонка, последняя_колонка)
+        for sheet_name, columns in columns_by_sheet.items():
+            # Группируем соседние колонки в непрерывные диапазоны
+            spans = []
+            for col in sorted(set(columns)):
+                if spans and spans[-1][1] == col - 1:
+                    spans[-1][1] = col
+                else:
+                    spans.append([col, col])
+            requests.extend((sheet_name, start, end) for start, end in spans)
+        
+        if not requests:
+            return {}
+        
+        ranges = [
+            (sheet_name, f"{column_letter(start + 1)}{first_row}:{column_letter(end + 1)}{row_suffix}")
+            for sheet_name, start, end in requests
+        ]
+        results = self.read_ranges(ranges, major_dimension='COLUMNS')
+        if not results:
+            return {}
+        
+        columns_data = {sheet_name: {} for sheet_name in columns_by_sheet}
+        for (sheet_name, start, end), values in zip(requests, results):
+            for offset, col in enumerate(range(start, end + 1)):
+                columns_data[sheet_name][col] = values[offset] if offset < len(values) else []
+        
+        return columns_data
+    
+    def read_columns(self, sheet_name: str, columns: List[int],
+                     first_row: int = 1, last_row: Optional[int] = None) -> Dict[int, List]:
+        """Читает выбранные колонки листа одним вызовом values.batchGet
+        
+        Args:
+            sheet_name: Название листа
+            columns: Индексы колонок (с 0, как в строках read_range)
+            first_row: Первая строка (с 1)
+            last_row: Последняя строка; None - до конца листа
+        
+        Returns:
+            Dict[int, List]: индекс_колонки → значения колонки сверху вниз
+                (хвостовые пустые ячейки API не возвращает)
+        """
+        columns_data = self.read_sheet_columns({sheet_name: columns}, first_row, last_row)
+        return columns_data.get(sheet_name, {})
+    
+    def _cell_format_requests(self, sheet_id: int, row: int, col: int,
+                              background_color: dict, note: str = None) -> List[Dict]:
+        """Формирует запросы batchUpdate для подсветки одной ячейки"""
+        cell_range = {
+            'sheetId': sheet_id,
+            'startRowIndex': row - 1,
+            'endRowIndex': row,
+            'startColumnIndex': col - 1,
+            'endColumnIndex': col
+        }
+        
+        requests = [{
+            'repeatCell': {
+                'range': cell_range,
+                'cell': {
+                    'userEnteredFormat': {
+                        'backgroundColor': background_color
+                    }
+                },
+                'fields': 'userEnteredFormat.backgroundColor'
+            }
+        }]
+        
+        # Добавляем комментарий если есть
+        if note:
             requests.append({
-                'repeatCell': {
-                    'range': {
-                        'sheetId': sheet_id,
-                        'startRowIndex': row - 1,
-                        'endRowIndex': row,
-                        'startColumnIndex': col - 1,
-                        'endColumnIndex': col
-                    },
-                    'cell': {
-                        'userEnteredFormat': {
-                            'backgroundColor': background_color
-                        }
-                    },
-                    'fields': 'userEnteredFormat.backgroundColor'
+                'updateCells': {
+                    'range': cell_range,
+                    'rows': [{
+                        'values': [{
+                            'note': note
+                        }]
+                    }],
+                    'fields': 'note'
                 }
             })
-            
-            # Добавляем комментарий если есть
-            if note:
-                requests.append({
-                    'updateCells': {
-                        'range': {
-                            'sheetId': sheet_id,
-                            'startRowIndex': row - 1,
-                            'endRowIndex': row,
-                            'startColumnIndex': col - 1,
-                            'endColumnIndex': col
-                        },
-                        'rows': [{
-                            'values': [{
-                                'note': note
-                            }]
-                        }],
-                        'fields': 'note'
-                    }
-                })
-            
-            service.spreadsheets().batchUpdate(
-                spreadsheetId=self.spreadsheet_id,
-                body={'requests': requests}
-            ).execute()
-            
+        
+        return requests
+    
+    def format_cells(self, sheet_name: str, cells: List[Dict],
+                     chunk_size: int = BATCH_UPDATE_CHUNK_SIZE) -> bool:
+        """Подсвечивает набор ячеек минимальным числом вызовов batchUpdate
+        
+        Args:
+            sheet_name: Название листа
+            cells: Список словарей с ключами row, col (нумерация с 1),
+                background_color и необязательным note
+            chunk_size: Максимум запросов в одном вызове batchUpdate
+        
+        Returns:
+            bool: True если все пакеты отправлены успешно
+        """
+        if not cells:
+            return True
+        
+        sheet_id = self.get_sheet_id(sheet_name)
+        if sheet_id is None:
+            logger.error("Лист %s не найден", sheet_name)
+            return False
+        
+        requests = []
+        for cell in cells:
+            requests.extend(self._cell_format_requests(
+                sheet_id,
+                cell['row'],
+                cell['col'],
+                cell['background_color'],
+                cell.get('note')
+            ))
+        
+        try:
+            service = self._get_service()
+            for start in range(0, len(requests), chunk_size):
+                self._execute(service.spreadsheets().batchUpdate(
+                    spreadsheetId=self.spreadsheet_id,
+                    body={'requests': requests[start:start + chunk_size]}
+                ), idempotent=False)
+            return True
+        except Exception as e:
+            logger.error("Ошибка форматирования ячеек в %s: %s", sheet_name, e)
+            return False
+    
+    def update_cell_format(self, sheet_name: str, row: int, col: int, 
+                          background_color: dict, note: str = None) -> bool:
+        """Обновляет форматирование ячейки"""
+        return self.format_cells(sheet_name, [{
+            'row': row,
+            'col': col,
+            'background_color': background_color,
+            'note': note
+        }])
+
+class SheetsBatch:
+    """Очередь изменений таблицы, отправляемая минимальным числом вызовов API
+    
+    Поддерживает запись диапазонов, добавление строк и подсветку ячеек.
+    Значения пишутся как USER_ENTERED (даты и числа разбираются так же, как
+    при вводе в таблицу): все записи диапазонов - одним values.batchUpdate,
+    строки - одним values.append на лист. Подсветка всех листов уходит
+    одним spreadsheets.batchUpdate (repeatCell / updateCells).
+    
+    В контекстном менеджере очередь отправляется при выходе из блока
+    и отбрасывается, если в блоке возникло исключение. После первой
+    неудачной отправки остальные изменения не отправляются.
+    """
+    
+    def __init__(self, client: GoogleSheets, chunk_size: int = BATCH_UPDATE_CHUNK_SIZE):
+        self.client = client
+        self.chunk_size = chunk_size
+        self.updates: List[Tuple[str, str, List[List]]] = []
+        self.appends: List[Tuple[str, List[List]]] = []
+        self.formats: List[Tuple[str, List[Dict]]] = []
+        self.success: Optional[bool] = None  # Результат последней отправки
+    
+    def __enter__(self) -> 'SheetsBatch':
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+        else:
+            self.discard()
+        return False
+    
+    def pending(self) -> int:
+        """Количество изменений в очереди"""
+        return len(self.updates) + len(self.appends) + len(self.formats)
+    
+    def write_range(self, sheet_name: str, range_name: str, values: List[List]) -> bool:
+        """Ставит в очередь запись диапазона"""
+        self.updates.append((sheet_name, range_name, values))
+        return True
+    
+    def append_rows(self, sheet_name: str, rows: List[List]) -> bool:
+        """Ставит в очередь добавление строк в конец листа"""
+        if rows:
+            self.appends.append((sheet_name, rows))
+        return True
+    
+    def format_cells(self, sheet_name: str, cells: List[Dict]) -> bool:
+        """Ставит в очередь подсветку ячеек (формат cells - как в GoogleSheets.format_cells)"""
+        if cells:
+            self.formats.append((sheet_name, cells))
+        return True
+    
+    def discard(self):
+        """Очищает очередь без отправки"""
+        self.updates = []
+        self.appends = []
+        self.formats = []
+    
+    def flush(self) -> bool:
+        """Отправляет накопленные изменения
+        
+        Returns:
+            bool: True если все изменения записаны (или очередь пуста)
+        """
+        if not self.pending():
+            self.success = True
             return True
+        
+        # Строки одного листа - одним values.append в порядке постановки в очередь
+        appends: Dict[str, List[List]] = {}
+        for sheet_name, rows in self.appends:
+            appends.setdefault(sheet_name, []).extend(rows)
+        
+        success = self.client.write_ranges(self.updates)
+        for sheet_name, rows in appends.items():
+            success = success and self.client.append_rows(sheet_name, rows)
+        self.success = success and self._flush_formats()
+        self.discard()
+        return self.success
+    
+    def _flush_formats(self) -> bool:
+        """Подсветка всех листов очереди - spreadsheets.batchUpdate пакетами по chunk_size"""
+        if not self.formats:
+            return True
+        
+        try:
+            requests = []
+            for sheet_name, cells in self.formats:
+                sheet_id = self.client.get_sheet_id(sheet_name)
+                if sheet_id is None:
+                    logger.error("Лист %s не найден", sheet_name)
+                    return False
+                for cell in cells:
+                    requests.extend(self.client._cell_format_requests(
+                        sheet_id,
+                        cell['row'],
+                        cell['col'],
+                        cell['background_color'],
+                        cell.get('note')
+                    ))
             
+            service = self.client._get_service()
+            for start in range(0, len(requests), self.chunk_size):
+                self.client._execute(service.spreadsheets().batchUpdate(
+                    spreadsheetId=self.client.spreadsheet_id,
+                    body={'requests': requests[start:start + self.chunk_size]}
+                ), idempotent=False)
+            return True
         except Exception as e:
-            print(f"ERROR: Ошибка форматирования ячейки: {e}")
+            logger.error("Ошибка пакетной подсветки ячеек: %s", e)
             return False
+        finally:
+            for sheet_name in {sheet_name for sheet_name, _ in self.formats}:
+                self.client.invalidate_cache(sheet_name)
 
 # Глобальный экземпляр
 sheets = GoogleSheets()
@@ -7,32 +7,62 @@
 - Каждый день добавляется 3 новых столбца справа (дата1, дата2, дата3)
 """
 
+import os
 import sys
+import threading
 from pathlib import Path
 from datetime import datetime, timedelta
-import re
-from typing import Dict, List, Tuple, Optional
+from contextlib import ExitStack
+from typing import Dict, Iterable, List, Tuple, Optional
+
+import numpy as np
 
 # Добавляем корневую папку проекта в путь
 project_root = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(project_root))
 
 from ai_agent.google.sheets import sheets
+from ai_agent.analysis.anomalies import Anomaly, AnomalyStore
+from ai_agent.analysis.changes import change_percent, comparable
+from ai_agent.analysis.dates import DateAxis
+from ai_agent.analysis.frame import METRIC_COL, PRODUCT_COL, SheetFrame
+from ai_agent.analysis.loader import read_frame, stitch_previous
+from ai_agent.analysis.numbers import parse_number
+from ai_agent.storage.watermarks import read_columns_incremental
 from ai_agent.config import config
+from ai_agent.log import get_logger
+from ai_agent.report import (MarkdownTemplate, ReportContext, ReportStats, create_template,
+                             iter_report, render)
+from ai_agent.telemetry import telemetry
+
+logger = get_logger(__name__)
 
 class AugustDailyAnalyzer:
     """Анализатор ежедневных изменений для листа Август 2025"""
     
-    def __init__(self):
+    def __init__(self, recent_days: Optional[int] = None, incremental: bool = False,
+                 stitch_months: Optional[bool] = None):
+        """
+        Args:
+            recent_days: Сколько последних дат читать из листа. Если None, читается
+                весь заполненный прямоугольник листа
+            incremental: Докачивать только новые колонки после watermark'а,
+                историю брать из локального кэша (recent_days игнорируется)
+            stitch_months: Брать "вчера" для первой даты месяца из листа предыдущего
+                месяца (по умолчанию STITCH_MONTHS)
+        """
         self.sheet_name = "Август 2025"
-        self.anomalies = []
+        self.recent_days = recent_days
+        self.incremental = incremental
+        self.stitch_months = config.STITCH_MONTHS if stitch_months is None else stitch_months
+        self.anomalies = AnomalyStore()
         self.today_date_str = None  # Дата из таблицы (для отчета)
         self.yesterday_date_str = None  # Дата из таблицы (для отчета)
         
         # Явно устанавливаем SPREADSHEET_ID если не задан
         if not sheets.spreadsheet_id or sheets.spreadsheet_id == '':
             sheets.spreadsheet_id = "18otXyOlqG4FAbLqyZReCwSPkKLGuhEWsVKFNoxctyvQ"
-            print("INFO: Использую SPREADSHEET_ID из кода")
+            logger.info("Использую SPREADSHEET_ID из кода")
         
         # Пороги отклонений по типам метрик (в процентах)
         self.thresholds = {
@@ -50,25 +80,8 @@ class AugustDailyAnalyzer:
             }
         }
     
-    def parse_number(self, value):
-        """Парсит число из строки с учетом форматирования"""
-        if not value or value == '' or str(value).strip() == '':
-            return None
-            
-        # Убираем все виды пробелов и заменяем запятые на точки
-        clean_value = str(value).replace(' ', '').replace('\xa0', '').replace(',', '.')
-        
-        # Убираем % если есть
-        clean_value = clean_value.replace('%', '')
-        
-        # Извлекаем число
-        match = re.search(r'-?\d+\.?\d*', clean_value)
-        if match:
-            try:
-                return float(match.group())
-            except ValueError:
-                return None
-        return None
+    # Общий парсер чисел (быстрый путь + память для повторяющихся строк)
+    parse_number = staticmethod(parse_number)
     
     def classify_metric(self, metric_name: str) -> str:
         """Определяет критичность метрики"""
@@ -86,72 +99,23 @@ class AugustDailyAnalyzer:
         category = self.classify_metric(metric_name)
         return self.thresholds[category]['threshold']
     
-    def find_date_columns(self, headers: List) -> List[Tuple[int, str]]:
-        """Находит колонки с датами в заголовках
+    def load_frame(self, sheet_name: str) -> Optional[SheetFrame]:
+        """Читает лист в колоночную модель
         
-        Returns:
-            List[Tuple[int, str]]: Список (индекс_колонки, дата_строка)
+        Без recent_days читается весь заполненный прямоугольник листа.
+        С recent_days - только колонки метрики/товара и последних N дат.
+        В режиме incremental - только новые колонки, остальные из кэша.
+        В начале месяца "вчера" берется из листа предыдущего месяца.
         """
-        date_columns = []
-        
-        # Паттерн для дат: DD.MM.YYYY или DD.MM.YY
-        date_pattern = r'\d{1,2}\.\d{1,2}\.\d{2,4}'
-        
-        for i, header in enumerate(headers):
-            if not header:
-                continue
-            
-            header_str = str(header).strip()
-            # Ищем дату в заголовке
-            match = re.search(date_pattern, header_str)
-            if match:
-                date_columns.append((i, match.group()))
-        
-        return date_columns
-    
-    def parse_date(self, date_str: str) -> Optional[datetime]:
-        """Парсит дату из строки"""
-        try:
-            # Пробуем разные форматы
-            for fmt in ['%d.%m.%Y', '%d.%m.%y', '%Y-%m-%d']:
-                try:
-                    return datetime.strptime(date_str, fmt)
-                except ValueError:
-                    continue
-            return None
-        except:
-            return None
-    
-    def find_last_two_dates(self, date_columns: List[Tuple[int, str]]) -> Tuple[Optional[int], Optional[int]]:
-        """Находит две последние даты (сегодня и вчера)
-        
-        Returns:
-            Tuple[Optional[int], Optional[int]]: (индекс_сегодня, индекс_вчера)
-        """
-        if len(date_columns) < 2:
-            return None, None
-        
-        # Парсим даты и сортируем
-        parsed_dates = []
-        for col_idx, date_str in date_columns:
-            date_obj = self.parse_date(date_str)
-            if date_obj:
-                parsed_dates.append((col_idx, date_obj, date_str))
-        
-        if len(parsed_dates) < 2:
-            return None, None
-        
-        # Сортируем по дате (самая свежая в конце)
-        parsed_dates.sort(key=lambda x: x[1])
-        
-        # Берем две последние
-        today_col = parsed_dates[-1][0]
-        yesterday_col = parsed_dates[-2][0]
-        
-        print(f"INFO: Найдены даты - Сегодня: колонка {today_col} ({parsed_dates[-1][2]}), "
-              f"Вчера: колонка {yesterday_col} ({parsed_dates[-2][2]})")
-        
-        return today_col, yesterday_col
+        min_dates = 2 if self.stitch_months else 0
+        if self.incremental:
+            headers = sheets.read_header(sheet_name)
+            date_columns = DateAxis.for_headers(headers).items()
+            columns = read_columns_incremental(sheet_name, date_columns, [METRIC_COL, PRODUCT_COL])
+            frame = SheetFrame.from_columns(headers, columns)
+            return stitch_previous(frame, sheet_name, min_dates) if len(frame) else None
+        
+        return read_frame(sheet_name, self.recent_days, min_dates)
     
     def analyze_daily_changes(self) -> Dict:
         """Анализирует изменения между сегодня и вчера
@@ -159,114 +123,50 @@ class AugustDailyAnalyzer:
         Returns:
             Dict: Результаты анализа с аномалиями
         """
-        print(f"INFO: Начинаем анализ листа {self.sheet_name}...")
+        logger.info("Начинаем анализ листа %s...", self.sheet_name)
         
         try:
-            # Читаем весь лист (расширенный диапазон для всех данных)
-            data = sheets.read_range(self.sheet_name, "A1:ZZ200")
+            # Читаем заполненную часть листа (или только последние даты)
+            frame = self.load_frame(self.sheet_name)
             
-            if not data or len(data) < 3:
-                print("ERROR: Недостаточно данных в листе")
+            if frame is None:
+                logger.error("Недостаточно данных в листе")
                 return {'success': False, 'error': 'Недостаточно данных'}
             
             # Первая строка - заголовки с датами
-            headers = data[0]
-            print(f"INFO: Всего колонок: {len(headers)}")
+            headers = frame.headers
+            logger.info("Всего колонок: %s", len(headers))
             
-            # Находим колонки с датами
-            date_columns = self.find_date_columns(headers)
-            print(f"INFO: Найдено колонок с датами: {len(date_columns)}")
+            # Находим колонки с датами (ось кэшируется по строке заголовков)
+            axis = DateAxis.for_headers(headers)
+            logger.info("Найдено колонок с датами: %s", len(axis))
             
-            if len(date_columns) < 2:
+            if len(axis) < 2:
                 return {
                     'success': False,
                     'error': 'Недостаточно дат для сравнения (нужно минимум 2 дня)'
                 }
             
-            # Находим две последние даты
-            today_col, yesterday_col = self.find_last_two_dates(date_columns)
+            # Две последние даты; строковые даты сохраняем для отчета
+            (yesterday_col, self.yesterday_date_str), (today_col, self.today_date_str) = axis.last(2)
+            logger.info("Найдены даты - Сегодня: колонка %s (%s), Вчера: колонка %s (%s)",
+                        today_col, self.today_date_str, yesterday_col, self.yesterday_date_str)
             
-            if today_col is None or yesterday_col is None:
-                return {
-                    'success': False,
-                    'error': 'Не удалось определить последние две даты'
-                }
-            
-            # Сохраняем строковые даты для отчета
-            for col_idx, date_str in date_columns:
-                if col_idx == today_col:
-                    self.today_date_str = date_str
-                if col_idx == yesterday_col:
-                    self.yesterday_date_str = date_str
+            # Считаем изменения сразу по всем строкам
+            today_values = frame.column(today_col)
+            yesterday_values = frame.column(yesterday_col)
             
-            # Анализируем каждую строку с метриками
-            anomalies = []
-            metrics_analyzed = 0
+            # Изменения и превышения порогов
+            valid, change_pcts, flagged = self.detect(frame, today_values, yesterday_values)
+            metrics_analyzed = int(valid.sum())
             
-            for row_idx, row in enumerate(data[2:], start=3):  # Начинаем с 3-й строки
-                if not row or len(row) <= max(today_col, yesterday_col):
-                    continue
-                
-                # Первая колонка - название метрики
-                # Вторая колонка может содержать товар/категорию
-                metric_name = str(row[0]).strip() if len(row) > 0 else ""
-                product_name = str(row[1]).strip() if len(row) > 1 else ""
-                
-                if not metric_name:
-                    continue
-                
-                # Объединяем метрику и товар для более понятного названия
-                if product_name and product_name not in metric_name:
-                    full_metric_name = f"{metric_name} ({product_name})"
-                else:
-                    full_metric_name = metric_name
-                
-                # Получаем значения
-                today_value = self.parse_number(row[today_col]) if today_col < len(row) else None
-                yesterday_value = self.parse_number(row[yesterday_col]) if yesterday_col < len(row) else None
-                
-                if today_value is None or yesterday_value is None:
-                    continue
-                
-                # Пропускаем если оба значения нулевые
-                if today_value == 0 and yesterday_value == 0:
-                    continue
-                
-                # Вычисляем изменение в процентах
-                if yesterday_value == 0:
-                    if today_value == 0:
-                        continue
-                    change_pct = 100  # Рост с нуля
-                else:
-                    change_pct = ((today_value - yesterday_value) / abs(yesterday_value)) * 100
-                
-                metrics_analyzed += 1
-                
-                # Проверяем порог
-                threshold = self.get_threshold(metric_name)
-                if abs(change_pct) >= threshold:
-                    category = self.classify_metric(metric_name)
-                    
-                    anomaly = {
-                        'row': row_idx,
-                        'col_today': today_col,
-                        'col_yesterday': yesterday_col,
-                        'metric': full_metric_name,  # Используем полное имя с товаром
-                        'yesterday_value': yesterday_value,
-                        'today_value': today_value,
-                        'change_pct': round(change_pct, 2),
-                        'category': category,
-                        'threshold': threshold,
-                        'direction': '⬆️' if change_pct > 0 else '⬇️'
-                    }
-                    
-                    anomalies.append(anomaly)
-                    print(f"INFO: Найдено отклонение - {full_metric_name}: {change_pct:+.1f}% ({category})")
+            anomalies = self.collect_anomalies(frame, np.flatnonzero(flagged), today_col, yesterday_col,
+                                               today_values, yesterday_values, change_pcts)
             
             self.anomalies = anomalies
             
-            print(f"INFO: Проанализировано метрик: {metrics_analyzed}")
-            print(f"INFO: Найдено отклонений: {len(anomalies)}")
+            logger.info("Проанализировано метрик: %s", metrics_analyzed)
+            logger.info("Найдено отклонений: %s", len(anomalies))
             
             return {
                 'success': True,
@@ -276,23 +176,78 @@ class AugustDailyAnalyzer:
                 'yesterday_col': yesterday_col,
                 'sheet_name': self.sheet_name
             }
-            
+        
         except Exception as e:
-            print(f"ERROR: Ошибка при анализе: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Ошибка при анализе: %s", e)
             return {
                 'success': False,
                 'error': str(e)
             }
     
+    def detect(self, frame: SheetFrame, today_values: np.ndarray,
+               yesterday_values: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Сравнимые значения, изменения в процентах и превышения порогов
+        
+        Работает и с векторами (одна пара дат), и с матрицами строки × дни.
+        
+        Returns:
+            Tuple: (маска сравнимых, изменение в %, маска отклонений)
+        """
+        # Строки с метрикой и обоими значениями, пропускаем если оба значения нулевые
+        valid = comparable(frame.has_metric, today_values, yesterday_values)
+        
+        # Вычисляем изменение в процентах (рост с нуля считаем как 100%)
+        change_pcts = change_percent(today_values, yesterday_values)
+        
+        # Проверяем порог (порог считается один раз на уникальную метрику)
+        thresholds = frame.map_metrics(self.get_threshold)
+        if change_pcts.ndim == 2:
+            thresholds = thresholds[:, None]
+        flagged = valid & (np.abs(change_pcts) >= thresholds)
+        return valid, change_pcts, flagged
+    
+    def collect_anomalies(self, frame: SheetFrame, positions: np.ndarray, today_col: int,
+                          yesterday_col: int, today_values: np.ndarray, yesterday_values: np.ndarray,
+                          change_pcts: np.ndarray) -> AnomalyStore:
+        """Отклонения по позициям строк (векторы значений - одной пары дат)"""
+        anomalies = AnomalyStore()
+        for pos in positions:
+            # Первая колонка - название метрики
+            # Вторая колонка может содержать товар/категорию
+            metric_name = frame.metrics[pos]
+            product_name = frame.products[pos]
+            
+            # Объединяем метрику и товар для более понятного названия
+            if product_name and product_name not in metric_name:
+                full_metric_name = f"{metric_name} ({product_name})"
+            else:
+                full_metric_name = metric_name
+            
+            change_pct = float(change_pcts[pos])
+            category = self.classify_metric(metric_name)
+            
+            anomalies.add(Anomaly(
+                row=int(frame.row_numbers[pos]),
+                col_today=today_col,
+                col_yesterday=yesterday_col,
+                metric=full_metric_name,  # Используем полное имя с товаром
+                product=product_name,
+                yesterday_value=float(yesterday_values[pos]),
+                today_value=float(today_values[pos]),
+                change_pct=round(change_pct, 2),
+                category=category,
+                threshold=self.thresholds[category]['threshold']
+            ))
+            logger.debug("Найдено отклонение - %s: %+.1f%% (%s)", full_metric_name, change_pct, category)
+        return anomalies
+    
     def highlight_cells(self) -> bool:
         """Подсвечивает ячейки с отклонениями в Google Sheets"""
         if not self.anomalies:
-            print("INFO: Нет отклонений для подсветки")
+            logger.info("Нет отклонений для подсветки")
             return True
         
-        print(f"INFO: Подсвечиваем {len(self.anomalies)} ячеек...")
+        logger.info("Подсвечиваем %s ячеек...", len(self.anomalies))
         
         try:
             # Группируем по категориям для цветовой подсветки
@@ -314,167 +269,139 @@ class AugustDailyAnalyzer:
                 }  # Светло-зеленый
             }
             
+            cells = []
             for anomaly in self.anomalies:
-                row = anomaly['row']
-                col = anomaly['col_today'] + 1  # +1 для корректного индекса в Google Sheets (с 1, а не с 0)
-                category = anomaly['category']
-                background_color = color_mappings.get(category, color_mappings['normal'])
+                category = anomaly.category
                 
                 # Формируем комментарий
-                note = (f"AI Агент: {anomaly['direction']} {abs(anomaly['change_pct']):.1f}%\n"
-                       f"Вчера: {anomaly['yesterday_value']}\n"
-                       f"Сегодня: {anomaly['today_value']}")
+                note = (f"AI Агент: {anomaly.direction} {abs(anomaly.change_pct):.1f}%\n"
+                       f"Вчера: {anomaly.yesterday_value}\n"
+                       f"Сегодня: {anomaly.today_value}")
                 
-                # Подсвечиваем через Google Sheets API
-                success = sheets.update_cell_format(
-                    self.sheet_name,
-                    row,
-                    col,
-                    background_color,
-                    note
-                )
-                
-                if success:
-                    icon = '[CRITICAL]' if category == 'critical' else '[IMPORTANT]' if category == 'important' else '[NORMAL]'
-                    print(f"  {icon} Подсвечено: {anomaly['metric']} (строка {row}, колонка {col})")
-                else:
-                    print(f"  WARNING: Не удалось подсветить {anomaly['metric']}")
+                cells.append({
+                    'row': anomaly.row,
+                    'col': anomaly.col_today + 1,  # +1 для корректного индекса в Google Sheets (с 1, а не с 0)
+                    'background_color': color_mappings.get(category, color_mappings['normal']),
+                    'note': note
+                })
             
-            print(f"SUCCESS: Подсветка завершена ({len(self.anomalies)} ячеек)")
-            return True
+            # Подсвечиваем все ячейки пакетными вызовами Google Sheets API
+            if not sheets.format_cells(self.sheet_name, cells):
+                logger.warning("Не удалось подсветить %s ячеек", len(cells))
+                return False
             
+            logger.info("Подсветка завершена (%s ячеек)", len(self.anomalies))
+            return True
+        
         except Exception as e:
-            print(f"ERROR: Ошибка при подсветке ячеек: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Ошибка при подсветке ячеек: %s", e)
             return False
     
-    def generate_markdown_report(self, today_date: str = None, yesterday_date: str = None) -> str:
-        """Генерирует MD отчет с найденными отклонениями"""
-        if not self.anomalies:
-            return "# Ежедневный анализ\n\nОтклонений не найдено ✅"
-        
-        # Группируем по категориям
-        by_category = {
-            'critical': [],
-            'important': [],
-            'normal': []
-        }
-        
-        for anomaly in self.anomalies:
-            category = anomaly['category']
-            by_category[category].append(anomaly)
-        
-        # Генерируем отчет
-        analysis_date = datetime.now().strftime('%Y-%m-%d')
-        
-        # Формируем заголовок с датами из таблицы
-        if today_date and yesterday_date:
-            date_comparison = f"{today_date} в сравнении с {yesterday_date}"
+    def report_context(self, today_date: str = None, yesterday_date: str = None) -> ReportContext:
+        """Шапка отчета (даты из таблицы)"""
+        return ReportContext(self.sheet_name, today_date, yesterday_date)
+    
+    @telemetry.timed('report_generation')
+    def generate_markdown_report(self, today_date: str = None, yesterday_date: str = None,
+                                 limit: Optional[int] = None,
+                                 anomalies: Optional[Iterable[Anomaly]] = None) -> str:
+        """Генерирует MD отчет с найденными отклонениями
+        
+        Args:
+            limit: Сколько худших отклонений показывать в каждом разделе
+                (статистика - по всем); None - все
+            anomalies: Готовая выборка вместо всех отклонений (например, страница
+                AnomalyStore.page); раскладывается по разделам в порядке отчета
+        """
+        template = MarkdownTemplate(self.report_context(today_date, yesterday_date))
+        stats = ReportStats.from_counts(self.anomalies.counts())
+        if anomalies is None:
+            selection = self.anomalies.ordered(limit)
         else:
-            date_comparison = analysis_date
-        
-        report = f"# Ежедневный анализ: {date_comparison}\n\n"
-        report += f"**Лист:** {self.sheet_name}\n"
-        report += f"**Дата проверки:** {analysis_date}\n\n"
-        report += "---\n\n"
-        
-        # Критичные отклонения
-        if by_category['critical']:
-            report += "## 🔴 Критичные отклонения (требуют немедленного внимания)\n\n"
-            for anomaly in sorted(by_category['critical'], key=lambda x: abs(x['change_pct']), reverse=True):
-                report += f"### {anomaly['metric']}\n"
-                report += f"- **Вчера**: {anomaly['yesterday_value']}\n"
-                report += f"- **Сегодня**: {anomaly['today_value']}\n"
-                report += f"- **Изменение**: **{anomaly['change_pct']:+.1f}%** {anomaly['direction']}\n"
-                report += f"- **Строка**: {anomaly['row']}\n\n"
-            report += "---\n\n"
-        
-        # Важные отклонения
-        if by_category['important']:
-            report += "## 🟡 Важные отклонения (рекомендуется проверить)\n\n"
-            for anomaly in sorted(by_category['important'], key=lambda x: abs(x['change_pct']), reverse=True):
-                report += f"### {anomaly['metric']}\n"
-                report += f"- **Вчера**: {anomaly['yesterday_value']}\n"
-                report += f"- **Сегодня**: {anomaly['today_value']}\n"
-                report += f"- **Изменение**: **{anomaly['change_pct']:+.1f}%** {anomaly['direction']}\n"
-                report += f"- **Строка**: {anomaly['row']}\n\n"
-            report += "---\n\n"
-        
-        # Статистика
-        report += "## 📊 Статистика\n\n"
-        report += f"- Критичных отклонений: {len(by_category['critical'])}\n"
-        report += f"- Важных отклонений: {len(by_category['important'])}\n"
-        report += f"- Всего отклонений: {len(self.anomalies)}\n\n"
-        
-        # Рекомендации
-        report += "## 💡 Рекомендации\n\n"
-        if by_category['critical']:
-            report += "1. **Приоритет 1**: Проверить критичные метрики (CR, конверсия, выручка)\n"
-        if by_category['important']:
-            report += "2. **Приоритет 2**: Проанализировать важные метрики (CTR, клики, показы)\n"
-        report += "3. **Проверить**: Возможные причины - цены конкурентов, рекламные ставки, контент\n"
-        report += "4. **Обратиться**: К алгоритму действий для конкретных рекомендаций\n\n"
-        
-        report += "---\n\n"
-        report += f"*Отчет сгенерирован автоматически AI-агентом*\n"
-        report += f"*Время анализа: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*\n"
-        
-        return report
+            # Выборка уже отсортирована по |change_pct|, стабильная сортировка по категории сохраняет это
+            rank = {category: index for index, category in enumerate(self.anomalies.categories())}
+            selection = sorted(anomalies, key=lambda anomaly: rank[anomaly.category])
+        return ''.join(iter_report(selection, template, stats))
     
-    def save_report(self, report: str) -> str:
-        """Сохраняет отчет в файл"""
-        today = datetime.now().strftime('%Y-%m-%d')
-        filename = f"daily-report-{today}.md"
-        filepath = Path("reports") / filename
+    def report_path(self, extension: str, report_date: Optional[str] = None) -> Path:
+        """Путь отчета: reports/daily-report-YYYY-MM-DD.{extension}
         
-        # Создаем папку если нет
-        filepath.parent.mkdir(exist_ok=True)
+        Args:
+            report_date: Дата в имени файла (YYYY-MM-DD); по умолчанию - сегодня
+        """
+        report_date = report_date or datetime.now().strftime('%Y-%m-%d')
+        return Path("reports") / f"daily-report-{report_date}.{extension}"
+    
+    @telemetry.timed('report_generation')
+    def write_reports(self, today_date: str = None, yesterday_date: str = None,
+                      formats: Optional[List[str]] = None, report_date: Optional[str] = None) -> Dict[str, str]:
+        """Пишет отчеты во всех форматах за один проход по отклонениям
         
-        # Сохраняем отчет
-        filepath.write_text(report, encoding='utf-8')
-        print(f"INFO: Отчет сохранен в {filepath}")
+        Args:
+            formats: Форматы ('md', 'csv', 'json'); по умолчанию - REPORT_FORMATS
+            report_date: Дата в имени файлов (YYYY-MM-DD); по умолчанию - сегодня
         
-        return str(filepath)
+        Returns:
+            Dict[str, str]: Формат → путь файла
+        """
+        context = self.report_context(today_date, yesterday_date)
+        templates = [create_template(name, context) for name in formats or config.REPORT_FORMATS]
+        paths = {template.extension: self.report_path(template.extension, report_date) for template in templates}
+        next(iter(paths.values())).parent.mkdir(exist_ok=True)
+        
+        # Пишем во временные файлы и подменяем целиком: параллельные запуски
+        # (пул потоков MCP-сервера) не перемешивают куски в одном файле
+        suffix = f".{os.getpid()}-{threading.get_ident()}.tmp"
+        tmp_paths = {extension: path.with_name(path.name + suffix) for extension, path in paths.items()}
+        with ExitStack() as stack:
+            outputs = [
+                (template, stack.enter_context(open(tmp_paths[template.extension], 'w', encoding='utf-8', newline='')))
+                for template in templates
+            ]
+            render(self.anomalies.ordered(), outputs)
+        
+        for extension, path in paths.items():
+            os.replace(tmp_paths[extension], path)
+            logger.info("Отчет сохранен в %s", path)
+        return {extension: str(path) for extension, path in paths.items()}
     
     def commit_and_push_to_github(self, report_path: str) -> str:
         """Коммитит изменения и пушит в GitHub, возвращает ссылку на отчет"""
         import subprocess
         
-        print("\nINFO: Коммит и пуш в GitHub...")
+        logger.info("Коммит и пуш в GitHub...")
         
         try:
-            # Используем дату из таблицы (которую проверяли), а не сегодняшнюю
-            analyzed_date = self.today_date_str if self.today_date_str else datetime.now().strftime('%d.%m')
-            
-            # Git add
-            subprocess.run(['git', 'add', '.'], check=True, capture_output=True)
-            print("  [OK] git add .")
-            
-            # Git commit с датой анализируемых данных
-            commit_message = f"Daily report: {analyzed_date} - {len(self.anomalies)} anomalies found"
-            subprocess.run(['git', 'commit', '-m', commit_message], check=True, capture_output=True)
-            print(f"  [OK] git commit -m '{commit_message}'")
-            
-            # Git push
-            subprocess.run(['git', 'push'], check=True, capture_output=True)
-            print("  [OK] git push")
-            
-            # Формируем ссылку на отчет в GitHub
-            github_repo = "https://github.com/EvgeniyRibakov/demoAIagent"
-            github_report_link = f"{github_repo}/blob/main/{report_path.replace(chr(92), '/')}"
-            
-            print(f"\nSUCCESS: Изменения отправлены в GitHub")
-            print(f"Ссылка на отчет: {github_report_link}")
-            
-            return github_report_link
-            
+            with telemetry.span('git_push'):
+                # Используем дату из таблицы (которую проверяли), а не сегодняшнюю
+                analyzed_date = self.today_date_str if self.today_date_str else datetime.now().strftime('%d.%m')
+                
+                # Git add
+                subprocess.run(['git', 'add', '.'], check=True, capture_output=True)
+                logger.info("[OK] git add .")
+                
+                # Git commit с датой анализируемых данных
+                commit_message = f"Daily report: {analyzed_date} - {len(self.anomalies)} anomalies found"
+                subprocess.run(['git', 'commit', '-m', commit_message], check=True, capture_output=True)
+                logger.info("[OK] git commit -m '%s'", commit_message)
+                
+                # Git push
+                subprocess.run(['git', 'push'], check=True, capture_output=True)
+                logger.info("[OK] git push")
+                
+                # Формируем ссылку на отчет в GitHub
+                github_repo = "https://github.com/EvgeniyRibakov/demoAIagent"
+                github_report_link = f"{github_repo}/blob/main/{report_path.replace(chr(92), '/')}"
+                
+                logger.info("Изменения отправлены в GitHub, ссылка на отчет: %s", github_report_link)
+                
+                return github_report_link
+        
         except subprocess.CalledProcessError as e:
-            print(f"WARNING: Ошибка Git: {e}")
-            print("  Возможно, нет изменений для коммита или проблема с аутентификацией")
+            logger.warning("Ошибка Git: %s. Возможно, нет изменений для коммита или проблема с аутентификацией", e)
             return None
         except Exception as e:
-            print(f"ERROR: Ошибка при работе с Git: {e}")
+            logger.error("Ошибка при работе с Git: %s", e)
             return None
 
 def main():
@@ -483,24 +410,25 @@ def main():
     print("АНАЛИЗ ЕЖЕДНЕВНЫХ ИЗМЕНЕНИЙ")
     print("=" * 60)
     
-    analyzer = AugustDailyAnalyzer()
+    # Докачиваем только новые колонки, история - из локального кэша
+    analyzer = AugustDailyAnalyzer(incremental=True)
     
     # Анализируем
     result = analyzer.analyze_daily_changes()
     
     if not result['success']:
-        print(f"ERROR: {result.get('error', 'Неизвестная ошибка')}")
+        logger.error("%s", result.get('error', 'Неизвестная ошибка'))
         return
     
     # Подсвечиваем ячейки
     analyzer.highlight_cells()
     
-    # Генерируем и сохраняем отчет
-    report = analyzer.generate_markdown_report(
+    # Генерируем и сохраняем отчеты (Markdown, CSV, JSON - за один проход)
+    report_paths = analyzer.write_reports(
         today_date=analyzer.today_date_str,
         yesterday_date=analyzer.yesterday_date_str
     )
-    report_path = analyzer.save_report(report)
+    report_path = report_paths.get('md') or next(iter(report_paths.values()))
     
     # Коммитим и пушим в GitHub
     github_link = analyzer.commit_and_push_to_github(report_path)
@@ -511,7 +439,7 @@ def main():
         with open(report_path, 'a', encoding='utf-8') as f:
             f.write(f"\n---\n\n")
             f.write(f"**📎 Ссылка на отчет в GitHub:** [{report_path}]({github_link})\n")
-        print(f"\nINFO: Ссылка на GitHub добавлена в отчет")
+        logger.info("Ссылка на GitHub добавлена в отчет")
     
     print("\n" + "=" * 60)
     print("АНАЛИЗ ЗАВЕРШЕН")
@@ -520,10 +448,14 @@ def main():
     print(f"Отчет сохранен: {report_path}")
     if github_link:
         print(f"GitHub ссылка: {github_link}")
+    
+    # Сводка телеметрии прогона - под именем отчета в METRICS_DIR
+    metrics_paths = telemetry.export(Path(config.METRICS_DIR) / Path(report_path).stem)
+    if metrics_paths:
+        print(f"Метрики прогона: {', '.join(metrics_paths)}")
     print("\nКритичные отклонения:")
-    for anomaly in analyzer.anomalies:
-        if anomaly['category'] == 'critical':
-            print(f"  [CRITICAL] {anomaly['metric']}: {anomaly['change_pct']:+.1f}%")
+    for anomaly in analyzer.anomalies.top(category='critical'):
+        print(f"  [CRITICAL] {anomaly.metric}: {anomaly.change_pct:+.1f}%")
 
 if __name__ == "__main__":
     main()
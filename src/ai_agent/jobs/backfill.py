@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Историческая перепроверка (backfill) листа месяца за один проход
+
+Лист читается один раз. Изменения всех соседних дней считаются одним
+векторным выражением по матрице (строки × даты), базовые линии правил -
+скользящими окнами по той же матрице. Дальше по каждому дню:
+- пороги: отчеты reports/daily-report-<дата данных>.{md,csv,json};
+- правила Algorithm: сигналы и решения всех дней одним пакетом в Signals/Decisions.
+
+Первая дата листа сравнивается с последней датой листа предыдущего месяца
+(STITCH_MONTHS): его хвост приклеивается к матрице по ключу (метрика, товар).
+Без предыдущего листа первая дата пропускается.
+С --local листы берутся из локальной истории (sync-history) без чтения API.
+
+Пример:
+    backfill --sheet "Август 2025" --from 01.08.2025 --to 31.08.2025
+    backfill --mode algorithm --no-signals
+    backfill --local --mode thresholds
+"""
+
+import argparse
+import sys
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+# Добавляем корневую папку проекта в путь
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from ai_agent.google.sheets import sheets
+from ai_agent.analysis.baselines import rolling_baselines
+from ai_agent.analysis.changes import change_percent, comparable
+from ai_agent.analysis.dates import DateAxis, to_date
+from ai_agent.analysis.frame import SheetFrame
+from ai_agent.analysis.loader import read_frame, read_previous_tail
+from ai_agent.analysis.rules import RuleContext
+from ai_agent.analysis.stitch import previous_month_sheet, stitch_frames
+from ai_agent.config import config
+from ai_agent.jobs.august_daily_analyzer import AugustDailyAnalyzer
+from ai_agent.jobs.daily_analyzer_with_algorithm import DailyAnalyzerWithAlgorithm
+from ai_agent.log import get_logger
+from ai_agent.storage.history import history_store
+from ai_agent.telemetry import telemetry
+
+logger = get_logger(__name__)
+
+# Режимы проверки: пороги по типам метрик и правила листа Algorithm
+MODES = ('thresholds', 'algorithm')
+
+class MonthBackfill:
+    """Перепроверка всех дней листа месяца по одному чтению листа"""
+    
+    def __init__(self, sheet_name: Optional[str] = None, modes: Sequence[str] = MODES,
+                 start: Optional[str] = None, end: Optional[str] = None,
+                 formats: Optional[List[str]] = None, write_signals: bool = True,
+                 baseline_window: Optional[int] = None, local: bool = False):
+        """
+        Args:
+            sheet_name: Лист месяца. Если None, берется последний найденный лист месяца
+            modes: Режимы проверки (см. MODES)
+            start: Первая проверяемая дата (DD.MM.YYYY или YYYY-MM-DD), None - с начала листа
+            end: Последняя проверяемая дата, None - до конца листа
+            formats: Форматы отчетов; по умолчанию - REPORT_FORMATS
+            write_signals: Записать сработавшие правила в Signals и Decisions
+            baseline_window: Окно базовой линии в датах (по умолчанию ROLLING_WINDOW_DAYS)
+            local: Брать лист из локальной истории (history_store), а не из API
+        """
+        self.modes = list(modes)
+        self.start = start
+        self.end = end
+        self.formats = formats
+        self.write_signals = write_signals
+        self.local = local
+        self.thresholds = AugustDailyAnalyzer()
+        self.algorithm = DailyAnalyzerWithAlgorithm(sheet_name, baseline_window=baseline_window)
+        self.sheet_name = sheet_name
+        self.report_paths: Dict[str, Dict[str, str]] = {}
+        self.signals: List[Dict] = []
+    
+    def resolve_sheet(self) -> Optional[str]:
+        """Лист для перепроверки (последний лист месяца, если не задан)"""
+        if not self.sheet_name:
+            month_sheets = history_store.stored_sheets() if self.local else self.algorithm.find_month_sheets()
+            if not month_sheets:
+                return None
+            self.sheet_name = month_sheets[-1]
+            logger.info("Автоматически выбран лист: %s", self.sheet_name)
+        self.thresholds.sheet_name = self.sheet_name
+        self.algorithm.sheet_name = self.sheet_name
+        return self.sheet_name
+    
+    def load(self) -> Optional[SheetFrame]:
+        """Читает весь заполненный прямоугольник листа - единственное чтение данных"""
+        if self.local:
+            return history_store.load_frame(self.sheet_name)
+        return read_frame(self.sheet_name)
+    
+    def load_previous(self, days: int) -> Optional[SheetFrame]:
+        """Последние days дат листа предыдущего месяца (None, если листа нет)"""
+        if not self.local:
+            return read_previous_tail(self.sheet_name, days)
+        previous = previous_month_sheet(self.sheet_name, history_store.stored_sheets())
+        if previous is None:
+            return None
+        logger.info("Склейка с листом '%s' (дат: %s)", previous, days)
+        return history_store.load_frame(previous)
+    
+    def stitch(self, frame: SheetFrame) -> SheetFrame:
+        """Дополняет лист датами предыдущего месяца: вчера для первой даты и окно правил"""
+        if not self.algorithm.stitch_months:
+            return frame
+        days = self.algorithm.baseline_window if 'algorithm' in self.modes else 1
+        previous = self.load_previous(days)
+        return stitch_frames(frame, [previous], days) if previous is not None else frame
+    
+    def days(self, axis: DateAxis, first_date: Optional[date] = None) -> List[int]:
+        """Позиции проверяемых дат на оси (у каждой есть предыдущая дата)
+        
+        Args:
+            first_date: Первая дата самого листа (раньше - приклеенные даты
+                предыдущего месяца, они не проверяются)
+        """
+        start = to_date(self.start) if self.start else None
+        if first_date and (start is None or start < first_date):
+            start = first_date
+        return [index for index in axis.index_range(start, self.end) if index > 0]
+    
+    def backfill_thresholds(self, frame: SheetFrame, axis: DateAxis, matrix: np.ndarray,
+                            days: List[int]) -> int:
+        """Пороговая проверка всех дней и отчеты за каждый день
+        
+        Returns:
+            int: Всего отклонений за все дни
+        """
+        analyzer = self.thresholds
+        today, yesterday = matrix[:, 1:], matrix[:, :-1]
+        _, change_pcts, flagged = analyzer.detect(frame, today, yesterday)
+        
+        total = 0
+        for index in days:
+            day = index - 1  # Колонка матриц изменений
+            analyzer.anomalies = analyzer.collect_anomalies(
+                frame, np.flatnonzero(flagged[:, day]), axis.columns[index], axis.columns[index - 1],
+                today[:, day], yesterday[:, day], change_pcts[:, day]
+            )
+            analyzer.yesterday_date_str = axis.labels[index - 1]
+            analyzer.today_date_str = axis.labels[index]
+            self.report_paths[axis.labels[index]] = analyzer.write_reports(
+                analyzer.today_date_str, analyzer.yesterday_date_str, self.formats,
+                report_date=axis.dates[index].isoformat()
+            )
+            logger.info("[%s] Отклонений: %s", axis.labels[index], len(analyzer.anomalies))
+            total += len(analyzer.anomalies)
+        return total
+    
+    def backfill_algorithm(self, frame: SheetFrame, axis: DateAxis, matrix: np.ndarray,
+                           days: List[int]) -> List[Dict]:
+        """Проверка всех дней правилами Algorithm
+        
+        Базовая линия дня - окно из baseline_window дат строго до него, как в
+        ежедневном прогоне.
+        """
+        analyzer = self.algorithm
+        today, yesterday = matrix[:, 1:], matrix[:, :-1]
+        valid = comparable(frame.has_metric, today, yesterday)
+        change_pcts = change_percent(today, yesterday, from_zero=np.where(today > 0, 100.0, 0.0))
+        
+        baselines = rolling_baselines(matrix, axis.columns, analyzer.baseline_window)
+        deltas = baselines.delta(matrix)
+        
+        anomalies = []
+        for index in days:
+            day = index - 1
+            context = RuleContext(deltas[:, index], baselines.count[:, index], matrix[:, index],
+                                  baselines.mean[:, index], baselines.std[:, index])
+            matches = analyzer.collect_matches(
+                self.sheet_name, frame, valid[:, day], context, change_pcts[:, day],
+                yesterday[:, day], axis.columns[index], axis.labels[index]
+            )
+            logger.info("[%s] Сработало правил: %s", axis.labels[index], len(matches))
+            anomalies.extend(matches)
+        return anomalies
+    
+    def save_signals(self, anomalies: List[Dict]) -> bool:
+        """Сигналы и решения всех дней - одним пакетом"""
+        analyzer = self.algorithm
+        analyzer.anomalies = anomalies
+        with sheets.batch() as batch:
+            analyzer.save_to_signals(batch)
+            analyzer.save_to_decisions(batch)
+        if batch.success is False:
+            logger.error("Не удалось сохранить сигналы и решения")
+            return False
+        logger.info("Сигналы и решения сохранены (%s)", len(anomalies))
+        return True
+    
+    def run(self) -> bool:
+        """Перепроверяет все дни листа"""
+        if not self.resolve_sheet():
+            logger.error("Не найдены листы месяцев")
+            return False
+        
+        # Правила читаются до листа: без них режим algorithm пропускается
+        if 'algorithm' in self.modes and not self.algorithm.load_rules():
+            logger.warning("Нет правил Algorithm - проверка правилами пропущена")
+            self.modes.remove('algorithm')
+        
+        logger.info("Читаем лист '%s'...", self.sheet_name)
+        frame = self.load()
+        if frame is None:
+            logger.error("Недостаточно данных в листе")
+            return False
+        
+        first_date = DateAxis.for_headers(frame.headers).first_date
+        frame = self.stitch(frame)
+        axis = DateAxis.for_headers(frame.headers)
+        days = self.days(axis, first_date)
+        if not days:
+            logger.error("Нет дат для перепроверки (нужна дата с предыдущим днем в листе)")
+            return False
+        logger.info("Дат для перепроверки: %s (%s - %s)", len(days), axis.labels[days[0]], axis.labels[days[-1]])
+        
+        # Все даты одной матрицей (вместе с приклеенными): соседние дни - сдвиг на одну колонку
+        matrix = frame.matrix(axis.columns)
+        
+        if 'thresholds' in self.modes:
+            with telemetry.span('backfill', mode='thresholds'):
+                total = self.backfill_thresholds(frame, axis, matrix, days)
+            logger.info("Пороги: %s отклонений за %s дней", total, len(days))
+        
+        if 'algorithm' in self.modes:
+            with telemetry.span('backfill', mode='algorithm'):
+                self.signals = self.backfill_algorithm(frame, axis, matrix, days)
+            logger.info("Правила: %s срабатываний за %s дней", len(self.signals), len(days))
+            if self.write_signals and self.signals:
+                self.save_signals(self.signals)
+        
+        return True
+
+def main():
+    """Основная функция"""
+    parser = argparse.ArgumentParser(description="Перепроверка всех дней листа месяца за одно чтение")
+    parser.add_argument('--sheet', help="Лист месяца (по умолчанию - последний лист месяца)")
+    parser.add_argument('--mode', choices=MODES + ('all',), default='all',
+                        help="Пороги, правила Algorithm или оба режима")
+    parser.add_argument('--from', dest='start', help="Первая дата (DD.MM.YYYY или YYYY-MM-DD)")
+    parser.add_argument('--to', dest='end', help="Последняя дата (DD.MM.YYYY или YYYY-MM-DD)")
+    parser.add_argument('--formats', help="Форматы отчетов через запятую (по умолчанию REPORT_FORMATS)")
+    parser.add_argument('--window', type=int, help="Окно базовой линии в датах")
+    parser.add_argument('--no-signals', action='store_true', help="Не записывать Signals и Decisions")
+    parser.add_argument('--local', action='store_true', help="Брать лист из локальной истории (sync-history)")
+    args = parser.parse_args()
+    
+    print("=" * 60)
+    print("ПЕРЕПРОВЕРКА ИСТОРИИ ЛИСТА")
+    print("=" * 60)
+    
+    backfill = MonthBackfill(
+        sheet_name=args.sheet,
+        modes=MODES if args.mode == 'all' else (args.mode,),
+        start=args.start,
+        end=args.end,
+        formats=[name.strip() for name in args.formats.split(',') if name.strip()] if args.formats else None,
+        write_signals=not args.no_signals,
+        baseline_window=args.window,
+        local=args.local
+    )
+    if not backfill.run():
+        return
+    
+    print("\n" + "=" * 60)
+    print("ПЕРЕПРОВЕРКА ЗАВЕРШЕНА")
+    print("=" * 60)
+    print(f"Лист: {backfill.sheet_name}")
+    print(f"Отчетов (дней): {len(backfill.report_paths)}")
+    print(f"Срабатываний правил: {len(backfill.signals)}")
+    
+    # Сводка телеметрии прогона
+    metrics_paths = telemetry.export(Path(config.METRICS_DIR) / f"backfill-run-{datetime.now().strftime('%Y-%m-%d')}")
+    if metrics_paths:
+        print(f"Метрики прогона: {', '.join(metrics_paths)}")
+
+if __name__ == "__main__":
+    main()
@@ -11,74 +11,107 @@
 - Совместим с Google Apps Script
 """
 
+import argparse
+import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
-import re
 import json
 from typing import Dict, List, Tuple, Optional
 
+import numpy as np
+
 # Добавляем корневую папку проекта в путь
 project_root = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(project_root))
 
-from ai_agent.google.sheets import sheets
+from ai_agent.google.sheets import column_letter, sheets
+from ai_agent.analysis.baselines import frame_baselines
+from ai_agent.analysis.changes import change_percent, comparable
+from ai_agent.analysis.dates import DateAxis
+from ai_agent.analysis.frame import METRIC_COL, PRODUCT_COL, SheetFrame
+from ai_agent.analysis.loader import read_frame
+from ai_agent.analysis.numbers import parse_number
+from ai_agent.analysis.rules import RuleContext, RuleIndex
+from ai_agent.analysis.stitch import MONTH_SHEET_PATTERN, previous_month_sheet, stitch_frames
 from ai_agent.config import config
+from ai_agent.log import get_logger
+from ai_agent.telemetry import telemetry
+
+logger = get_logger(__name__)
+
+# Диапазон правил на листе Algorithm
+ALGORITHM_SHEET = "Algorithm"
+ALGORITHM_RANGE = "A1:L100"
 
 class DailyAnalyzerWithAlgorithm:
     """Анализатор ежедневных изменений с интеграцией листа Algorithm"""
     
-    def __init__(self, sheet_name: str = None):
+    def __init__(self, sheet_name: str = None, recent_days: Optional[int] = None,
+                 sheet_names: Optional[List[str]] = None, all_months: bool = False,
+                 max_workers: Optional[int] = None, baseline_window: Optional[int] = None,
+                 stitch_months: Optional[bool] = None):
         """
         Args:
             sheet_name: Название листа для анализа. Если None, использует последний найденный лист месяца
+            recent_days: Сколько последних дат читать из листа. Если None, читается
+                весь заполненный прямоугольник листа
+            sheet_names: Набор листов для параллельного анализа (вместо sheet_name)
+            all_months: Параллельно анализировать все листы месяцев
+            max_workers: Размер пула потоков для параллельного анализа
+            baseline_window: Окно базовой линии в датах (по умолчанию ROLLING_WINDOW_DAYS)
+            stitch_months: Дополнять начало месяца датами предыдущего листа
+                (по умолчанию STITCH_MONTHS)
         """
         self.sheet_name = sheet_name
+        self.recent_days = recent_days
+        self.sheet_names = sheet_names
+        self.all_months = all_months
+        self.max_workers = max_workers
+        self.baseline_window = baseline_window or config.rollingWindowDays
+        self.stitch_months = config.STITCH_MONTHS if stitch_months is None else stitch_months
         self.anomalies = []
         self.rules = []
+        self.rule_index: Optional[RuleIndex] = None
         self.today_date_str = None
         self.yesterday_date_str = None
         
         # Явно устанавливаем SPREADSHEET_ID если не задан
         if not sheets.spreadsheet_id or sheets.spreadsheet_id == '':
             sheets.spreadsheet_id = "18otXyOlqG4FAbLqyZReCwSPkKLGuhEWsVKFNoxctyvQ"
-            print("INFO: Использую SPREADSHEET_ID из кода")
+            logger.info("Использую SPREADSHEET_ID из кода")
     
     def find_month_sheets(self) -> List[str]:
         """Находит все листы с данными по паттерну 'Месяц Год'"""
-        try:
-            # Получаем информацию о таблице
-            service = sheets._get_service()
-            spreadsheet = service.spreadsheets().get(
-                spreadsheetId=sheets.spreadsheet_id
-            ).execute()
-            
-            # Паттерн для листов месяцев (январь-декабрь + год)
-            month_pattern = re.compile(
-                r'^(январь|февраль|март|апрель|май|июнь|июль|август|сентябрь|октябрь|ноябрь|декабрь)\s+\d{4}$',
-                re.IGNORECASE
-            )
-            
-            month_sheets = []
-            for sheet in spreadsheet['sheets']:
-                sheet_name = sheet['properties']['title']
-                if month_pattern.match(sheet_name):
-                    month_sheets.append(sheet_name)
-            
-            return month_sheets
-            
-        except Exception as e:
-            print(f"ERROR: Ошибка при поиске листов месяцев: {e}")
-            return []
+        # Названия листов берутся из кэша метаданных таблицы
+        return [title for title in sheets.get_sheet_titles() if MONTH_SHEET_PATTERN.match(title)]
+    
+    def previous_sheets(self, sheet_names: List[str]) -> Dict[str, str]:
+        """Листы предыдущих месяцев для склейки: лист → лист предыдущего месяца"""
+        if not self.stitch_months:
+            return {}
+        titles = sheets.get_sheet_titles()
+        previous = {name: previous_month_sheet(name, titles) for name in sheet_names}
+        return {name: prev for name, prev in previous.items() if prev}
     
-    def load_rules(self) -> List[Dict]:
-        """Загружает активные правила из листа Algorithm"""
+    def stitch_days(self, dates_in_frame: int) -> int:
+        """Сколько дат предыдущего листа нужно: вчера и окно базовой линии до сегодня"""
+        return max(0, self.baseline_window + 1 - dates_in_frame)
+    
+    def load_rules(self, rules_data: Optional[List[List]] = None) -> List[Dict]:
+        """Загружает активные правила из листа Algorithm
+        
+        Args:
+            rules_data: Уже прочитанные значения диапазона правил (None - прочитать лист)
+        """
         try:
-            print("INFO: Загружаем правила из Algorithm...")
-            rules_data = sheets.read_range("Algorithm", "A1:L100")
+            logger.info("Загружаем правила из Algorithm...")
+            if rules_data is None:
+                rules_data = sheets.read_range(ALGORITHM_SHEET, ALGORITHM_RANGE)
             
             if not rules_data or len(rules_data) < 2:
-                print("WARNING: Нет правил в листе Algorithm")
+                logger.warning("Нет правил в листе Algorithm")
                 return []
             
             headers = rules_data[0]
@@ -109,211 +142,312 @@ class DailyAnalyzerWithAlgorithm:
                     'action_params': str(row[6]).strip() if len(row) > 6 else '',
                     'severity': str(row[7]).strip() if len(row) > 7 else 'medium',
                     'drop_pct': condition_params.get('drop_pct', 0.15),
-                    'min_samples': condition_params.get('min_samples', 5)
+                    'min_samples': condition_params.get('min_samples', config.minSamplesDefault)
                 }
                 
                 rules.append(rule)
             
-            print(f"INFO: Загружено {len(rules)} активных правил")
+            logger.info("Загружено %s активных правил", len(rules))
             self.rules = rules
+            if self.get_rule_index().unknown_conditions:
+                logger.warning("Неизвестные типы условий: %s", sorted(self.rule_index.unknown_conditions))
+            
+            unreachable = [rule['rule_id'] for rule in rules if rule['min_samples'] > self.baseline_window]
+            if unreachable:
+                logger.warning("min_samples больше окна базовой линии (%s), правила не сработают: %s",
+                               self.baseline_window, ', '.join(unreachable))
             return rules
             
         except Exception as e:
-            print(f"ERROR: Ошибка при загрузке правил: {e}")
+            logger.error("Ошибка при загрузке правил: %s", e)
             return []
     
-    def parse_number(self, value):
-        """Парсит число из строки с учетом форматирования"""
-        if not value or value == '' or str(value).strip() == '':
-            return None
-            
-        # Убираем все виды пробелов и заменяем запятые на точки
-        clean_value = str(value).replace(' ', '').replace('\xa0', '').replace(',', '.')
-        
-        # Убираем % если есть
-        clean_value = clean_value.replace('%', '')
-        
-        # Извлекаем число
-        match = re.search(r'-?\d+\.?\d*', clean_value)
-        if match:
-            try:
-                return float(match.group())
-            except ValueError:
-                return None
-        return None
+    # Общий парсер чисел (быстрый путь + память для повторяющихся строк)
+    parse_number = staticmethod(parse_number)
+    
+    def get_rule_index(self) -> RuleIndex:
+        """Возвращает индекс правил (строится заново, если правила заменили вручную)"""
+        if self.rule_index is None or self.rule_index.source is not self.rules:
+            self.rule_index = RuleIndex(self.rules)
+        return self.rule_index
     
     def match_rule(self, metric_name: str, delta_pct: float, baseline_values: List[float]) -> Optional[Dict]:
         """Находит подходящее правило для метрики"""
-        for rule in self.rules:
-            # Проверяем совпадение имени метрики
-            if rule['metric'] != metric_name:
-                continue
-            
-            # Проверяем условие
-            if rule['condition_type'] == 'ratio':
-                # Проверяем минимальное количество образцов
-                if len(baseline_values) < rule['min_samples']:
-                    continue
-                
-                # Проверяем падение (delta_pct отрицательно при падении)
-                if delta_pct <= -rule['drop_pct']:
-                    return rule
-        
-        return None
+        return self.get_rule_index().match_one(metric_name, delta_pct, len(baseline_values))
     
-    def find_date_columns(self, headers: List) -> List[Tuple[int, str]]:
-        """Находит колонки с датами в заголовках"""
-        date_columns = []
-        date_pattern = r'\d{1,2}\.\d{1,2}\.\d{2,4}'
+    def load_frame(self, sheet_name: str) -> Optional[SheetFrame]:
+        """Читает лист в колоночную модель
         
-        for i, header in enumerate(headers):
-            if not header:
-                continue
-            
-            header_str = str(header).strip()
-            match = re.search(date_pattern, header_str)
-            if match:
-                date_columns.append((i, match.group()))
-        
-        return date_columns
-    
-    def parse_date(self, date_str: str) -> Optional[datetime]:
-        """Парсит дату из строки"""
-        try:
-            for fmt in ['%d.%m.%Y', '%d.%m.%y', '%Y-%m-%d']:
-                try:
-                    return datetime.strptime(date_str, fmt)
-                except ValueError:
-                    continue
-            return None
-        except:
-            return None
+        Без recent_days читается весь заполненный прямоугольник листа.
+        С recent_days - только колонки метрики/товара и последних N дат.
+        В начале месяца недостающие даты (вчера и окно базовой линии) берутся
+        из листа предыдущего месяца.
+        """
+        return read_frame(sheet_name, self.recent_days, self.stitch_days(0) if self.stitch_months else 0)
     
-    def find_last_two_dates(self, date_columns: List[Tuple[int, str]]) -> Tuple[Optional[int], Optional[int]]:
-        """Находит две последние даты"""
-        if len(date_columns) < 2:
-            return None, None
-        
-        parsed_dates = []
-        for col_idx, date_str in date_columns:
-            date_obj = self.parse_date(date_str)
-            if date_obj:
-                parsed_dates.append((col_idx, date_obj, date_str))
-        
-        if len(parsed_dates) < 2:
-            return None, None
+    def load_frames(self, sheet_names: List[str],
+                    headers_by_sheet: Optional[Dict[str, List]] = None) -> Dict[str, Optional[SheetFrame]]:
+        """Читает несколько листов: заголовки одним values.batchGet, данные - вторым
         
-        # Сортируем по дате
-        parsed_dates.sort(key=lambda x: x[1])
+        Если дат листа не хватает на вчера и окно базовой линии (начало месяца),
+        к нему приклеиваются последние даты листа предыдущего месяца. С recent_days
+        эти колонки читаются тем же вызовом, что и данные листов.
         
-        # Берем две последние
-        today_col = parsed_dates[-1][0]
-        yesterday_col = parsed_dates[-2][0]
+        Args:
+            sheet_names: Листы для чтения
+            headers_by_sheet: Уже прочитанные заголовки (None - прочитать);
+                могут включать листы предыдущих месяцев (см. read_rules_and_headers)
+        """
+        previous = self.previous_sheets(sheet_names)
+        wanted = list(sheet_names) + [prev for prev in previous.values() if prev not in sheet_names]
+        headers_by_sheet = dict(headers_by_sheet or {})
+        missing = [name for name in wanted if name not in headers_by_sheet]
+        if missing:
+            headers_by_sheet.update(sheets.read_headers(missing))
+        frames = {sheet_name: None for sheet_name in sheet_names}
         
-        self.today_date_str = parsed_dates[-1][2]
-        self.yesterday_date_str = parsed_dates[-2][2]
+        # Сколько дат предыдущего листа нужно каждому листу
+        stitch = {}
+        for name, prev in previous.items():
+            dates = len(DateAxis.for_headers(headers_by_sheet.get(name) or []))
+            days = self.stitch_days(min(dates, self.recent_days) if self.recent_days else dates)
+            if days:
+                stitch[name] = (prev, days)
+        tails = {}
+        for prev, days in stitch.values():
+            tail = DateAxis.for_headers(headers_by_sheet.get(prev) or []).last_columns(days)
+            tails[prev] = sorted(set(tails.get(prev, [])) | set(tail))
         
-        print(f"INFO: Найдены даты - Сегодня: {self.today_date_str}, Вчера: {self.yesterday_date_str}")
+        fetched = {}
+        if not self.recent_days:
+            # Заполненный прямоугольник: ширина по заголовку, строки до конца листа
+            names = [name for name in sheet_names if headers_by_sheet.get(name)]
+            ranges = [(name, f"A1:{column_letter(len(headers_by_sheet[name]))}") for name in names]
+            for name, data in zip(names, sheets.read_ranges(ranges)):
+                if data and len(data) >= 3:
+                    frames[name] = SheetFrame.from_values(data)
+            # Хвосты предыдущих листов (которые не прочитаны целиком) - одним вызовом
+            tails = {prev: columns for prev, columns in tails.items() if frames.get(prev) is None and columns}
+            if tails:
+                fetched = sheets.read_sheet_columns({
+                    prev: [METRIC_COL, PRODUCT_COL] + columns for prev, columns in tails.items()
+                })
+        else:
+            columns_by_sheet = {}
+            for name in sheet_names:
+                recent_columns = DateAxis.for_headers(headers_by_sheet.get(name) or []).last_columns(self.recent_days)
+                columns_by_sheet[name] = [METRIC_COL, PRODUCT_COL] + recent_columns
+            for prev, columns in tails.items():
+                columns_by_sheet[prev] = sorted(set(columns_by_sheet.get(prev, [METRIC_COL, PRODUCT_COL])) | set(columns))
+            
+            fetched = sheets.read_sheet_columns(columns_by_sheet)
+            for name in sheet_names:
+                if name in fetched:
+                    frame = SheetFrame.from_columns(headers_by_sheet[name], fetched[name])
+                    frames[name] = frame if len(frame) else None
         
-        return today_col, yesterday_col
+        # Склейка с предыдущим месяцем: строки по ключу (метрика, товар)
+        for name, (prev, days) in stitch.items():
+            if frames[name] is None:
+                continue
+            prev_frame = frames.get(prev)
+            if prev_frame is None and prev in fetched:
+                prev_frame = SheetFrame.from_columns(headers_by_sheet[prev], fetched[prev])
+            if prev_frame is not None:
+                frames[name] = stitch_frames(frames[name], [prev_frame], days)
+                logger.info("[%s] Добавлено дат из листа '%s': %s", name, prev, days)
+        return frames
     
-    def analyze_sheet(self, sheet_name: str) -> Dict:
-        """Анализирует один лист"""
-        print(f"\nINFO: Анализируем лист '{sheet_name}'...")
+    def analyze_frame(self, sheet_name: str, frame: SheetFrame) -> Dict:
+        """Анализирует уже прочитанный лист
         
+        Не изменяет состояние анализатора, поэтому может выполняться
+        параллельно для разных листов.
+        """
         try:
-            # Читаем данные
-            data = sheets.read_range(sheet_name, "A1:ZZ200")
+            headers = frame.headers
             
-            if not data or len(data) < 3:
-                print("WARNING: Недостаточно данных")
-                return {'success': False, 'error': 'Недостаточно данных'}
+            # Находим даты (ось кэшируется по строке заголовков)
+            axis = DateAxis.for_headers(headers)
+            if len(axis) < 2:
+                return {'success': False, 'error': 'Недостаточно дат'}
             
-            headers = data[0]
+            (yesterday_col, yesterday_date), (today_col, today_date) = axis.last(2)
+            logger.info("[%s] Найдены даты - Сегодня: %s, Вчера: %s", sheet_name, today_date, yesterday_date)
             
-            # Находим даты
-            date_columns = self.find_date_columns(headers)
-            if len(date_columns) < 2:
-                return {'success': False, 'error': 'Недостаточно дат'}
+            # Считаем изменения сразу по всем строкам
+            today_values = frame.column(today_col)
+            yesterday_values = frame.column(yesterday_col)
             
-            today_col, yesterday_col = self.find_last_two_dates(date_columns)
-            if today_col is None or yesterday_col is None:
-                return {'success': False, 'error': 'Не удалось определить даты'}
+            valid = comparable(frame.has_metric, today_values, yesterday_values)
             
-            # Анализируем метрики
-            anomalies = []
+            # Вычисляем изменение
+            change_pcts = change_percent(today_values, yesterday_values,
+                                         from_zero=np.where(today_values > 0, 100.0, 0.0))
             
-            for row_idx, row in enumerate(data[2:], start=3):
-                if not row or len(row) <= max(today_col, yesterday_col):
-                    continue
-                
-                metric_name = str(row[0]).strip() if len(row) > 0 else ""
-                if not metric_name:
-                    continue
-                
-                # Получаем значения
-                today_value = self.parse_number(row[today_col]) if today_col < len(row) else None
-                yesterday_value = self.parse_number(row[yesterday_col]) if yesterday_col < len(row) else None
-                
-                if today_value is None or yesterday_value is None:
-                    continue
-                
-                if today_value == 0 and yesterday_value == 0:
-                    continue
-                
-                # Вычисляем изменение
-                if yesterday_value == 0:
-                    change_pct = 100 if today_value > 0 else 0
-                else:
-                    change_pct = ((today_value - yesterday_value) / abs(yesterday_value)) * 100
-                
-                delta_pct = change_pct / 100  # Переводим в десятичное
-                
-                # Проверяем правило
-                baseline_values = [yesterday_value]  # Упрощенно
-                rule = self.match_rule(metric_name, delta_pct, baseline_values)
-                
-                if rule:
-                    anomaly = {
-                        'sheet': sheet_name,
-                        'row': row_idx,
-                        'col_today': today_col,
-                        'metric': metric_name,
-                        'yesterday_value': yesterday_value,
-                        'today_value': today_value,
-                        'change_pct': round(change_pct, 2),
-                        'delta_pct': delta_pct,
-                        'rule_id': rule['rule_id'],
-                        'action_type': rule['action_type'],
-                        'severity': rule['severity'],
-                        'direction': '⬆️' if change_pct > 0 else '⬇️'
-                    }
-                    
-                    anomalies.append(anomaly)
-                    print(f"INFO: Найдено отклонение - {metric_name}: {change_pct:+.1f}% (правило: {rule['rule_id']})")
+            # Базовая линия - скользящее окно дат до сегодняшней
+            history_columns = axis.columns[:-1]
+            baselines = frame_baselines(frame, history_columns, self.baseline_window)
             
-            self.anomalies.extend(anomalies)
+            # Отклонение от среднего окна (0.15 = +15%), при нулевом среднем - как для нулевого вчера.
+            # min_samples сравнивается с числом заполненных дат в окне
+            context = RuleContext(baselines.delta(today_values), baselines.count, today_values,
+                                  baselines.mean, baselines.std)
+            anomalies = self.collect_matches(sheet_name, frame, valid, context, change_pcts,
+                                             yesterday_values, today_col, today_date)
             
             return {
                 'success': True,
                 'anomalies': anomalies,
-                'sheet_name': sheet_name
+                'sheet_name': sheet_name,
+                'today_date': today_date,
+                'yesterday_date': yesterday_date
+            }
+            
+        except Exception as e:
+            logger.exception("Ошибка при анализе листа %s: %s", sheet_name, e)
+            return {'success': False, 'error': str(e)}
+    
+    def collect_matches(self, sheet_name: str, frame: SheetFrame, valid: np.ndarray,
+                        context: RuleContext, change_pcts: np.ndarray, yesterday_values: np.ndarray,
+                        today_col: int, today_date: str) -> List[Dict]:
+        """Проверяет правила по строкам одного дня и собирает сработавшие отклонения
+        
+        Args:
+            valid: Маска сравнимых строк
+            context: Векторы для правил (value - значения дня, mean/samples - базовая линия)
+            change_pcts: Изменение к предыдущему дню в процентах
+        """
+        # Индекс по метрике, предикаты - сразу по всем строкам метрики
+        with telemetry.span('rule_matching'):
+            matches = self.get_rule_index().match_index(frame.metric_index, valid, context)
+        telemetry.increment('rule_matches', len(matches))
+        
+        anomalies = []
+        for pos, rule in matches:
+            metric_name = frame.metrics[pos]
+            change_pct = float(change_pcts[pos])
+            
+            anomaly = {
+                'sheet': sheet_name,
+                'row': int(frame.row_numbers[pos]),
+                'col_today': today_col,
+                'metric': metric_name,
+                'date': today_date,
+                'yesterday_value': float(yesterday_values[pos]),
+                'today_value': float(context.value[pos]),
+                'change_pct': round(change_pct, 2),
+                'delta_pct': float(context.delta[pos]),
+                'baseline_mean': float(context.mean[pos]),
+                'baseline_samples': int(context.samples[pos]),
+                'rule_id': rule['rule_id'],
+                'action_type': rule['action_type'],
+                'severity': rule['severity'],
+                'direction': '⬆️' if change_pct > 0 else '⬇️'
             }
             
+            anomalies.append(anomaly)
+            logger.debug("Найдено отклонение - %s: %+.1f%% (правило: %s)", metric_name, change_pct, rule['rule_id'])
+        return anomalies
+    
+    def _merge_result(self, result: Dict):
+        """Добавляет результат анализа листа к общему состоянию анализатора"""
+        if not result['success']:
+            return
+        self.anomalies.extend(result['anomalies'])
+        self.today_date_str = result['today_date']
+        self.yesterday_date_str = result['yesterday_date']
+    
+    def analyze_sheet(self, sheet_name: str) -> Dict:
+        """Анализирует один лист"""
+        logger.info("Анализируем лист '%s'...", sheet_name)
+        
+        try:
+            # Читаем данные
+            frame = self.load_frame(sheet_name)
         except Exception as e:
-            print(f"ERROR: Ошибка при анализе: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.error("Ошибка при чтении листа %s: %s", sheet_name, e)
             return {'success': False, 'error': str(e)}
+        
+        if frame is None:
+            logger.warning("Недостаточно данных")
+            return {'success': False, 'error': 'Недостаточно данных'}
+        
+        result = self.analyze_frame(sheet_name, frame)
+        self._merge_result(result)
+        return result
     
-    def save_to_signals(self):
-        """Сохраняет аномалии в лист Signals"""
+    def analyze_sheets(self, sheet_names: List[str], max_workers: Optional[int] = None,
+                       headers_by_sheet: Optional[Dict[str, List]] = None) -> Dict[str, Dict]:
+        """Анализирует несколько листов параллельно
+        
+        Все листы читаются двумя вызовами values.batchGet, анализ идет в пуле
+        потоков, результаты объединяются в порядке sheet_names.
+        
+        Args:
+            sheet_names: Листы для анализа
+            max_workers: Размер пула потоков
+            headers_by_sheet: Уже прочитанные заголовки листов (см. read_rules_and_headers)
+        
+        Returns:
+            Dict[str, Dict]: название_листа → результат анализа
+        """
+        logger.info("Анализируем листы: %s", ', '.join(sheet_names))
+        frames = self.load_frames(sheet_names, headers_by_sheet)
+        
+        workers = max_workers or min(len(sheet_names), os.cpu_count() or 1) or 1
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                name: pool.submit(self.analyze_frame, name, frame)
+                for name, frame in frames.items() if frame is not None
+            }
+        
+        results = {}
+        for name in sheet_names:
+            if name in futures:
+                results[name] = futures[name].result()
+            else:
+                results[name] = {'success': False, 'error': 'Недостаточно данных'}
+            
+            if not results[name]['success']:
+                logger.warning("[%s] %s", name, results[name]['error'])
+            self._merge_result(results[name])
+        
+        return results
+    
+    def read_rules_and_headers(self, sheet_names: List[str]) -> Tuple[Optional[List[List]], Optional[Dict[str, List]]]:
+        """Читает правила Algorithm и заголовки листов одним вызовом values.batchGet
+        
+        В тот же вызов попадают заголовки листов предыдущих месяцев (для склейки).
+        
+        Returns:
+            Tuple: (значения диапазона правил, лист → заголовки); (None, None) при ошибке
+        """
+        previous = [prev for prev in self.previous_sheets(sheet_names).values() if prev not in sheet_names]
+        sheet_names = list(sheet_names) + sorted(set(previous), key=previous.index)
+        ranges = [(ALGORITHM_SHEET, ALGORITHM_RANGE)] + [(name, "1:1") for name in sheet_names]
+        values = sheets.read_ranges(ranges)
+        if not values:
+            return None, None
+        
+        headers_by_sheet = {
+            name: data[0] if data else []
+            for name, data in zip(sheet_names, values[1:])
+        }
+        return values[0], headers_by_sheet
+    
+    def save_to_signals(self, writer=None):
+        """Сохраняет аномалии в лист Signals
+        
+        Args:
+            writer: Куда писать - sheets или пакет sheets.batch() (по умолчанию sheets)
+        """
         if not self.anomalies:
-            print("INFO: Нет аномалий для сохранения")
+            logger.info("Нет аномалий для сохранения")
             return
         
         try:
-            print(f"INFO: Сохраняем {len(self.anomalies)} сигналов в Signals...")
+            logger.info("Сохраняем %s сигналов в Signals...", len(self.anomalies))
             
             rows = []
             for anomaly in self.anomalies:
@@ -321,7 +455,7 @@ class DailyAnalyzerWithAlgorithm:
                     datetime.now().isoformat(),  # Timestamp
                     '',  # Block (можно добавить)
                     anomaly['metric'],
-                    self.today_date_str,
+                    anomaly.get('date', self.today_date_str),
                     anomaly['today_value'],
                     anomaly['yesterday_value'],
                     anomaly['change_pct'],
@@ -332,19 +466,26 @@ class DailyAnalyzerWithAlgorithm:
                 ]
                 rows.append(row)
             
-            sheets.append_rows("Signals", rows)
-            print("SUCCESS: Сигналы сохранены")
+            if writer is not None:
+                # Пакет отправляется при выходе из with - об успехе сообщает вызывающий
+                writer.append_rows("Signals", rows)
+            elif sheets.append_rows("Signals", rows):
+                logger.info("Сигналы сохранены")
             
         except Exception as e:
-            print(f"ERROR: Ошибка при сохранении сигналов: {e}")
+            logger.error("Ошибка при сохранении сигналов: %s", e)
     
-    def save_to_decisions(self):
-        """Сохраняет решения в лист Decisions"""
+    def save_to_decisions(self, writer=None):
+        """Сохраняет решения в лист Decisions
+        
+        Args:
+            writer: Куда писать - sheets или пакет sheets.batch() (по умолчанию sheets)
+        """
         if not self.anomalies:
             return
         
         try:
-            print(f"INFO: Сохраняем {len(self.anomalies)} решений в Decisions...")
+            logger.info("Сохраняем %s решений в Decisions...", len(self.anomalies))
             
             rows = []
             for i, anomaly in enumerate(self.anomalies, 1):
@@ -364,11 +505,14 @@ class DailyAnalyzerWithAlgorithm:
                 ]
                 rows.append(row)
             
-            sheets.append_rows("Decisions", rows)
-            print("SUCCESS: Решения сохранены")
+            if writer is not None:
+                # Пакет отправляется при выходе из with - об успехе сообщает вызывающий
+                writer.append_rows("Decisions", rows)
+            elif sheets.append_rows("Decisions", rows):
+                logger.info("Решения сохранены")
             
         except Exception as e:
-            print(f"ERROR: Ошибка при сохранении решений: {e}")
+            logger.error("Ошибка при сохранении решений: %s", e)
     
     def run(self):
         """Запускает полный цикл анализа"""
@@ -376,30 +520,44 @@ class DailyAnalyzerWithAlgorithm:
         print("АНАЛИЗ С ИНТЕГРАЦИЕЙ ALGORITHM")
         print("=" * 60)
         
-        # Загружаем правила
-        if not self.load_rules():
-            print("ERROR: Не удалось загрузить правила из Algorithm")
-            return False
-        
-        # Определяем лист для анализа
-        if not self.sheet_name:
-            month_sheets = self.find_month_sheets()
-            if not month_sheets:
-                print("ERROR: Не найдены листы месяцев")
+        # Определяем листы для анализа
+        if self.all_months or self.sheet_names:
+            sheet_names = self.sheet_names or self.find_month_sheets()
+            if not sheet_names:
+                logger.error("Не найдены листы месяцев")
                 return False
-            self.sheet_name = month_sheets[-1]  # Берем последний
-            print(f"INFO: Автоматически выбран лист: {self.sheet_name}")
+        else:
+            if not self.sheet_name:
+                month_sheets = self.find_month_sheets()
+                if not month_sheets:
+                    logger.error("Не найдены листы месяцев")
+                    return False
+                self.sheet_name = month_sheets[-1]  # Берем последний
+                logger.info("Автоматически выбран лист: %s", self.sheet_name)
+            sheet_names = [self.sheet_name]
         
-        # Анализируем
-        result = self.analyze_sheet(self.sheet_name)
+        # Правила и заголовки листов - одним чтением
+        rules_data, headers_by_sheet = self.read_rules_and_headers(sheet_names)
         
-        if not result['success']:
-            print(f"ERROR: {result.get('error')}")
+        # Загружаем правила
+        if not self.load_rules(rules_data):
+            logger.error("Не удалось загрузить правила из Algorithm")
+            return False
+        
+        # Анализируем (несколько листов - параллельно)
+        results = self.analyze_sheets(sheet_names, self.max_workers, headers_by_sheet)
+        if not any(result['success'] for result in results.values()):
+            logger.error("Не удалось проанализировать ни один лист")
             return False
         
-        # Сохраняем результаты
-        self.save_to_signals()
-        self.save_to_decisions()
+        # Сохраняем результаты - Signals и Decisions одним пакетом
+        with sheets.batch() as batch:
+            self.save_to_signals(batch)
+            self.save_to_decisions(batch)
+        if batch.success is False:
+            logger.error("Не удалось сохранить сигналы и решения")
+        elif self.anomalies:
+            logger.info("Сигналы и решения сохранены")
         
         print("\n" + "=" * 60)
         print("АНАЛИЗ ЗАВЕРШЕН")
@@ -407,11 +565,29 @@ class DailyAnalyzerWithAlgorithm:
         print(f"Найдено отклонений: {len(self.anomalies)}")
         print(f"Использовано правил: {len(self.rules)}")
         
+        # Сводка телеметрии прогона
+        metrics_paths = telemetry.export(Path(config.METRICS_DIR) / f"algorithm-run-{datetime.now().strftime('%Y-%m-%d')}")
+        if metrics_paths:
+            print(f"Метрики прогона: {', '.join(metrics_paths)}")
+        
         return True
 
 def main():
     """Основная функция"""
-    analyzer = DailyAnalyzerWithAlgorithm()
+    parser = argparse.ArgumentParser(description="Анализ ежедневных изменений по правилам Algorithm")
+    parser.add_argument('--sheet', help="Лист для анализа (по умолчанию - последний лист месяца)")
+    parser.add_argument('--sheets', nargs='+', help="Несколько листов для параллельного анализа")
+    parser.add_argument('--all-months', action='store_true', help="Проанализировать все листы месяцев")
+    parser.add_argument('--workers', type=int, help="Размер пула потоков")
+    args = parser.parse_args()
+    
+    analyzer = DailyAnalyzerWithAlgorithm(
+        sheet_name=args.sheet,
+        recent_days=config.rollingWindowDays + 1,  # Окно базовой линии + сегодня
+        sheet_names=args.sheets,
+        all_months=args.all_months,
+        max_workers=args.workers
+    )
     analyzer.run()
 
 if __name__ == "__main__":
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Синхронизация локальной истории листов месяцев (ai_agent.storage.history)
+
+Пример:
+    sync-history                       # все листы месяцев, только новые даты
+    sync-history --sheets "Август 2025" --force
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Добавляем корневую папку проекта в путь
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from ai_agent.jobs.daily_analyzer_with_algorithm import DailyAnalyzerWithAlgorithm
+from ai_agent.log import get_logger
+from ai_agent.storage.history import history_store
+
+logger = get_logger(__name__)
+
+def main():
+    """Основная функция"""
+    parser = argparse.ArgumentParser(description="Зеркалирование листов месяцев в локальную историю")
+    parser.add_argument('--sheets', nargs='+', help="Листы (по умолчанию - все листы месяцев)")
+    parser.add_argument('--force', action='store_true', help="Перечитать листы целиком, включая закрытые месяцы")
+    args = parser.parse_args()
+    
+    print("=" * 60)
+    print("СИНХРОНИЗАЦИЯ ИСТОРИИ ЛИСТОВ")
+    print("=" * 60)
+    
+    sheet_names = args.sheets or DailyAnalyzerWithAlgorithm().find_month_sheets()
+    if not sheet_names:
+        logger.error("Не найдены листы месяцев")
+        return
+    
+    results = history_store.sync(sheet_names, force=args.force)
+    
+    print()
+    for name in sheet_names:
+        result = results.get(name)
+        if result is None:
+            print(f"{name}: не обновлен")
+        elif result['skipped']:
+            print(f"{name}: месяц закрыт, значений {result['values']}")
+        else:
+            print(f"{name}: прочитано дат {result['dates']}, значений {result['values']}")
+    print(f"\nИстория: {history_store.path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Логирование ai_agent
+
+Все модули пишут через logging (get_logger(__name__)) в stderr - stdout
+остается свободным для вывода команд и JSON-RPC протокола MCP сервера.
+Сообщения форматируются лениво: logger.debug("Строка %s", row) не строит
+строку, если уровень DEBUG выключен.
+
+Настройки (env):
+    LOG_LEVEL=INFO                                  - общий уровень
+    LOG_LEVELS=ai_agent.google=DEBUG,ai_agent.jobs=WARNING - уровни модулей
+    LOG_FORMAT=json                                 - json (по строке на запись) или text
+"""
+
+import json
+import logging
+import sys
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from ai_agent.config import config
+
+# Корневой логгер пакета - обработчики вешаются только на него
+ROOT_LOGGER = 'ai_agent'
+
+# Атрибуты LogRecord, которые не относятся к полям extra=
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись - одна строка JSON: время, уровень, логгер, сообщение и поля extra"""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class TextFormatter(logging.Formatter):
+    """Человекочитаемый формат в духе прежнего вывода: "INFO: сообщение" """
+    
+    def __init__(self):
+        super().__init__("%(levelname)s: %(message)s")
+
+def parse_levels(spec: str) -> Dict[str, int]:
+    """'ai_agent.google=DEBUG,ai_agent.jobs=WARNING' → {логгер: уровень}"""
+    levels = {}
+    for item in spec.split(','):
+        name, sep, level = item.strip().partition('=')
+        if not sep:
+            continue
+        value = logging.getLevelName(level.strip().upper())
+        if isinstance(value, int):
+            levels[name.strip()] = value
+    return levels
+
+_configured = False
+_configure_lock = threading.Lock()
+
+def setup_logging(level: Optional[str] = None, levels: Optional[str] = None,
+                  fmt: Optional[str] = None, stream=None, force: bool = False):
+    """Настраивает логгер пакета (повторные вызовы ничего не делают, кроме force=True)
+    
+    Args:
+        level: Общий уровень (по умолчанию LOG_LEVEL)
+        levels: Уровни модулей 'имя=УРОВЕНЬ,...' (по умолчанию LOG_LEVELS)
+        fmt: 'json' или 'text' (по умолчанию LOG_FORMAT)
+        stream: Поток вывода (по умолчанию stderr)
+    """
+    global _configured
+    with _configure_lock:
+        if _configured and not force:
+            return
+        
+        root = logging.getLogger(ROOT_LOGGER)
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        
+        handler = logging.StreamHandler(stream or sys.stderr)
+        handler.setFormatter(JsonFormatter() if (fmt or config.LOG_FORMAT) == 'json' else TextFormatter())
+        root.addHandler(handler)
+        root.setLevel((level or config.LOG_LEVEL).upper())
+        # Записи не уходят в корневой логгер Python (и его обработчики на stdout)
+        root.propagate = False
+        
+        for name, module_level in parse_levels(levels if levels is not None else config.LOG_LEVELS).items():
+            logging.getLogger(name).setLevel(module_level)
+        
+        _configured = True
+
+def get_logger(name: str) -> logging.Logger:
+    """Логгер модуля; при первом вызове настраивает вывод пакета"""
+    setup_logging()
+    if name != ROOT_LOGGER and not name.startswith(ROOT_LOGGER + '.'):
+        # Импорт как src.ai_agent.* и скрипты (__main__) тоже пишут через логгер пакета
+        position = name.find(ROOT_LOGGER + '.')
+        name = name[position:] if position >= 0 else f"{ROOT_LOGGER}.{name.rpartition('.')[2]}"
+    return logging.getLogger(name)
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Потоковая генерация отчетов по отклонениям
+
+Отчет рендерится за один проход по отклонениям: каждый шаблон получает
+отклонения по одному и сразу отдает готовые куски текста, которые пишутся
+в файл (или отдаются генератором). Один проход питает сразу несколько
+форматов - Markdown, CSV и JSON - без промежуточной строки всего отчета.
+
+Отклонения должны приходить в порядке отчета (AnomalyStore.ordered): сначала
+критичные, затем важные, затем остальные; внутри категории - по убыванию
+модуля изменения. Новые форматы подключаются через @register_template.
+"""
+
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple, Type
+
+from ai_agent.analysis.anomalies import CATEGORY_ORDER
+
+# Заголовки разделов Markdown (остальные категории попадают только в статистику)
+MARKDOWN_SECTIONS = {
+    'critical': "## 🔴 Критичные отклонения (требуют немедленного внимания)\n\n",
+    'important': "## 🟡 Важные отклонения (рекомендуется проверить)\n\n",
+}
+
+class ReportContext:
+    """Шапка отчета: лист и сравниваемые даты"""
+    
+    __slots__ = ('sheet_name', 'today_date', 'yesterday_date', 'analysis_date')
+    
+    def __init__(self, sheet_name: str, today_date: Optional[str] = None,
+                 yesterday_date: Optional[str] = None, analysis_date: Optional[str] = None):
+        self.sheet_name = sheet_name
+        self.today_date = today_date
+        self.yesterday_date = yesterday_date
+        self.analysis_date = analysis_date or datetime.now().strftime('%Y-%m-%d')
+    
+    @property
+    def date_comparison(self) -> str:
+        """'02.08 в сравнении с 01.08' (или дата проверки, если даты из таблицы неизвестны)"""
+        if self.today_date and self.yesterday_date:
+            return f"{self.today_date} в сравнении с {self.yesterday_date}"
+        return self.analysis_date
+
+class ReportStats:
+    """Счетчики, которые копятся за проход и нужны в конце отчета"""
+    
+    __slots__ = ('total', 'by_category')
+    
+    def __init__(self):
+        self.total = 0
+        self.by_category: Dict[str, int] = {category: 0 for category in CATEGORY_ORDER}
+    
+    @classmethod
+    def from_counts(cls, counts: Dict[str, int]) -> 'ReportStats':
+        """Статистика из готовых счетчиков (AnomalyStore.counts)"""
+        stats = cls()
+        stats.by_category.update(counts)
+        stats.total = sum(counts.values())
+        return stats
+    
+    def add(self, anomaly: Dict):
+        self.total += 1
+        category = anomaly['category']
+        self.by_category[category] = self.by_category.get(category, 0) + 1
+    
+    def to_dict(self) -> Dict:
+        return {'total': self.total, **self.by_category}
+
+class ReportTemplate:
+    """Базовый шаблон: begin → anomaly × N → finish, каждый шаг возвращает кусок текста"""
+    
+    # Расширение файла отчета
+    extension = 'txt'
+    
+    def __init__(self, context: ReportContext):
+        self.context = context
+    
+    def begin(self) -> str:
+        return ''
+    
+    def anomaly(self, anomaly: Dict) -> str:
+        return ''
+    
+    def finish(self, stats: ReportStats) -> str:
+        return ''
+
+TEMPLATES: Dict[str, Type[ReportTemplate]] = {}
+
+def register_template(name: str):
+    """Декоратор: регистрирует шаблон отчета под именем формата"""
+    def decorator(template: Type[ReportTemplate]) -> Type[ReportTemplate]:
+        TEMPLATES[name] = template
+        return template
+    return decorator
+
+@register_template('md')
+class MarkdownTemplate(ReportTemplate):
+    """Markdown-отчет: разделы критичных и важных отклонений, статистика, рекомендации"""
+    
+    extension = 'md'
+    
+    def __init__(self, context: ReportContext):
+        super().__init__(context)
+        self._started = False
+        self._section: Optional[str] = None
+    
+    def _header(self) -> str:
+        context = self.context
+        return (f"# Ежедневный анализ: {context.date_comparison}\n\n"
+                f"**Лист:** {context.sheet_name}\n"
+                f"**Дата проверки:** {context.analysis_date}\n\n"
+                "---\n\n")
+    
+    def _close_section(self) -> str:
+        return "---\n\n" if self._section in MARKDOWN_SECTIONS else ''
+    
+    def anomaly(self, anomaly: Dict) -> str:
+        parts = []
+        if not self._started:
+            self._started = True
+            parts.append(self._header())
+        
+        category = anomaly['category']
+        if category != self._section:
+            parts.append(self._close_section())
+            self._section = category
+            parts.append(MARKDOWN_SECTIONS.get(category, ''))
+        
+        if category in MARKDOWN_SECTIONS:
+            parts.append(
+                f"### {anomaly['metric']}\n"
+                f"- **Вчера**: {anomaly['yesterday_value']}\n"
+                f"- **Сегодня**: {anomaly['today_value']}\n"
+                f"- **Изменение**: **{anomaly['change_pct']:+.1f}%** {anomaly['direction']}\n"
+                f"- **Строка**: {anomaly['row']}\n\n"
+            )
+        return ''.join(parts)
+    
+    def finish(self, stats: ReportStats) -> str:
+        if not stats.total:
+            return "# Ежедневный анализ\n\nОтклонений не найдено ✅"
+        
+        critical = stats.by_category.get('critical', 0)
+        important = stats.by_category.get('important', 0)
+        parts = [self._close_section()]
+        
+        # Статистика
+        parts.append("## 📊 Статистика\n\n"
+                     f"- Критичных отклонений: {critical}\n"
+                     f"- Важных отклонений: {important}\n"
+                     f"- Всего отклонений: {stats.total}\n\n")
+        
+        # Рекомендации
+        parts.append("## 💡 Рекомендации\n\n")
+        if critical:
+            parts.append("1. **Приоритет 1**: Проверить критичные метрики (CR, конверсия, выручка)\n")
+        if important:
+            parts.append("2. **Приоритет 2**: Проанализировать важные метрики (CTR, клики, показы)\n")
+        parts.append("3. **Проверить**: Возможные причины - цены конкурентов, рекламные ставки, контент\n"
+                     "4. **Обратиться**: К алгоритму действий для конкретных рекомендаций\n\n")
+        
+        parts.append("---\n\n"
+                     "*Отчет сгенерирован автоматически AI-агентом*\n"
+                     f"*Время анализа: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*\n")
+        return ''.join(parts)
+
+@register_template('csv')
+class CsvTemplate(ReportTemplate):
+    """CSV: строка на каждое отклонение (все категории)"""
+    
+    extension = 'csv'
+    
+    columns = ('sheet', 'date', 'category', 'metric', 'row', 'yesterday_value',
+               'today_value', 'change_pct', 'threshold')
+    
+    def __init__(self, context: ReportContext):
+        super().__init__(context)
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer, lineterminator='\n')
+    
+    def _row(self, values: Iterable) -> str:
+        self._writer.writerow(values)
+        text = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return text
+    
+    def begin(self) -> str:
+        return self._row(self.columns)
+    
+    def anomaly(self, anomaly: Dict) -> str:
+        return self._row((
+            self.context.sheet_name,
+            self.context.today_date or '',
+            anomaly['category'],
+            anomaly['metric'],
+            anomaly['row'],
+            anomaly['yesterday_value'],
+            anomaly['today_value'],
+            anomaly['change_pct'],
+            anomaly.get('threshold', '')
+        ))
+
+@register_template('json')
+class JsonTemplate(ReportTemplate):
+    """JSON: шапка, массив отклонений и статистика (массив пишется по элементу)"""
+    
+    extension = 'json'
+    
+    def __init__(self, context: ReportContext):
+        super().__init__(context)
+        self._separator = "\n    "
+    
+    def begin(self) -> str:
+        context = self.context
+        head = json.dumps({
+            'sheet': context.sheet_name,
+            'today_date': context.today_date,
+            'yesterday_date': context.yesterday_date,
+            'analysis_date': context.analysis_date
+        }, ensure_ascii=False)
+        return head[:-1] + ', "anomalies": ['
+    
+    def anomaly(self, anomaly: Dict) -> str:
+        record = anomaly.to_dict() if hasattr(anomaly, 'to_dict') else anomaly
+        text = self._separator + json.dumps(record, ensure_ascii=False)
+        self._separator = ",\n    "
+        return text
+    
+    def finish(self, stats: ReportStats) -> str:
+        closing = "\n  ]" if stats.total else "]"
+        return f'{closing}, "stats": {json.dumps(stats.to_dict())}}}\n'
+
+def render(anomalies: Iterable[Dict], templates: List[Tuple[ReportTemplate, TextIO]],
+           stats: Optional[ReportStats] = None) -> ReportStats:
+    """Один проход по отклонениям: каждый шаблон пишет куски в свой поток
+    
+    Args:
+        anomalies: Отклонения в порядке отчета (см. AnomalyStore.ordered)
+        templates: Пары (шаблон, открытый текстовый поток)
+        stats: Готовая статистика по всем отклонениям (если anomalies - только
+            часть, например худшие N); по умолчанию считается за проход
+    """
+    count = stats is None
+    stats = ReportStats() if count else stats
+    for template, stream in templates:
+        stream.write(template.begin())
+    for anomaly in anomalies:
+        if count:
+            stats.add(anomaly)
+        for template, stream in templates:
+            chunk = template.anomaly(anomaly)
+            if chunk:
+                stream.write(chunk)
+    for template, stream in templates:
+        stream.write(template.finish(stats))
+    return stats
+
+def iter_report(anomalies: Iterable[Dict], template: ReportTemplate,
+                stats: Optional[ReportStats] = None) -> Iterator[str]:
+    """Генератор кусков одного отчета (для отдачи по мере готовности)"""
+    count = stats is None
+    stats = ReportStats() if count else stats
+    yield template.begin()
+    for anomaly in anomalies:
+        if count:
+            stats.add(anomaly)
+        yield template.anomaly(anomaly)
+    yield template.finish(stats)
+
+def create_template(name: str, context: ReportContext) -> ReportTemplate:
+    """Шаблон по имени формата ('md', 'csv', 'json')"""
+    try:
+        return TEMPLATES[name](context)
+    except KeyError:
+        raise ValueError(f"Неизвестный формат отчета: {name} (доступны: {', '.join(TEMPLATES)})")
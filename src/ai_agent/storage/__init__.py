@@ -0,0 +1 @@
+"""Локальное хранилище состояния агента"""
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+Общая SQLite-база локального состояния агента
+"""
+
+import sqlite3
+from pathlib import Path
+
+from ai_agent.config import config
+
+class StateDatabase:
+    """Базовый класс хранилищ в SQLite-файле состояния
+    
+    Наследники задают SCHEMA - она применяется при первом соединении.
+    """
+    
+    SCHEMA = ""
+    
+    def __init__(self, path: str = None):
+        self.path = Path(path or config.STATE_DB_PATH)
+        self._initialized = False
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Открывает соединение (схема создается при первом обращении)"""
+        if not self._initialized:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(str(self.path))
+        if not self._initialized:
+            connection.executescript(self.SCHEMA)
+            self._initialized = True
+        return connection
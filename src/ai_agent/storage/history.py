@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Локальная колоночная история листов месяцев
+
+Каждый лист месяца зеркалируется в файл Feather (Arrow IPC) в длинном
+формате: строка на каждое заполненное значение (строка листа, метрика,
+товар, дата, колонка, значение). Файлы пишутся без сжатия и читаются через
+memory map - чтение не копирует буферы, запросы по истории и базовые линии
+идут с диска без обращений к API.
+
+Синхронизация инкрементальная: как и read_columns_incremental, она
+докачивает только даты после последней сохраненной (последняя
+перечитывается), заголовки и колонки всех листов - двумя вызовами
+values.batchGet. Закрытые месяцы (все даты листа раньше текущего месяца,
+и повторная синхронизация не нашла новых дат) больше не читаются. Ключи
+строк листа (метрика, товар) сохраняются в метаданных файла: если в листе
+сдвинулись строки, сохраненные значения переносятся на новые строки по
+ключу - см. ai_agent.analysis.rows.
+
+pyarrow - необязательная зависимость: импортируется при первом обращении
+к истории, остальной агент без него работает.
+"""
+
+import json
+import re
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ai_agent.analysis.dates import DateAxis, DateLike, to_date
+from ai_agent.analysis.frame import METRIC_COL, PRODUCT_COL, SheetFrame
+from ai_agent.analysis.rows import EMPTY_KEY, RowIndex, RowKey
+from ai_agent.config import config
+from ai_agent.google.sheets import sheets
+from ai_agent.log import get_logger
+
+logger = get_logger(__name__)
+
+# Ключ метаданных схемы Arrow с состоянием синхронизации листа
+METADATA_KEY = b'ai_agent.history'
+
+def _arrow():
+    """Импортирует pyarrow (нужен только локальной истории)"""
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.feather
+        import pyarrow.ipc
+    except ImportError as e:
+        raise ImportError("Для локальной истории листов нужен pyarrow: pip install pyarrow") from e
+    return pyarrow
+
+def _file_name(sheet_name: str) -> str:
+    """Имя файла листа (буквы, цифры, точка и дефис; остальное - '_')"""
+    return re.sub(r'[^\w.-]+', '_', sheet_name).strip('_') + '.feather'
+
+class HistoryStore:
+    """Файлы истории листов: {HISTORY_DIR}/{spreadsheet_id}/{лист}.feather"""
+    
+    def __init__(self, path: str = None):
+        self.path = Path(path or config.HISTORY_DIR)
+    
+    def file_path(self, sheet_name: str, spreadsheet_id: str = None) -> Path:
+        return self.path / (spreadsheet_id or sheets.spreadsheet_id or 'default') / _file_name(sheet_name)
+    
+    def metadata(self, sheet_name: str, spreadsheet_id: str = None) -> Optional[Dict]:
+        """Состояние синхронизации листа (читается только схема файла) или None"""
+        path = self.file_path(sheet_name, spreadsheet_id)
+        if not path.exists():
+            return None
+        pa = _arrow()
+        with pa.memory_map(str(path)) as source:
+            schema = pa.ipc.open_file(source).schema
+        raw = (schema.metadata or {}).get(METADATA_KEY)
+        return json.loads(raw) if raw else None
+    
+    def read(self, sheet_name: str, spreadsheet_id: str = None, columns: List[str] = None):
+        """Таблица истории листа (pyarrow.Table через memory map) или None"""
+        path = self.file_path(sheet_name, spreadsheet_id)
+        if not path.exists():
+            return None
+        pa = _arrow()
+        return pa.feather.read_table(str(path), columns=columns, memory_map=True)
+    
+    def write(self, sheet_name: str, table, metadata: Dict, spreadsheet_id: str = None):
+        """Сохраняет таблицу листа (через временный файл - читатели не видят половину)"""
+        pa = _arrow()
+        path = self.file_path(sheet_name, spreadsheet_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        table = table.replace_schema_metadata({METADATA_KEY: json.dumps(metadata, ensure_ascii=False)})
+        tmp_path = path.with_name(path.name + '.tmp')
+        # Без сжатия: файл читается через memory map без копирования
+        pa.feather.write_feather(table, str(tmp_path), compression='uncompressed')
+        tmp_path.replace(path)
+    
+    def stored_sheets(self, spreadsheet_id: str = None) -> List[str]:
+        """Листы в истории в хронологическом порядке (по первой дате)"""
+        directory = self.path / (spreadsheet_id or sheets.spreadsheet_id or 'default')
+        pa = _arrow()
+        found = []
+        for path in directory.glob('*.feather'):
+            with pa.memory_map(str(path)) as source:
+                raw = (pa.ipc.open_file(source).schema.metadata or {}).get(METADATA_KEY)
+            if raw:
+                metadata = json.loads(raw)
+                found.append((metadata.get('first_date') or '', metadata['sheet_name']))
+        return [name for _, name in sorted(found)]
+    
+    def _frame_table(self, frame: SheetFrame, axis: DateAxis, columns: List[int]):
+        """Длинная таблица значений frame по колонкам дат columns"""
+        pa = _arrow()
+        date_by_col = dict(zip(axis.columns, axis.dates))
+        dates = np.array([date_by_col[col] for col in columns], dtype='datetime64[D]')
+        matrix = frame.matrix(columns)
+        rows, days = np.nonzero(~np.isnan(matrix) & frame.has_metric[:, None])
+        order = np.lexsort((rows, days))
+        rows, days = rows[order], days[order]
+        
+        return pa.table({
+            'row': pa.array(frame.row_numbers[rows].astype(np.int32)),
+            'metric': pa.array(frame.metrics).dictionary_encode().take(pa.array(rows)),
+            'product': pa.array(frame.products).dictionary_encode().take(pa.array(rows)),
+            'date': pa.array(dates[days], type=pa.date32()),
+            'col': pa.array(np.asarray(columns, dtype=np.int32)[days]),
+            'value': pa.array(matrix[rows, days])
+        })
+    
+    @staticmethod
+    def _row_keys(table, header_rows: int) -> Tuple[np.ndarray, List[RowKey]]:
+        """Позиции строк данных каждого значения и ключи строк по позициям
+        
+        Названия берутся по первому вхождению строки (в строке листа они одни
+        на все даты), строки без значений получают EMPTY_KEY.
+        """
+        positions = table['row'].to_numpy() - header_rows - 1
+        keys = [EMPTY_KEY] * (int(positions.max()) + 1 if len(positions) else 0)
+        _, first = np.unique(positions, return_index=True)
+        for pos, metric, product in zip(positions[first].tolist(),
+                                        table['metric'].take(first).to_pylist(),
+                                        table['product'].take(first).to_pylist()):
+            keys[pos] = (metric, product)
+        return positions, keys
+    
+    def _realign(self, table, frame: SheetFrame,
+                 keys: Optional[List[RowKey]] = None) -> Tuple[object, int]:
+        """Переносит сохраненные значения на строки frame по ключу (метрика, товар)
+        
+        Значения удаленных строк отбрасываются.
+        
+        Args:
+            keys: Ключи строк листа при прошлой синхронизации (metadata['row_keys']);
+                None - восстановить по значениям (файлы без row_keys, строки без
+                значений в них пустые)
+        
+        Returns:
+            Tuple: (таблица с новыми номерами строк, количество вставленных строк -
+                их прошлых дат в таблице нет)
+        """
+        if not table.num_rows:
+            return table, 0
+        pa = _arrow()
+        positions, stored_keys = self._row_keys(table, frame.header_rows)
+        new_keys = frame.row_index.keys
+        if keys is None:
+            # По значениям не видно пустых строк в конце листа - достаточно совпадения начала
+            keys = stored_keys
+            if keys == new_keys[:len(keys)]:
+                return table, 0
+        elif keys == new_keys:
+            return table, 0
+        
+        index = RowIndex(keys, frame.header_rows + 1)
+        remap = index.update(new_keys)
+        added = len(index.added(remap))
+        remap = remap[positions]
+        logger.info("Строки листа сдвинулись: перенесено значений %s, удалено %s, вставлено строк %s",
+                    int(np.count_nonzero(remap != positions)), int(np.count_nonzero(remap < 0)), added)
+        table = table.filter(pa.array(remap >= 0))
+        rows = (remap[remap >= 0] + frame.header_rows + 1).astype(np.int32)
+        return table.set_column(table.schema.get_field_index('row'), 'row', pa.array(rows)), added
+    
+    def _plan(self, sheet_name: str, axis: DateAxis, metadata: Optional[Dict]) -> List[int]:
+        """Колонки дат для докачки (все - если истории нет или даты в листе сдвинулись)"""
+        if not metadata:
+            return list(axis.columns)
+        labels = dict(axis.items())
+        stored = {int(col): label for col, label in metadata['dates'].items()}
+        if any(labels.get(col) != label for col, label in stored.items()):
+            logger.info("[%s] Колонки дат изменились - история перечитывается целиком", sheet_name)
+            return list(axis.columns)
+        last = axis.columns.index(metadata['last_col']) if metadata['last_col'] in labels else 0
+        # Последняя сохраненная дата перечитывается: за день в нее могли дописать данные
+        return list(axis.columns[last:]) + [
+            col for col in axis.columns[:last] if col not in stored
+        ]
+    
+    def sync(self, sheet_names: List[str], force: bool = False) -> Dict[str, Dict]:
+        """Синхронизирует листы с таблицей
+        
+        Args:
+            sheet_names: Листы месяцев
+            force: Перечитать листы целиком (в том числе закрытые месяцы)
+        
+        Returns:
+            Dict[str, Dict]: лист → {'dates': дат прочитано, 'values': значений в истории,
+                'closed': месяц закрыт, 'skipped': лист не читался}
+        """
+        pa = _arrow()
+        spreadsheet_id = sheets.spreadsheet_id
+        results = {}
+        
+        metadata_by_sheet = {} if force else {
+            name: self.metadata(name, spreadsheet_id) for name in sheet_names
+        }
+        pending = []
+        for name in sheet_names:
+            metadata = metadata_by_sheet.get(name)
+            if metadata and metadata.get('closed'):
+                results[name] = {'dates': 0, 'values': metadata['values'], 'closed': True, 'skipped': True}
+            else:
+                pending.append(name)
+        if not pending:
+            return results
+        
+        # Заголовки всех листов - одним вызовом, нужные колонки всех листов - вторым
+        headers_by_sheet = sheets.read_headers(pending)
+        axes = {name: DateAxis.for_headers(headers_by_sheet.get(name) or []) for name in pending}
+        plans = {name: self._plan(name, axes[name], metadata_by_sheet.get(name)) for name in pending}
+        fetched = sheets.read_sheet_columns({
+            name: [METRIC_COL, PRODUCT_COL] + columns for name, columns in plans.items() if columns
+        })
+        
+        first_of_month = date.today().replace(day=1)
+        for name in pending:
+            axis, columns = axes[name], plans[name]
+            if columns and name not in fetched:
+                logger.warning("[%s] Не удалось прочитать лист - история не обновлена", name)
+                continue
+            
+            metadata = metadata_by_sheet.get(name)
+            existing = self.read(name, spreadsheet_id) if metadata and columns != list(axis.columns) else None
+            
+            frame = SheetFrame.from_columns(headers_by_sheet[name], fetched.get(name, {}))
+            if existing is not None:
+                kept = existing.filter(pa.compute.invert(
+                    pa.compute.is_in(existing['col'], value_set=pa.array(columns, type=pa.int32()))
+                ))
+                row_keys = metadata.get('row_keys')
+                kept, added = self._realign(
+                    kept, frame, [tuple(key) for key in row_keys] if row_keys is not None else None
+                ) if columns else (kept, 0)
+                # Прошлые даты вставленных строк есть только в листе - дочитываем остальные даты
+                rest = [col for col in axis.columns if col not in columns] if added else []
+                extra = sheets.read_columns(name, rest) if rest else None
+                if extra:
+                    frame = SheetFrame.from_columns(headers_by_sheet[name], {**fetched.get(name, {}), **extra})
+                    columns = list(axis.columns)
+                    existing = None
+            table = self._frame_table(frame, axis, columns)
+            if existing is not None:
+                table = pa.concat_tables([kept, table]).unify_dictionaries().combine_chunks()
+                table = table.sort_by([('date', 'ascending'), ('row', 'ascending')])
+            
+            # Месяц закрыт, когда он прошел и повторная синхронизация не нашла новых дат
+            last_date = axis.last_date.isoformat() if axis.last_date else None
+            closed = bool(last_date and axis.last_date < first_of_month
+                          and metadata and metadata.get('last_date') == last_date)
+            self.write(name, table, {
+                'sheet_name': name,
+                'spreadsheet_id': spreadsheet_id,
+                'dates': {str(col): label for col, label in axis.items()},
+                'first_date': axis.first_date.isoformat() if axis.first_date else None,
+                'last_date': last_date,
+                'last_col': axis.columns[-1] if len(axis) else None,
+                'values': table.num_rows,
+                'header_rows': frame.header_rows,
+                'row_keys': frame.row_index.keys if columns else (metadata or {}).get('row_keys'),
+                'closed': closed,
+                'synced_at': datetime.now().isoformat(timespec='seconds')
+            }, spreadsheet_id)
+            
+            results[name] = {'dates': len(columns), 'values': table.num_rows, 'closed': closed, 'skipped': False}
+            logger.info("[%s] История: прочитано дат %s, значений %s%s",
+                        name, len(columns), table.num_rows, " (месяц закрыт)" if closed else "")
+        return results
+    
+    def load_frame(self, sheet_name: str, spreadsheet_id: str = None) -> Optional[SheetFrame]:
+        """Лист из истории в колоночной модели (без обращений к API)
+        
+        Строки без единого значения в историю не попадают и остаются пустыми.
+        """
+        metadata = self.metadata(sheet_name, spreadsheet_id)
+        table = self.read(sheet_name, spreadsheet_id)
+        if metadata is None or table is None or not table.num_rows:
+            return None
+        
+        header_rows = metadata.get('header_rows', 2)
+        dates = {int(col): label for col, label in metadata['dates'].items()}
+        headers = [''] * (max(dates) + 1)
+        for col, label in dates.items():
+            headers[col] = label
+        
+        positions, keys = self._row_keys(table, header_rows)
+        n_rows = len(keys)
+        metrics = [metric for metric, _ in keys]
+        products = [product for _, product in keys]
+        
+        col_values = table['col'].to_numpy()
+        columns_order = np.unique(col_values)
+        matrix = np.full((n_rows, len(columns_order)), np.nan)
+        matrix[positions, np.searchsorted(columns_order, col_values)] = table['value'].to_numpy()
+        columns = {int(col): np.ascontiguousarray(matrix[:, index]) for index, col in enumerate(columns_order)}
+        return SheetFrame.from_arrays(headers, metrics, products, columns, header_rows)
+    
+    def history(self, metric: str, product: Optional[str] = None,
+                start: Optional[DateLike] = None, end: Optional[DateLike] = None,
+                sheet_names: Optional[List[str]] = None):
+        """Значения метрики по всем листам истории (pandas.DataFrame, по возрастанию даты)
+        
+        Args:
+            metric: Метрика (колонка A)
+            product: Только этот товар (колонка B); None - все товары
+            start: Первая дата (включительно); None - без границы
+            end: Последняя дата (включительно); None - без границы
+            sheet_names: Листы (по умолчанию - все листы истории)
+        
+        Returns:
+            pandas.DataFrame: sheet, date, row, metric, product, value
+        """
+        pa = _arrow()
+        compute = pa.compute
+        tables = []
+        for name in sheet_names or self.stored_sheets():
+            table = self.read(name)
+            if table is None:
+                continue
+            mask = compute.equal(table['metric'].cast(pa.string()), metric)
+            if product is not None:
+                mask = compute.and_(mask, compute.equal(table['product'].cast(pa.string()), product))
+            if start is not None:
+                mask = compute.and_(mask, compute.greater_equal(table['date'], pa.scalar(to_date(start), pa.date32())))
+            if end is not None:
+                mask = compute.and_(mask, compute.less_equal(table['date'], pa.scalar(to_date(end), pa.date32())))
+            selected = table.filter(mask)
+            selected = selected.set_column(selected.schema.get_field_index('metric'), 'metric',
+                                           selected['metric'].cast(pa.string()))
+            selected = selected.set_column(selected.schema.get_field_index('product'), 'product',
+                                           selected['product'].cast(pa.string()))
+            tables.append(selected.add_column(0, 'sheet', pa.array([name] * selected.num_rows, pa.string())))
+        
+        if not tables:
+            return pa.schema([
+                ('sheet', pa.string()), ('date', pa.date32()), ('row', pa.int32()),
+                ('metric', pa.string()), ('product', pa.string()), ('value', pa.float64())
+            ]).empty_table().to_pandas()
+        result = pa.concat_tables(tables).select(['sheet', 'date', 'row', 'metric', 'product', 'value'])
+        return result.sort_by([('date', 'ascending'), ('row', 'ascending')]).to_pandas()
+
+# Глобальный экземпляр
+history_store = HistoryStore()
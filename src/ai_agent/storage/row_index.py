@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Сохраненные индексы строк листов (ключ (метрика, товар) → строка)
+
+Индекс запоминается при каждом чтении ключевых колонок. Следующий запуск
+сравнивает его со свежими ключами и переносит кэшированные данные по ключу,
+если в листе вставили, удалили или переставили строки.
+"""
+
+from contextlib import closing
+from datetime import datetime
+from typing import Optional
+
+from ai_agent.analysis.rows import RowIndex
+from ai_agent.storage.database import StateDatabase
+
+class RowIndexStore(StateDatabase):
+    """SQLite-хранилище индексов строк листов"""
+    
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS row_index (
+        spreadsheet_id TEXT NOT NULL,
+        sheet_name TEXT NOT NULL,
+        row_keys TEXT NOT NULL,
+        updated_at TEXT NOT NULL,
+        PRIMARY KEY (spreadsheet_id, sheet_name)
+    );
+    """
+    
+    def get(self, spreadsheet_id: str, sheet_name: str) -> Optional[RowIndex]:
+        """Сохраненный индекс листа или None"""
+        with closing(self._connect()) as connection:
+            row = connection.execute(
+                "SELECT row_keys FROM row_index WHERE spreadsheet_id = ? AND sheet_name = ?",
+                (spreadsheet_id, sheet_name)
+            ).fetchone()
+        return RowIndex.from_json(row[0]) if row else None
+    
+    def put(self, spreadsheet_id: str, sheet_name: str, index: RowIndex):
+        """Сохраняет (перезаписывает) индекс листа"""
+        with closing(self._connect()) as connection, connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO row_index VALUES (?, ?, ?, ?)",
+                (spreadsheet_id, sheet_name, index.to_json(), datetime.now().isoformat())
+            )
+
+# Глобальный экземпляр
+row_index_store = RowIndexStore()
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Watermark'и инкрементального чтения листов
+
+Для каждого листа хранится последняя проанализированная дата и кэш уже
+прочитанных колонок. Следующий запуск докачивает только новые колонки
+(values.batchGet) и объединяет их с историей из кэша.
+
+Колонки дат кэшируются по дате из заголовка, а не по номеру колонки: если
+перед датами вставили или удалили колонку, кэш и watermark находят свои
+даты на новых местах.
+
+Кэш привязан к строкам по ключу (метрика, товар): если в листе вставили,
+удалили или переставили строки, закэшированные колонки переносятся на новые
+позиции по сохраненному индексу строк (ai_agent.storage.row_index).
+"""
+
+import json
+from contextlib import closing
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from ai_agent.analysis.rows import RowIndex, realign
+from ai_agent.google.sheets import sheets
+from ai_agent.log import get_logger
+from ai_agent.storage.database import StateDatabase
+from ai_agent.storage.row_index import row_index_store
+
+logger = get_logger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS watermarks (
+    spreadsheet_id TEXT NOT NULL,
+    sheet_name TEXT NOT NULL,
+    last_col INTEGER NOT NULL,
+    last_date TEXT,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (spreadsheet_id, sheet_name)
+);
+CREATE TABLE IF NOT EXISTS column_cache (
+    spreadsheet_id TEXT NOT NULL,
+    sheet_name TEXT NOT NULL,
+    label TEXT NOT NULL,
+    col_values TEXT NOT NULL,
+    PRIMARY KEY (spreadsheet_id, sheet_name, label)
+);
+DROP TABLE IF EXISTS sheet_columns;
+"""
+
+def _column_label(col: int, labels: Dict[int, str]) -> str:
+    """Ключ колонки в кэше: дата из заголовка, для ключевых колонок - '#индекс'"""
+    return labels.get(col) or f"#{col}"
+
+class WatermarkStore(StateDatabase):
+    """SQLite-хранилище watermark'ов и кэша колонок листов"""
+    
+    SCHEMA = _SCHEMA
+    
+    def get_watermark(self, spreadsheet_id: str, sheet_name: str) -> Optional[Dict]:
+        """Возвращает watermark листа или None, если лист еще не анализировался"""
+        with closing(self._connect()) as connection:
+            row = connection.execute(
+                "SELECT last_col, last_date, updated_at FROM watermarks "
+                "WHERE spreadsheet_id = ? AND sheet_name = ?",
+                (spreadsheet_id, sheet_name)
+            ).fetchone()
+        
+        if not row:
+            return None
+        return {'last_col': row[0], 'last_date': row[1], 'updated_at': row[2]}
+    
+    def set_watermark(self, spreadsheet_id: str, sheet_name: str,
+                      last_col: int, last_date: str = None):
+        """Запоминает последнюю проанализированную колонку с датой"""
+        with closing(self._connect()) as connection, connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO watermarks VALUES (?, ?, ?, ?, ?)",
+                (spreadsheet_id, sheet_name, last_col, last_date, datetime.now().isoformat())
+            )
+    
+    def load_columns(self, spreadsheet_id: str, sheet_name: str,
+                     labels: Dict[int, str]) -> Dict[int, List]:
+        """Загружает кэш колонок листа: индекс_колонки → значения
+        
+        Args:
+            labels: Текущие колонки дат листа: индекс_колонки → дата. Колонки
+                дат, которых больше нет в заголовке, не возвращаются
+        """
+        with closing(self._connect()) as connection:
+            rows = connection.execute(
+                "SELECT label, col_values FROM column_cache "
+                "WHERE spreadsheet_id = ? AND sheet_name = ?",
+                (spreadsheet_id, sheet_name)
+            ).fetchall()
+        
+        cols = {label: col for col, label in labels.items()}
+        columns = {}
+        for label, values in rows:
+            col = int(label[1:]) if label.startswith('#') else cols.get(label)
+            if col is not None:
+                columns[col] = json.loads(values)
+        return columns
+    
+    def save_columns(self, spreadsheet_id: str, sheet_name: str, columns: Dict[int, List],
+                     labels: Dict[int, str]):
+        """Сохраняет (перезаписывает) колонки листа в кэш
+        
+        Args:
+            labels: Колонки дат листа: индекс_колонки → дата (ключ записи в кэше)
+        """
+        with closing(self._connect()) as connection, connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO column_cache VALUES (?, ?, ?, ?)",
+                [
+                    (spreadsheet_id, sheet_name, _column_label(col, labels),
+                     json.dumps(values, ensure_ascii=False))
+                    for col, values in columns.items()
+                ]
+            )
+    
+    def reset(self, spreadsheet_id: str, sheet_name: str):
+        """Удаляет watermark и кэш колонок листа"""
+        with closing(self._connect()) as connection, connection:
+            connection.execute(
+                "DELETE FROM watermarks WHERE spreadsheet_id = ? AND sheet_name = ?",
+                (spreadsheet_id, sheet_name)
+            )
+            connection.execute(
+                "DELETE FROM column_cache WHERE spreadsheet_id = ? AND sheet_name = ?",
+                (spreadsheet_id, sheet_name)
+            )
+
+def read_columns_incremental(sheet_name: str, date_columns: List[Tuple[int, str]],
+                             key_columns: List[int], store: WatermarkStore = None) -> Dict[int, List]:
+    """Читает колонки листа, докачивая только даты после watermark'а
+    
+    Колонка watermark'а перечитывается (за день в нее могли дописать данные).
+    Она и кэш ищутся по дате из заголовка; если даты watermark'а в листе
+    больше нет, кэш сбрасывается и лист читается целиком.
+    ключевые колонки (метрика/товар) читаются всегда - они маленькие и
+    определяют положение строк. Если строки сдвинулись, кэшированные колонки
+    переставляются по индексу строк предыдущего запуска.
+    
+    Args:
+        sheet_name: Название листа
+        date_columns: Пары (индекс_колонки, дата_строка) в хронологическом порядке
+        key_columns: Индексы колонок метрики и товара
+        store: Хранилище watermark'ов (по умолчанию - общее)
+    
+    Returns:
+        Dict[int, List]: Все колонки (история из кэша + свежие из API)
+    """
+    store = store or watermark_store
+    spreadsheet_id = sheets.spreadsheet_id
+    
+    columns_order = [col for col, _ in date_columns]
+    labels = dict(date_columns)
+    cols = {label: col for col, label in date_columns}
+    
+    watermark = store.get_watermark(spreadsheet_id, sheet_name)
+    if watermark and watermark['last_date'] not in cols:
+        # Даты watermark'а больше нет в заголовке - кэшу нельзя доверять
+        logger.warning("[%s] Дата watermark'а %s не найдена в заголовке - кэш сброшен",
+                       sheet_name, watermark['last_date'])
+        store.reset(spreadsheet_id, sheet_name)
+        watermark = None
+    cached = store.load_columns(spreadsheet_id, sheet_name, labels) if watermark else {}
+    
+    if watermark:
+        last_col = cols[watermark['last_date']]
+        if last_col != watermark['last_col']:
+            logger.info("[%s] Колонки дат сдвинулись: %s теперь в колонке %s (была %s)",
+                        sheet_name, watermark['last_date'], last_col, watermark['last_col'])
+        new_columns = columns_order[columns_order.index(last_col):]
+    else:
+        # Первый запуск (или лист перестроен) - читаем все даты
+        new_columns = columns_order
+    
+    missing = [col for col in columns_order if col not in cached and col not in new_columns]
+    fetched = sheets.read_columns(sheet_name, list(key_columns) + new_columns + missing)
+    if not fetched:
+        # API недоступен - работаем по кэшу
+        return cached
+    
+    logger.info("Прочитано колонок из API: %s (в кэше: %s)", len(fetched), len(cached))
+    
+    stale = {col: values for col, values in cached.items() if col not in fetched}
+    if len(key_columns) >= 2:
+        index = RowIndex.from_columns(fetched.get(key_columns[0], []), fetched.get(key_columns[1], []))
+        previous = row_index_store.get(spreadsheet_id, sheet_name)
+        if stale and previous is not None and previous.keys != index.keys:
+            remap = previous.update(index.keys)
+            added = previous.added(remap)
+            # Прошлые даты вставленных строк есть только в листе - кэш перечитывается
+            refetched = sheets.read_columns(sheet_name, sorted(stale)) if added else None
+            if refetched:
+                logger.info("В листе %s вставлено строк: %s - перечитано колонок кэша: %s",
+                            sheet_name, len(added), len(refetched))
+                stale = refetched
+            else:
+                logger.info("Строки листа %s сдвинулись: перенос %s колонок кэша по ключам",
+                            sheet_name, len(stale))
+                stale = {col: realign(values, remap, len(index)) for col, values in stale.items()}
+            store.save_columns(spreadsheet_id, sheet_name, stale, labels)
+        row_index_store.put(spreadsheet_id, sheet_name, index)
+    
+    store.save_columns(spreadsheet_id, sheet_name, fetched, labels)
+    if date_columns:
+        last_col, last_date = date_columns[-1]
+        store.set_watermark(spreadsheet_id, sheet_name, last_col, last_date)
+    
+    columns = dict(stale)
+    columns.update(fetched)
+    return columns
+
+# Глобальный экземпляр
+watermark_store = WatermarkStore()
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Легковесная телеметрия прогона: счетчики, гистограммы и span'ы
+
+Измеряются вызовы Google API, аутентификация, разбор листов, сопоставление
+правил, генерация отчета и git push. Итог прогона выгружается в
+METRICS_DIR (локальное состояние, в коммит отчетов не попадает) -
+JSON-сводкой и текстовым файлом в формате Prometheus (для node_exporter
+textfile collector).
+
+Пример:
+    with telemetry.span('report_generation'):
+        report = build_report()
+    telemetry.increment('sheets_requests', method='values.get')
+    telemetry.export(Path(config.METRICS_DIR) / 'daily-report-2025-08-31')
+"""
+
+import json
+import math
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime
+from functools import wraps
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from ai_agent.config import config
+
+# Границы гистограмм длительности (сек) - от быстрых вызовов до медленных чтений листа
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Префикс имен метрик в формате Prometheus
+PROMETHEUS_PREFIX = 'ai_agent'
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+def _label_key(labels: Dict) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+def _escape(value) -> str:
+    """Экранирует значение метки для формата Prometheus"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class Histogram:
+    """Гистограмма с фиксированными границами (накопительные счетчики считаются при выгрузке)"""
+    
+    __slots__ = ('bounds', 'counts', 'count', 'sum', 'min', 'max')
+    
+    def __init__(self, bounds: Iterable[float] = LATENCY_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)  # Последняя ячейка - +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+    
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+    
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """Пары (le, накопленное количество) как в Prometheus"""
+        result = []
+        total = 0
+        for bound, count in zip(self.bounds + (math.inf,), self.counts):
+            total += count
+            result.append(('+Inf' if bound == math.inf else f"{bound:g}", total))
+        return result
+    
+    def to_dict(self) -> Dict:
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'min': round(self.min, 6) if self.count else None,
+            'max': round(self.max, 6) if self.count else None,
+            'buckets': dict(self.cumulative())
+        }
+
+class Span:
+    """Замер длительности блока with: пишет гистограмму {name}_seconds и счетчик ошибок"""
+    
+    __slots__ = ('telemetry', 'name', 'labels', 'started')
+    
+    def __init__(self, telemetry: 'Telemetry', name: str, labels: Dict):
+        self.telemetry = telemetry
+        self.name = name
+        self.labels = labels
+        self.started = 0.0
+    
+    def __enter__(self) -> 'Span':
+        self.started = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.telemetry.observe(f"{self.name}_seconds", time.perf_counter() - self.started, **self.labels)
+        if exc_type is not None:
+            self.telemetry.increment(f"{self.name}_errors", **self.labels)
+        return False
+
+class _NullSpan:
+    """Span выключенной телеметрии"""
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+class Telemetry:
+    """Потокобезопасный реестр метрик одного прогона"""
+    
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.reset()
+    
+    def reset(self):
+        """Очищает метрики (начало нового прогона)"""
+        with self._lock:
+            self.started_at = datetime.now()
+            self._started = time.perf_counter()
+            self._counters: Dict[Tuple[str, LabelKey], float] = {}
+            self._histograms: Dict[Tuple[str, LabelKey], Histogram] = {}
+    
+    def increment(self, name: str, value: float = 1, **labels):
+        """Увеличивает счетчик name (с метками labels) на value"""
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+    
+    def observe(self, name: str, value: float, buckets: Iterable[float] = LATENCY_BUCKETS, **labels):
+        """Добавляет значение в гистограмму name"""
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+    
+    def span(self, name: str, **labels):
+        """Контекстный менеджер: длительность блока попадает в гистограмму {name}_seconds"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return Span(self, name, labels)
+    
+    def timed(self, name: str, **labels) -> Callable:
+        """Декоратор: каждый вызов функции замеряется как span name"""
+        def decorator(func: Callable) -> Callable:
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name, **labels):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+    
+    def counter(self, name: str, **labels) -> float:
+        """Текущее значение счетчика"""
+        with self._lock:
+            return self._counters.get((name, _label_key(labels)), 0)
+    
+    def summary(self) -> Dict:
+        """Сводка прогона в виде словаря (для JSON)"""
+        with self._lock:
+            counters = [
+                {'name': name, 'labels': dict(labels), 'value': value}
+                for (name, labels), value in sorted(self._counters.items())
+            ]
+            histograms = [
+                {'name': name, 'labels': dict(labels), **histogram.to_dict()}
+                for (name, labels), histogram in sorted(self._histograms.items(), key=lambda item: item[0])
+            ]
+        return {
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'duration_seconds': round(time.perf_counter() - self._started, 3),
+            'counters': counters,
+            'histograms': histograms
+        }
+    
+    def to_prometheus(self) -> str:
+        """Сводка в текстовом формате Prometheus"""
+        lines = []
+        summary = self.summary()
+        
+        def metric_name(name: str) -> str:
+            return f"{PROMETHEUS_PREFIX}_{name}"
+        
+        def render_labels(labels: Dict, extra: Optional[Tuple[str, str]] = None) -> str:
+            pairs = list(labels.items()) + ([extra] if extra else [])
+            if not pairs:
+                return ''
+            return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+        
+        declared = set()
+        for counter in summary['counters']:
+            name = metric_name(counter['name']) + '_total'
+            if name not in declared:
+                lines.append(f"# TYPE {name} counter")
+                declared.add(name)
+            lines.append(f"{name}{render_labels(counter['labels'])} {counter['value']:g}")
+        
+        for histogram in summary['histograms']:
+            name = metric_name(histogram['name'])
+            if name not in declared:
+                lines.append(f"# TYPE {name} histogram")
+                declared.add(name)
+            for le, count in histogram['buckets'].items():
+                lines.append(f"{name}_bucket{render_labels(histogram['labels'], ('le', le))} {count}")
+            lines.append(f"{name}_sum{render_labels(histogram['labels'])} {histogram['sum']:g}")
+            lines.append(f"{name}_count{render_labels(histogram['labels'])} {histogram['count']}")
+        
+        name = metric_name('run_duration_seconds')
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {summary['duration_seconds']:g}")
+        return "\n".join(lines) + "\n"
+    
+    def export(self, base_path) -> Optional[Tuple[str, str]]:
+        """Сохраняет сводку в {base_path}.metrics.json и {base_path}.prom
+        
+        Args:
+            base_path: Путь без расширения (обычно - METRICS_DIR / имя прогона)
+        
+        Returns:
+            Tuple[str, str]: Пути JSON и Prometheus файлов или None, если телеметрия выключена
+        """
+        if not self.enabled:
+            return None
+        base_path = Path(base_path)
+        base_path.parent.mkdir(parents=True, exist_ok=True)
+        json_path = base_path.with_name(base_path.name + '.metrics.json')
+        prom_path = base_path.with_name(base_path.name + '.prom')
+        
+        json_path.write_text(json.dumps(self.summary(), ensure_ascii=False, indent=2) + "\n", encoding='utf-8')
+        # Prometheus читает файл целиком - пишем через временный, чтобы не отдать половину
+        tmp_path = prom_path.with_name(prom_path.name + '.tmp')
+        tmp_path.write_text(self.to_prometheus(), encoding='utf-8')
+        tmp_path.replace(prom_path)
+        return str(json_path), str(prom_path)
+
+# Глобальный экземпляр
+telemetry = Telemetry(enabled=config.TELEMETRY_ENABLED)